@@ -0,0 +1,774 @@
+"""
+:date: 10/17/2026
+
+Load tests the message pipeline without slack, using the replay harness in src/utilities/replay. Each stage is run
+over the same traffic and reports its throughput, latency percentiles and the memory it allocated:
+
+    - decode_json: decoding every raw rtm frame with the json module, as slackclient does
+    - decode: the client's own frame decoding, which prescans frames and skips the ones it has no use for
+    - parse: classifying rtm events
+    - route: looking up the plugins for a command verb
+    - route_<n>/broadcast_<n>: handing each command to its plugin out of n synthetic plugins (200 by default) which
+      own a verb each, through the router and by broadcasting it to every plugin as the client used to
+    - parse_options_legacy/parse_options/parse_options_cached: parsing command words against a plugin's options,
+      with commandParser.parse_command as it was before options were compiled, with compiled options on unique
+      commands and with compiled options on commands which repeat (the LRU cache)
+    - dispatch: running plugins on the worker pool
+    - reply: posting replies through the outbound sender
+    - backlog: what every command leaves queued for the plugins, in memory and allocated blocks
+    - state_write/state_read: saving plugin state and reading it back from disk (a cold cache)
+    - end_to_end: Client.start reading replayed frames through to the captured chat.postMessage calls
+    - https_per_call/https_pooled: web api calls to a local HTTPS stand-in for slack, opening a new connection for
+      every call as slackclient does, and through the client's keep-alive connection pool
+    - startup_eager/startup_lazy: registering stub plugins (100 by default) with a new client, importing every one
+      of them and from the plugin manifest, which leaves unchanged plugins unimported until their first command
+    - logging_off/logging_file/logging_queued: the rtm thread's share of handling each command with the doddle
+      logger at DEBUG writing to a file on the rtm thread (as doddle used to), at DEBUG through the queue to a
+      background writer (see utilities/logPipeline), and with logging off
+    - latency_poll/latency_select: command to reply latency for commands arriving at a steady rate, with the rtm
+      loop sleeping websocket_delay whenever the socket is idle (as it did before) and waking on select()
+
+Results can be saved, and compared against a saved baseline to fail a build on a regression:
+
+    python benchmark.py --events 100000 --save data/benchmark.json
+    python benchmark.py --events 100000 --baseline data/benchmark.json --tolerance 0.2
+"""
+# custom
+from src import client
+from src.utilities import admissionController
+from src.utilities import codec
+from src.utilities import commandParser
+from src.utilities import commandRouter
+from src.utilities import httpSession
+from src.utilities import logPipeline
+from src.utilities import messageClassifier
+from src.utilities import outboundSender
+from src.utilities import pluginDispatcher
+from src.utilities import pluginLoader
+from src.utilities import replay
+from src.utilities import stateStore
+from src.constants import app
+from src.constants import slack_api_constants
+# 3rd party
+import argparse
+import gc
+import json
+import logging
+import os
+import requests
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+ACTION_CHARACTER = "!"
+ECHO_VERB = "echo"
+# effectively unlimited, so the benchmark measures the pipeline rather than the rate limits
+UNLIMITED_RATE = 1e9
+# the options of a typical plugin
+PARSER_OPTIONS = {"command": ["start", "stop", "restart", "status"],
+                  "target": ["machine{0}".format(number) for number in range(20)],
+                  "mode": ["fast", "safe"]}
+
+
+class EchoPlugin(object):
+    """
+    Replies to "echo <argument>" with the argument, which identifies the command the reply is for.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        bot.register_plugin(self, [ECHO_VERB])
+
+    def on_command(self, channel, parts):
+        if len(parts) > 1:
+            self.bot.reply_to_channel(channel, parts[1])
+
+
+STUB_PLUGIN = """import time
+
+# stands in for the dependencies a real plugin imports
+time.sleep({import_seconds})
+
+
+class {name}(object):
+
+    def __init__(self, bot):
+        self.bot = bot
+        bot.register_command("{name} <argument>", "does nothing", self)
+
+    def on_command(self, channel, parts):
+        pass
+"""
+
+
+class HttpsStandIn(object):
+    """
+    A local HTTPS server which answers every web api call with {"ok": true}, keeping connections alive as slack
+    does. Its self-signed certificate is made with the openssl command line tool.
+
+    Init:
+        :Args:
+            directory -- str, where the certificate and its key are written
+    """
+
+    def __init__(self, directory):
+        self.certificate = os.path.join(directory, "certificate.pem")
+        key = os.path.join(directory, "key.pem")
+        with open(os.devnull, "w") as devnull:
+            subprocess.check_call(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                                   "-keyout", key, "-out", self.certificate, "-subj", "/CN=localhost",
+                                   "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+                                  stdout=devnull, stderr=devnull)
+        context = ssl.SSLContext(getattr(ssl, "PROTOCOL_TLS_SERVER", ssl.PROTOCOL_SSLv23))
+        context.load_cert_chain(self.certificate, key)
+        self.server = _ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.base_url = "https://localhost:{0}/api/".format(self.server.server_address[1])
+        self._thread = threading.Thread(target=self.server.serve_forever, name="benchmark-https")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and body go out in separate writes, which would otherwise wait on the client's delayed ack
+    disable_nagle_algorithm = True
+    response = b'{"ok": true}'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.response)))
+        self.end_headers()
+        self.wfile.write(self.response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class VerbPlugin(object):
+    """
+    Owns a single verb. It checks the verb itself, as every plugin had to when each command was broadcast to all of
+    them.
+    """
+
+    def __init__(self, verb):
+        self.verb = verb
+        self.handled = 0
+
+    def on_command(self, channel, parts):
+        if parts[0] != self.verb:
+            return
+        self.handled += 1
+
+
+class PollingClient(client.Client):
+    """
+    The client as it read the rtm websocket before it waited on it with select(): whenever there is nothing to read
+    it sleeps for websocket_delay, however soon the next frame arrives.
+    """
+
+    def _wait_for_events(self):
+        time.sleep(self.websocket_delay)
+
+
+def bench_decode_json(frames):
+    started = time.time()
+    for offset, frame in frames:
+        for line in frame.split("\n"):
+            json.loads(line)
+    return time.time() - started, []
+
+
+def bench_decode(frames):
+    cache = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+    cache.close()
+    bot = client.Client("U0DODDLE", "xoxb-benchmark", ACTION_CHARACTER, metrics_sample_rate=0,
+                        channel_cache_path=cache.name, state_path=cache.name + ".db")
+    started = time.time()
+    for offset, frame in frames:
+        bot._decode_frames(frame)
+    elapsed = time.time() - started
+    bot.config_reader.stop_watcher()
+    os.remove(cache.name)
+    return elapsed, []
+
+
+def bench_parse(events):
+    classifier = messageClassifier.MessageClassifier(ACTION_CHARACTER, ["<@U0DODDLE>"])
+    started = time.time()
+    for event in events:
+        classifier.classify(event)
+    return time.time() - started, []
+
+
+def bench_route(events):
+    router = commandRouter.CommandRouter()
+    router.add(object(), [ECHO_VERB])
+    router.add(object())
+    verbs = [event[slack_api_constants.MESSAGE_TEXT][1:].split()[0] for event in events]
+    started = time.time()
+    for verb in verbs:
+        router.route(verb)
+    return time.time() - started, []
+
+
+def synthetic_plugins(count):
+    return [VerbPlugin("verb{0}".format(number)) for number in range(count)]
+
+
+def plugin_commands(events, count):
+    """
+    :return:
+        list -- (channel, parts) for each command, with the verbs spread evenly over count synthetic plugins
+    """
+    return [(event[slack_api_constants.SLACK_CHANNEL],
+             ["verb{0}".format(index % count)] + event[slack_api_constants.MESSAGE_TEXT].split()[1:])
+            for index, event in enumerate(events)]
+
+
+def bench_route_plugins(commands, count):
+    router = commandRouter.CommandRouter()
+    for plugin in synthetic_plugins(count):
+        router.add(plugin, [plugin.verb])
+    started = time.time()
+    for channel, parts in commands:
+        for plugin in router.route(parts[0]):
+            plugin.on_command(channel, parts)
+    return time.time() - started, []
+
+
+def bench_broadcast_plugins(commands, count):
+    plugins = synthetic_plugins(count)
+    started = time.time()
+    for channel, parts in commands:
+        for plugin in plugins:
+            plugin.on_command(channel, parts)
+    return time.time() - started, []
+
+
+def legacy_parse_command(option, parts):
+    """
+    commandParser.parse_command as it was before options could be compiled, to benchmark against.
+    """
+    parsed_commands = {}
+    tmp_dict = {}
+    tmp_known_values = []
+    tmp_known_keys = []
+
+    # Integer i keeps track of parsed wildcard options
+    i = 0
+
+    for command, options in option.items():
+        parsed_commands.update({command: ''.join(set(option).intersection(parts))})
+    tmp_dict.update({'wildcard': list(set(parsed_commands).symmetric_difference(parts))})
+
+    for key, value in parsed_commands.items():
+        tmp_known_values.append(value)
+        tmp_known_keys.append(key)
+
+    tmp_wild = set(parsed_commands).symmetric_difference(parts)
+
+    tmp_list = [x for x in tmp_wild if x not in tmp_known_values]
+    final_tmp_list = [x for x in tmp_list if x not in tmp_known_keys]
+
+    for item in final_tmp_list:
+        parsed_commands.update({'wildcard%d' % i: item})
+
+    return parsed_commands
+
+
+def parser_commands(count, repeats=None):
+    """
+    :param count:
+        int -- the number of commands
+    :param repeats:
+        int -- the number of distinct commands, every command is different by default
+    :return:
+        list -- the words of each command, as plugins are handed them
+    """
+    commands = []
+    for number in range(count):
+        variant = number % repeats if repeats else number
+        commands.append([PARSER_OPTIONS["command"][variant % 4], PARSER_OPTIONS["target"][variant % 20],
+                         "argument{0}".format(variant), PARSER_OPTIONS["mode"][variant % 2]])
+    return commands
+
+
+def bench_parse_options(commands, legacy=False):
+    parser = commandParser.commandParser()
+    options = PARSER_OPTIONS if legacy else parser.compile_options(PARSER_OPTIONS)
+    parse = legacy_parse_command if legacy else parser.parse_command
+    started = time.time()
+    for parts in commands:
+        parse(options, parts)
+    return time.time() - started, []
+
+
+def write_stub_plugins(directory, count, import_seconds):
+    for number in range(count):
+        name = "stub{0:03d}".format(number)
+        os.makedirs(os.path.join(directory, name))
+        with open(os.path.join(directory, name, name + ".py"), "w") as plugin_file:
+            plugin_file.write(STUB_PLUGIN.format(name=name, import_seconds=import_seconds))
+
+
+def bench_https_per_call(stand_in, count):
+    latencies = []
+    started = time.time()
+    for number in range(count):
+        called = time.time()
+        requests.post(stand_in.base_url + slack_api_constants.CALL_CHAT_POST_MESSAGE,
+                      data={"channel": "C0BENCH", "text": str(number)},
+                      verify=stand_in.certificate).json()
+        latencies.append(time.time() - called)
+    return time.time() - started, latencies
+
+
+def bench_https_pooled(stand_in, count):
+    session = httpSession.SlackHttpSession("xoxb-benchmark", base_url=stand_in.base_url)
+    # trust the stand-in's certificate, rather than any bundle or proxy configured in the environment
+    session.session.verify = stand_in.certificate
+    session.session.trust_env = False
+    latencies = []
+    started = time.time()
+    for number in range(count):
+        called = time.time()
+        session.api_call(slack_api_constants.CALL_CHAT_POST_MESSAGE, channel="C0BENCH", text=str(number))
+        latencies.append(time.time() - called)
+    elapsed = time.time() - started
+    stats = session.stats()
+    session.close()
+    return elapsed, latencies, {"connections": stats["connections"], "reused": stats["reused"]}
+
+
+def bench_startup(directory, lazy):
+    manifest = os.path.join(directory, "manifest.json")
+    # without a manifest every plugin is imported
+    if not lazy and os.path.exists(manifest):
+        os.remove(manifest)
+    for name in os.listdir(directory):
+        sys.modules.pop(name, None)
+    cache = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+    cache.close()
+    bot = client.Client("U0DODDLE", "xoxb-benchmark", ACTION_CHARACTER, metrics_sample_rate=0,
+                        channel_cache_path=cache.name, state_path=cache.name + ".db")
+    started = time.time()
+    pluginLoader.PluginLoader(directory, manifest).load(bot)
+    elapsed = time.time() - started
+    bot.config_reader.stop_watcher()
+    os.remove(cache.name)
+    return elapsed, []
+
+
+def bench_dispatch(events):
+    # room for every command, so the benchmark measures throughput rather than load shedding
+    dispatcher = pluginDispatcher.PluginDispatcher(max_queue=len(events))
+    latencies = []
+    done = threading.Event()
+    expected = len(events)
+
+    class Plugin(object):
+        def on_command(self, submitted):
+            latencies.append(time.time() - submitted)
+            if len(latencies) == expected:
+                done.set()
+
+    plugin = Plugin()
+    started = time.time()
+    for event in events:
+        dispatcher.submit(event[slack_api_constants.SLACK_CHANNEL], plugin, plugin.on_command, time.time())
+    done.wait(300)
+    elapsed = time.time() - started
+    dispatcher.shutdown(False)
+    return elapsed, latencies
+
+
+def bench_reply(events):
+    http = replay.FakeHttpSession()
+    sender = outboundSender.OutboundSender(http.api_call, UNLIMITED_RATE, UNLIMITED_RATE)
+    submitted = {}
+    futures = []
+    started = time.time()
+    for event in events:
+        submitted[event[slack_api_constants.SLACK_TS]] = time.time()
+        futures.append(sender.send(event[slack_api_constants.SLACK_CHANNEL], event[slack_api_constants.SLACK_TS]))
+    for future in futures:
+        future.result(300)
+    elapsed = time.time() - started
+    sender.stop()
+
+    latencies = []
+    for called, kwargs in http.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE):
+        # replies to the same channel may have been merged into one post
+        for ts in kwargs.get("text", "").split("\n"):
+            if ts in submitted:
+                latencies.append(called - submitted[ts])
+    return elapsed, latencies
+
+
+def bench_backlog(lines):
+    cache = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+    cache.close()
+    bot = client.Client("U0DODDLE", "xoxb-benchmark", ACTION_CHARACTER, metrics_sample_rate=0,
+                        channel_cache_path=cache.name, state_path=cache.name + ".db")
+    bot.admission = admissionController.AdmissionController(UNLIMITED_RATE, UNLIMITED_RATE,
+                                                            UNLIMITED_RATE, UNLIMITED_RATE, dedup_window=0)
+    EchoPlugin(bot)
+    # hold on to everything the plugins would be handed, as a backed up dispatch queue does
+    backlog = []
+    bot.dispatcher.submit = lambda channel, plugin, fn, *args: backlog.append((fn, args)) or True
+
+    gc.collect()
+    blocks = sys.getallocatedblocks() if hasattr(sys, "getallocatedblocks") else None
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc is not None and tracemalloc.is_tracing() else None
+    started = time.time()
+    for line in lines:
+        # decoded one frame at a time, as the rtm loop does, so only what is queued outlives the event
+        bot._dispatch([json.loads(line)])
+    elapsed = time.time() - started
+    gc.collect()
+
+    extra = {}
+    if blocks is not None:
+        extra["blocks_per_event"] = round((sys.getallocatedblocks() - blocks) / float(len(lines)), 2)
+    if traced is not None:
+        extra["retained_kb_per_100k"] = round((tracemalloc.get_traced_memory()[0] - traced) / 1024.0 * 100000 /
+                                              len(lines), 1)
+    bot.config_reader.stop_watcher()
+    os.remove(cache.name)
+    return elapsed, [], extra
+
+
+def bench_state_write(events, path):
+    for leftover in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    store = stateStore.StateStore(path)
+    started = time.time()
+    for event in events:
+        store.set("benchmark", event[slack_api_constants.SLACK_TS], event)
+    store.flush()
+    elapsed = time.time() - started
+    store.close()
+    return elapsed, []
+
+
+def bench_state_read(events, path):
+    # a fresh store, so every read goes to the database
+    store = stateStore.StateStore(path)
+    latencies = []
+    started = time.time()
+    for event in events:
+        read = time.time()
+        store.get("benchmark", event[slack_api_constants.SLACK_TS])
+        latencies.append(time.time() - read)
+    elapsed = time.time() - started
+    store.close()
+    return elapsed, latencies
+
+
+def bench_end_to_end(frames, rate=None, client_class=client.Client):
+    cache = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+    cache.close()
+    os.remove(cache.name)
+    bot = client_class("U0DODDLE", "xoxb-benchmark", ACTION_CHARACTER, max_queue=len(frames), metrics_sample_rate=0,
+                        channel_cache_path=cache.name, reply_rate=UNLIMITED_RATE, reply_burst=UNLIMITED_RATE,
+                        state_path=cache.name + ".db")
+    bot.admission = admissionController.AdmissionController(UNLIMITED_RATE, UNLIMITED_RATE,
+                                                            UNLIMITED_RATE, UNLIMITED_RATE)
+    EchoPlugin(bot)
+    fake, http = replay.attach(bot, frames, rate=rate)
+
+    # the ts of the command each echo argument came from
+    commands = {}
+    for offset, frame in frames:
+        for line in frame.split("\n"):
+            event = json.loads(line)
+            parts = event.get(slack_api_constants.MESSAGE_TEXT, "").split()
+            if parts and parts[0] == ACTION_CHARACTER + ECHO_VERB and len(parts) > 1:
+                commands[parts[1]] = event[slack_api_constants.SLACK_TS]
+
+    started = time.time()
+    bot.start()
+    deadline = time.time() + 300
+    while bot.dispatcher.pending() or bot.sender.pending():
+        if time.time() > deadline:
+            break
+        time.sleep(0.001)
+    elapsed = time.time() - started
+
+    latencies = []
+    for called, kwargs in http.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE):
+        # replies to the same channel may have been merged into one post
+        for argument in kwargs.get("text", "").split("\n"):
+            # at a fixed rate, from when slack would have sent the command, so time spent waiting to read it counts
+            received = (fake.sent_at if rate else fake.read_at).get(commands.get(argument))
+            if received is not None:
+                latencies.append(called - received)
+
+    bot.dispatcher.shutdown(False)
+    bot.sender.stop()
+    bot.config_reader.stop_watcher()
+    if os.path.exists(cache.name):
+        os.remove(cache.name)
+    return elapsed, latencies
+
+
+def bench_logging(lines, mode):
+    """
+    Times the rtm thread's share of handling each command, which is where logging used to write to the disk.
+
+    :param lines:
+        list -- the raw command events
+    :param mode:
+        str -- "off", "file" to log at DEBUG through a FileHandler on the rtm thread, or "queued" to log at DEBUG
+               through a QueueHandler to a background writer
+    """
+    log = logging.getLogger(app.ROOT_LOGGING_IDENTITY)
+    level, propagate = log.level, log.propagate
+    directory = tempfile.mkdtemp()
+    log_file = listener = handler = None
+    if mode != "off":
+        log_file = logPipeline.file_handler(os.path.join(directory, app.LOG_NAME))
+        log_file.setFormatter(logging.Formatter(app.LOG_CONFIG))
+        handler = log_file
+        if mode == "queued":
+            listener = logPipeline.QueueListener([log_file])
+            listener.start()
+            handler = logPipeline.QueueHandler(listener.queue)
+        log.addHandler(handler)
+        log.setLevel(logging.DEBUG)
+        # not on to the console as well
+        log.propagate = False
+
+    bot = client.Client("U0DODDLE", "xoxb-benchmark", ACTION_CHARACTER, metrics_sample_rate=0,
+                        channel_cache_path=os.path.join(directory, "channels.json"),
+                        state_path=os.path.join(directory, "state.db"))
+    bot.admission = admissionController.AdmissionController(UNLIMITED_RATE, UNLIMITED_RATE,
+                                                            UNLIMITED_RATE, UNLIMITED_RATE, dedup_window=0)
+    EchoPlugin(bot)
+    # the plugins run on the worker pool, only the rtm thread is timed
+    bot.dispatcher.submit = lambda channel, plugin, fn, *args: True
+    latencies = []
+    started = time.time()
+    for line in lines:
+        read = time.time()
+        bot._dispatch([json.loads(line)])
+        latencies.append(time.time() - read)
+    elapsed = time.time() - started
+
+    bot.config_reader.stop_watcher()
+    if handler is not None:
+        log.removeHandler(handler)
+    log.setLevel(level)
+    log.propagate = propagate
+    if listener is not None:
+        listener.stop()
+    if log_file is not None:
+        log_file.close()
+    shutil.rmtree(directory)
+    return elapsed, latencies
+
+
+def measure(name, run, count):
+    """
+    Runs a stage twice: once for its timings, and once while tracing allocations for its memory use (tracing
+    slows everything down, so it can't share a run with the timings).
+
+    :param name:
+        str -- the stage
+    :param run:
+        callable -- runs the stage, returning (elapsed seconds, latencies in seconds) and optionally a dict of
+                    anything else it measured
+    :param count:
+        int -- the number of events the stage handles
+    :return:
+        dict -- the stage's results
+    """
+    gc.collect()
+    measured = run()
+    elapsed, latencies = measured[:2]
+    result = {"events": count,
+              "events_per_second": round(count / elapsed, 1) if elapsed else None}
+    if len(measured) > 2:
+        result.update(measured[2])
+    if latencies:
+        latencies.sort()
+        for percentile in (50, 90, 99):
+            index = min(len(latencies) - 1, int(len(latencies) * percentile / 100.0))
+            result["p{0}_ms".format(percentile)] = round(latencies[index] * 1000, 3)
+
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        measured = run()
+        if len(measured) > 2:
+            result.update(measured[2])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result["memory_kb_per_100k"] = round(peak / 1024.0 * 100000 / count, 1)
+
+    print("{0:<22} {1}".format(name, json.dumps(result, sort_keys=True)))
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    :param results:
+        dict -- this run's results, by stage
+    :param baseline:
+        dict -- a saved run's results, by stage
+    :param tolerance:
+        float -- the fraction a number may get worse by before it is a regression
+    :return:
+        list -- a description of every regression
+    """
+    regressions = []
+    for stage, expected in baseline.items():
+        actual = results.get(stage)
+        if actual is None:
+            continue
+        for key, value in expected.items():
+            if key == "events" or value is None or actual.get(key) is None:
+                continue
+            # throughput regresses when it falls, latency and memory when they rise
+            if key == "events_per_second":
+                worse = actual[key] < value * (1 - tolerance)
+            else:
+                worse = actual[key] > value * (1 + tolerance)
+            if worse:
+                regressions.append("{0} {1}: {2} (baseline {3})".format(stage, key, actual[key], value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load tests the doddle message pipeline without slack.")
+    parser.add_argument("--events", type=int, default=100000, help="the number of rtm events to replay")
+    parser.add_argument("--recording", help="replay a recording made by replay.RecordingSlackClient instead")
+    parser.add_argument("--rate", type=float, help="end to end: frames a second, as fast as possible by default")
+    parser.add_argument("--plugins", type=int, default=200, help="route/broadcast: the number of synthetic plugins")
+    parser.add_argument("--https-calls", type=int, default=500, help="https: the number of web api calls")
+    parser.add_argument("--stub-plugins", type=int, default=100, help="startup: the number of stub plugins")
+    parser.add_argument("--stub-import-ms", type=float, default=5,
+                        help="startup: how long importing each stub plugin takes")
+    parser.add_argument("--latency-commands", type=int, default=200, help="latency: the number of commands sent")
+    parser.add_argument("--latency-rate", type=float, default=50, help="latency: commands a second")
+    parser.add_argument("--save", help="write the results to this file")
+    parser.add_argument("--baseline", help="fail if the results are worse than the ones saved in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="how much worse than the baseline is allowed")
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("doddle").setLevel(logging.WARNING)
+
+    if options.recording:
+        frames = replay.load(options.recording)
+    else:
+        frames = replay.synthetic_frames(options.events, ACTION_CHARACTER, verbs=[ECHO_VERB], event_ratio=0.5)
+    events = [json.loads(line) for offset, frame in frames for line in frame.split("\n")]
+    commands = [event for event in events
+                if event.get(slack_api_constants.MESSAGE_TEXT, "").startswith(ACTION_CHARACTER)]
+
+    results = {}
+    print("json library: " + codec.BACKEND)
+    results["decode_json"] = measure("decode_json", lambda: bench_decode_json(frames), len(events))
+    results["decode"] = measure("decode", lambda: bench_decode(frames), len(events))
+    results["parse"] = measure("parse", lambda: bench_parse(events), len(events))
+    results["route"] = measure("route", lambda: bench_route(commands), len(commands))
+    for count in (2, options.plugins):
+        routed = plugin_commands(commands, count)
+        for stage, bench in (("route", bench_route_plugins), ("broadcast", bench_broadcast_plugins)):
+            name = "{0}_{1}".format(stage, count)
+            results[name] = measure(name, lambda: bench(routed, count), len(routed))
+    unique = parser_commands(len(commands))
+    repeated = parser_commands(len(commands), repeats=50)
+    results["parse_options_legacy"] = measure("parse_options_legacy", lambda: bench_parse_options(unique, True),
+                                              len(unique))
+    results["parse_options"] = measure("parse_options", lambda: bench_parse_options(unique), len(unique))
+    results["parse_options_cached"] = measure("parse_options_cached", lambda: bench_parse_options(repeated),
+                                              len(repeated))
+    results["dispatch"] = measure("dispatch", lambda: bench_dispatch(commands), len(commands))
+    results["reply"] = measure("reply", lambda: bench_reply(commands), len(commands))
+    lines = [json.dumps(event) for event in commands]
+    results["backlog"] = measure("backlog", lambda: bench_backlog(lines), len(lines))
+    state_directory = tempfile.mkdtemp()
+    state_path = os.path.join(state_directory, "benchmark_state.db")
+    results["state_write"] = measure("state_write", lambda: bench_state_write(commands, state_path), len(commands))
+    results["state_read"] = measure("state_read", lambda: bench_state_read(commands, state_path), len(commands))
+    shutil.rmtree(state_directory)
+    results["end_to_end"] = measure("end_to_end", lambda: bench_end_to_end(frames, options.rate), len(events))
+    certificate_directory = tempfile.mkdtemp()
+    try:
+        stand_in = HttpsStandIn(certificate_directory)
+    except (OSError, subprocess.CalledProcessError):
+        print("https: skipped, unable to make a certificate with openssl")
+        stand_in = None
+    if stand_in is not None:
+        stand_in.start()
+        results["https_per_call"] = measure("https_per_call",
+                                            lambda: bench_https_per_call(stand_in, options.https_calls),
+                                            options.https_calls)
+        results["https_pooled"] = measure("https_pooled", lambda: bench_https_pooled(stand_in, options.https_calls),
+                                          options.https_calls)
+        stand_in.stop()
+    shutil.rmtree(certificate_directory)
+    plugin_directory = tempfile.mkdtemp()
+    write_stub_plugins(plugin_directory, options.stub_plugins, options.stub_import_ms / 1000.0)
+    results["startup_eager"] = measure("startup_eager", lambda: bench_startup(plugin_directory, False),
+                                       options.stub_plugins)
+    results["startup_lazy"] = measure("startup_lazy", lambda: bench_startup(plugin_directory, True),
+                                      options.stub_plugins)
+    shutil.rmtree(plugin_directory)
+    for mode in ("off", "file", "queued"):
+        name = "logging_" + mode
+        results[name] = measure(name, lambda: bench_logging(lines, mode), len(lines))
+    latency_frames = replay.synthetic_frames(options.latency_commands, ACTION_CHARACTER, verbs=[ECHO_VERB],
+                                             command_ratio=1)
+    results["latency_poll"] = measure("latency_poll",
+                                      lambda: bench_end_to_end(latency_frames, options.latency_rate, PollingClient),
+                                      len(latency_frames))
+    results["latency_select"] = measure("latency_select",
+                                        lambda: bench_end_to_end(latency_frames, options.latency_rate),
+                                        len(latency_frames))
+
+    if options.save:
+        with open(options.save, "w") as saved:
+            json.dump(results, saved, indent=2, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as saved:
+            regressions = compare(results, json.load(saved), options.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
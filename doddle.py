@@ -7,130 +7,274 @@
 from src import client
 import src.doddle_exceptions as exceptions
 from src.utilities import doddleUtil
+from src.utilities import pluginLoader
+from src.utilities import logPipeline
+from src.utilities import metrics
+from src.utilities import workerSupervisor
 from src.constants import app
 from src.constants import slack_api_constants
 # 3rd party
+import atexit
 import logging
-import sys
-from os.path import dirname, basename, isfile, abspath
+from os.path import dirname, join, abspath
 import os
-import importlib
-import glob
+import signal
+import threading
+import time
 
 
 class Doddle():
 
-    def __init__(self):
+    def __init__(self, log_queue=None):
+        """
+        :param log_queue:
+            Queue -- when running as a worker process, the multiprocessing queue log records are sent to the
+                     supervisor on. Otherwise records are written to the log file here.
+        """
         # making all original references in __init__ to avoid the squigglies.
-        self.modules = []
-        self.all_modules = []
         self.imported_modules = []
+        self.log_listener = None
 
-        # configure logging
-        self.log = self._configure_logging()
-
-        # prepare the config reader
-        self.config_reader = doddleUtil.DoddleUtil()
+        # prepare the config reader, worker processes leave writing the config file to the supervisor
+        self.config_reader = doddleUtil.DoddleUtil(write_defaults=log_queue is None)
         self.config_reader.configure()
 
-    def start(self):
+        # configure logging
+        self.log = self._configure_logging(log_queue)
+
+    def start(self, bot_id=None, token=None, metrics_queue=None):
         """
-        This function starts the bot. It essentially does 3 things:
+        This function starts the bot. It essentially does 4 things:
             1. Configures the logger
-            2. Imports custom plugins (it passes an instance of the client to each plugin which enables access to chat
-               bot features.
-            3. Connects the bot to the slack api
+            2. Registers custom plugins (it passes an instance of the client to each plugin which enables access to
+               chat bot features). Plugins which haven't changed since the last start are only imported when they
+               are first used.
+            3. Watches the plugin directory, reloading plugins as their files change, unless hot_reload is off in
+               the [plugins] section of the config
+            4. Connects the bot to the slack api
 
+        :param bot_id:
+            str -- the bot id, read from the BOT_ID environment variable if not given
+        :param token:
+            str -- the bot token, read from the SLACK_BOT_TOKEN environment variable if not given
+        :param metrics_queue:
+            Queue -- when running as a worker process, the multiprocessing queue metric snapshots are reported to the
+                     supervisor on
         :return:
             none -- changes application state
         """
-        self.log.info(app.SPLASH)
-        self.log.info("Preparing plugins to import")
-
-        self._prepare_custom_plugin_import()
-        sys.path.append(abspath(app.RELATIVE_PLUGIN_DIRECTORY_PATH))
+        if metrics_queue is None:
+            self.log.info(app.SPLASH)
+        self.log.info("initializing slack client")
 
-        self.log.info("Found {0} plugin candidates.".format(len(self.modules)))
+        channel_cache_path = app.CHANNEL_DIRECTORY_CACHE_PATH
+        state_path = app.STATE_STORE_PATH
+        manifest_path = app.PLUGIN_MANIFEST_PATH
+        if bot_id:
+            channel_cache_path = app.WORKSPACE_CHANNEL_DIRECTORY_CACHE_PATH.format(bot_id)
+            state_path = app.WORKSPACE_STATE_STORE_PATH.format(bot_id)
+            manifest_path = app.WORKSPACE_PLUGIN_MANIFEST_PATH.format(bot_id)
+        doddle = client.Client(bot_id or os.environ.get(app.ENVIRONMENT_VARIABLE_BOT_ID),
+                               token or os.environ.get(app.ENVIRONMENT_VARIABLE_BOT_TOKEN),
+                               self.config_reader.get_option(app.CONFIG_SECTION_BOT,
+                                                             app.CONFIG_OPTION_ACTION_CHARACTER),
+                               metrics_port=None if metrics_queue is not None else self._metrics_port(),
+                               channel_cache_path=channel_cache_path,
+                               state_path=state_path,
+                               write_config_defaults=metrics_queue is None)
 
-        self._sanitize_plugin_list()
+        self.log.info("Registering plugins...")
+        loader = self._prepare_plugin_loader(manifest_path)
+        try:
+            self.imported_modules = loader.load(doddle)
+        except exceptions.PluginPrepareException:
+            self.log.error("Unable to prepare a list of plugin candidates. The bot might be pretty boring without \
+            your plugins")
+        self.log.info("{0} plugins registered, {1} deferred until first use.".format(len(self.imported_modules),
+                                                                                    len(loader.lazy_plugins)))
 
-        self.log.info("{0} Plugin candidates after sanitization".format(len(self.modules)))
+        if self.config_reader.get_option(app.CONFIG_SECTION_PLUGINS, app.CONFIG_OPTION_PREWARM, "false", bool):
+            loader.prewarm()
+        if self.config_reader.get_option(app.CONFIG_SECTION_PLUGINS, app.CONFIG_OPTION_HOT_RELOAD, "true", bool):
+            loader.watch(doddle, app.PLUGIN_WATCH_INTERVAL)
 
-        self.log.info("initializing slack client")
+        if metrics_queue is not None:
+            self._report_metrics(doddle, metrics_queue)
+        self.config_reader.flush_defaults()
+        doddle.start()
 
-        doddle = client.Client(os.environ.get(app.ENVIRONMENT_VARIABLE_BOT_ID),
-                               os.environ.get(app.ENVIRONMENT_VARIABLE_BOT_TOKEN),
-                               self.config_reader.read_config())
+    def supervise(self, workspaces):
+        """
+        Runs the bot for several workspaces at once, each in its own worker process with its own plugins. Crashed
+        workers are restarted, their logs are written here and their metrics are served together on the configured
+        metrics port.
 
-        self.log.info("Importing plugins...")
+        :see:
+            /utilities/workerSupervisor
 
-        for mod in self.modules:
-            try:
-                if not mod.__contains("init"):
-                    path = list(sys.path)
-                    str = mod.split("/")
-                    sys.path.insert(0, str[0]+"/"+str[1])
-                    self.imported_modules.append(importlib.import_module(str[2][:-3]))
-            finally:
-                sys.path[:] = path
+        :param workspaces:
+            list -- (bot_id, token) for every workspace
+        :return:
+            none -- runs until the process is interrupted
+        """
+        self.log.info(app.SPLASH)
+        self.log.info("supervising {0} workspaces".format(len(workspaces)))
 
-        for mod in self.imported_modules:
-            self.log.info("Loading plugin: " + mod.__name__)
-            obj = getattr(mod, mod.__name__)
-            obj(doddle)
+        supervisor = workerSupervisor.WorkerSupervisor(workspaces, run_worker,
+                                                       base_delay=app.WORKER_RESTART_BASE_DELAY,
+                                                       max_delay=app.WORKER_RESTART_MAX_DELAY,
+                                                       stable_after=app.WORKER_STABLE_AFTER)
+        metrics_port = self._metrics_port()
+        if metrics_port:
+            metrics.MetricsServer(supervisor.metrics, metrics_port).start()
+        # the workers don't write to the config, the defaults of the options they read are written from here
+        for option, default in ((app.CONFIG_OPTION_LAZY_IMPORT, "true"), (app.CONFIG_OPTION_PREWARM, "false"),
+                                (app.CONFIG_OPTION_HOT_RELOAD, "true")):
+            self.config_reader.get_option(app.CONFIG_SECTION_PLUGINS, option, default, bool)
+        self.config_reader.flush_defaults()
+        signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+        try:
+            supervisor.run()
+        except KeyboardInterrupt:
+            self.log.info("shutting down workers")
 
-        doddle.start()
+    def _metrics_port(self):
+        """
+        :return:
+            int -- the port metrics are served on, or None if metrics_port is 0 or missing
+        """
+        port = self.config_reader.get_option(app.CONFIG_SECTION_BOT, app.CONFIG_OPTION_METRICS_PORT, "0", int)
+        return port if port > 0 else None
 
-    def _prepare_custom_plugin_import(self):
+    def _report_metrics(self, doddle, metrics_queue):
         """
-        Builds a list of plugins (or modules) to import from the plugin directory.
-            - the plugin directory is configured in constants/app.RELATIVE_PLUGIN_DIRECTORY_PATH
+        Sends the client's metric snapshot to the supervisor every WORKER_METRICS_INTERVAL seconds.
 
+        :param doddle:
+            Client -- the client
+        :param metrics_queue:
+            Queue -- the multiprocessing queue the supervisor reads snapshots from
         :return:
+            None
         """
-        self.log.info("preparing plugin candidates...")
-        try:
-            self.modules = glob.globg(dirname(__file__)+app.RELATIVE_PLUGIN_DIRECTORY_PATH+"*/"+app.PYTHON_FILE)
-            self.all_modules = [ basename(f)[:-3] for f in self.modules if isfile(f)]
-        except exceptions.PluginPrepareException:
-            logging.error("Unable to prepare a list of plugin candidates. The bot might be pretty boring without \
-            your plugins")
+        def report():
+            while True:
+                time.sleep(app.WORKER_METRICS_INTERVAL)
+                metrics_queue.put((doddle.bot_id, doddle.get_metrics()))
 
-    def _sanitize_plugin_list(self):
+        reporter = threading.Thread(target=report, name="doddle-metrics-reporter")
+        reporter.daemon = True
+        reporter.start()
+
+    def _prepare_plugin_loader(self, manifest_path=app.PLUGIN_MANIFEST_PATH):
         """
-        Sanitizes plugin candidate list by removing initialization and test files.
+        Builds the plugin loader for the plugin directory.
+            - the plugin directory is configured in constants/app.RELATIVE_PLUGIN_DIRECTORY_PATH
+            - the plugin manifest is stored at constants/app.PLUGIN_MANIFEST_PATH, or
+              constants/app.WORKSPACE_PLUGIN_MANIFEST_PATH when serving one of several workspaces
+
+        :param manifest_path:
+            str -- the manifest path, relative to the bot's directory
         :return:
-            None -- changes state.
+            PluginLoader -- the loader
         """
-        logging.info("Sanitizing plugin list")
-        for x in self.modules:
-            if "__init__" in x:
-                logging.debug("Removing plugin candidate: {0}".format(x))
-                self.modules.remove(x)
-            if "test" in any:
-                logging.debug("Removing plugin candidate: {0}".format(x))
-                self.modules.remove(x)
-
-    def _configure_logging(self):
+        lazy = self.config_reader.get_option(app.CONFIG_SECTION_PLUGINS, app.CONFIG_OPTION_LAZY_IMPORT, "true", bool)
+        return pluginLoader.PluginLoader(join(dirname(abspath(__file__)), app.RELATIVE_PLUGIN_DIRECTORY_PATH),
+                                         join(dirname(abspath(__file__)), manifest_path),
+                                         lazy=lazy,
+                                         max_workers=app.PLUGIN_IMPORT_WORKERS)
+
+    def _configure_logging(self, log_queue=None):
         """
-        Configures doddle logging.
+        Configures doddle logging. Worker processes send every record to the supervisor over log_queue, otherwise
+        the [logging] section of the config controls how the log file is written:
+            - queued: write from a background thread so the rtm thread never waits on the disk
+            - format: "text" or "json" (one json object per line)
+            - max_bytes/backup_count: rotate the file on size
+            - rotate_when: rotate the file on time instead, i.e. "midnight"
 
         :see:
             /constants/app.LOG_CONFIG
             /constants/app.LOG_LEVEL
+            /utilities/logPipeline
 
+        :param log_queue:
+            Queue -- the multiprocessing queue to send records to, if this is a worker process
         :return:
             log -- logger
         """
-        logging.basicConfig(format=app.LOG_CONFIG)
         log = logging.getLogger(app.ROOT_LOGGING_IDENTITY)
         log.setLevel(app.LOG_LEVEL)
-        log_file = logging.FileHandler(app.LOG_NAME)
-        formatter = logging.Formatter(app.LOG_CONFIG)
-        log.addHandler(log_file)
-        logging.getLogger(slack_api_constants.SLACK_CLIENT_NAME).setLevel(app.SLACK_API_CLIENT_LOG_LEVEL)
-        logging.getLogger(slack_api_constants.SLACK_CLIENT_NAME).addHandler(log_file)
+        slack_log = logging.getLogger(slack_api_constants.SLACK_CLIENT_NAME)
+        slack_log.setLevel(app.SLACK_API_CLIENT_LOG_LEVEL)
+
+        if log_queue is not None:
+            # a forked worker inherits the supervisor's handlers, which would write to the same files
+            handler = logPipeline.QueueHandler(log_queue, prepare=True)
+            for logger in (log, slack_log):
+                logger.handlers = [handler]
+                logger.propagate = False
+            return log
+
+        def option(name, default, option_type=str):
+            return self.config_reader.get_option(app.CONFIG_SECTION_LOGGING, name, default, option_type)
+
+        log_file = logPipeline.file_handler(app.LOG_NAME,
+                                            max_bytes=option(app.CONFIG_OPTION_LOG_MAX_BYTES, "0", int),
+                                            backup_count=option(app.CONFIG_OPTION_LOG_BACKUP_COUNT, "0", int),
+                                            when=option(app.CONFIG_OPTION_LOG_ROTATE_WHEN, ""))
+        if option(app.CONFIG_OPTION_LOG_FORMAT, app.LOG_FORMAT_TEXT) == app.LOG_FORMAT_JSON:
+            log_file.setFormatter(logPipeline.JsonFormatter())
+        else:
+            log_file.setFormatter(logging.Formatter(app.LOG_CONFIG))
+
+        if option(app.CONFIG_OPTION_LOG_QUEUED, "true", bool):
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(app.LOG_CONFIG))
+            self.log_listener = logPipeline.QueueListener([log_file, console])
+            self.log_listener.start()
+            atexit.register(self.log_listener.stop)
+            handler = logPipeline.QueueHandler(self.log_listener.queue)
+            # the console is written by the listener as well, so don't hand records on to the root logger
+            log.propagate = False
+            slack_log.propagate = False
+        else:
+            logging.basicConfig(format=app.LOG_CONFIG)
+            handler = log_file
+
+        log.addHandler(handler)
+        slack_log.addHandler(handler)
         return log
 
-bot = Doddle()
-bot.start()
+
+def workspaces_from_environment():
+    """
+    Reads the workspaces to serve from the SLACK_BOT_TOKENS environment variable, "BOT_ID:TOKEN,BOT_ID:TOKEN".
+
+    :return:
+        list -- (bot_id, token) for every workspace listed
+    """
+    workspaces = []
+    for entry in os.environ.get(app.ENVIRONMENT_VARIABLE_BOT_TOKENS, "").split(","):
+        bot_id, _, token = entry.strip().partition(":")
+        if bot_id and token:
+            workspaces.append((bot_id.strip(), token.strip()))
+    return workspaces
+
+
+def run_worker(bot_id, token, log_queue, metrics_queue):
+    """
+    The entry point of a worker process, see Doddle.supervise.
+    """
+    # the supervisor's SIGTERM handler is inherited, a worker has to die when the supervisor terminates it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    Doddle(log_queue).start(bot_id, token, metrics_queue)
+
+
+if __name__ == "__main__":
+    workspaces = workspaces_from_environment()
+    bot = Doddle()
+    if len(workspaces) > 1:
+        bot.supervise(workspaces)
+    else:
+        bot.start(*(workspaces[0] if workspaces else ()))
@@ -6,39 +6,83 @@ This class is the slack client for the doddle bot and is the backbone for the en
 Client gets passed into every imported plugin and provides functions needed to interface with the
 slack api such as
     :reply_to_channel:
+    :reply_to_thread:
+    :reply_to_direct_message:
+    :get_thread:
 
 Every custom plugin needs the following functions:
-    :register_plugin(self):
-        -- pass an instance of the plugin to the plugin registry. This adds the plugin to a list of plugins which get
-           commands broadcast to them via the :on_command: function.
+    :register_plugin(self, commands=None):
+        -- pass an instance of the plugin to the plugin registry. Commands whose first word is one of the declared
+           command verbs get routed to the plugin via the :on_command: function. A plugin which declares no verbs
+           has every command broadcast to it.
 
-    :register_command(example, about):
-        -- register plugin information for the bots help reply.
+    :register_command(example, about, plugin=None):
+        -- register plugin information for the bots help reply. Passing the plugin also routes the first word of
+           the example to it.
 
-    :on_command(parts, channel):
-        -- The client will broadcast parts & channel to every registered plugin
+    :handle_command(command):
+        -- The client will send the command to every plugin the command is routed to
+            * command = a Command (see utilities/commandEvent) with the text, channel, user, ts and thread_ts of
+              the message, and its parts (a space-delimited list of words following the action character)
+
+    or, as older plugins do:
+    :on_command(channel, parts):
+        -- The client will send channel & parts to every plugin the command is routed to
             * parts = a space-delimited list of words following the action character
             * channnel = the slack_id (channel or user) which sent the message
 """
 
 # custom
-from utilities import doddleUtil
-from utilities import commandParser
-from constants import slack_api_constants
-from constants import app
-import doddle_exceptions
+from src.utilities import doddleUtil
+from src.utilities import commandParser
+from src.utilities import commandRouter
+from src.utilities import commandEvent
+from src.utilities import pluginDispatcher
+from src.utilities import outboundSender
+from src.utilities import httpSession
+from src.utilities import channelDirectory
+from src.utilities import messageClassifier
+from src.utilities import metrics
+from src.utilities import connectionSupervisor
+from src.utilities import admissionController
+from src.utilities import responseCache
+from src.utilities import helpRenderer
+from src.utilities import conversations
+from src.utilities import scheduler
+from src.utilities import stateStore
+from src.utilities import codec
+from src.constants import slack_api_constants
+from src.constants import app
+from src import doddle_exceptions
 # 3rd party
+import collections
 import logging
+import os
+import select
+import socket
+import threading
 import time
-import json
 from slackclient import SlackClient
 
 log = logging.getLogger("doddle.src.Client")
 
+# metric labels for commands the admission controller turns away
+_REJECTED_DUPLICATE = (("reason", "duplicate"),)
+_REJECTED_USER = (("reason", "user_throttled"),)
+_REJECTED_CHANNEL = (("reason", "channel_throttled"),)
+# metric labels for rtm frames dropped without being decoded
+_SKIPPED_EVENT = (("reason", "unhandled_event"),)
+_SKIPPED_CHATTER = (("reason", "chatter"),)
+
 
 class Client:
 
-    def __init__(self, bot_id, token, actionCharacter, websocket_delay=1):
+    def __init__(self, bot_id, token, actionCharacter, websocket_delay=1, max_workers=8, max_queue=256,
+                 command_timeout=30, http_pool_size=10, http_timeout=10, bot_aliases=None, metrics_sample_rate=0.1,
+                 metrics_port=None, channel_cache_path=app.CHANNEL_DIRECTORY_CACHE_PATH,
+                 reply_rate=slack_api_constants.CHAT_POST_MESSAGE_RATE,
+                 reply_burst=slack_api_constants.CHAT_POST_MESSAGE_BURST, state_path=app.STATE_STORE_PATH,
+                 write_config_defaults=True):
         """
         This initializes the doddle slack client.
 
@@ -48,9 +92,38 @@ class Client:
             str -- the slack doken
         :param actionCharacter:
             str -- this is the character the bot listens to to process a command, if it is the first character
-                   (i.e, !help) the bot will process this message with "!" being the actionCharacter
+                   (i.e, !help) the bot will process this message with "!" being the actionCharacter. Every
+                   character of the string is treated as an action character.
         :param websocket_delay:
-            int -- sets how frequently (in seconds) that the bot queries the rtm api
+            int -- the longest (in seconds) the bot will block waiting on an idle rtm websocket before polling again
+        :param max_workers:
+            int -- the number of threads plugins are run on
+        :param max_queue:
+            int -- the most commands which may wait for a plugin before new ones are dropped
+        :param command_timeout:
+            int -- how long (in seconds) a channel waits on a plugin before moving on. Plugins can override this
+                   with a dispatch_timeout attribute.
+        :param http_pool_size:
+            int -- the most keep-alive connections kept open to the slack web api
+        :param http_timeout:
+            int -- how long (in seconds) to wait on a slack web api response
+        :param bot_aliases:
+            list -- other strings which address the bot like an @mention does, i.e. "doddle:"
+        :param metrics_sample_rate:
+            float -- the fraction of messages whose handling is timed, see get_metrics
+        :param metrics_port:
+            int -- if set, metrics are served in the prometheus text format on http://127.0.0.1:<port>/metrics
+        :param channel_cache_path:
+            str -- where the channel directory is cached between restarts, one file per workspace
+        :param reply_rate:
+            float -- the messages per second posted to each channel, slack allows about one
+        :param reply_burst:
+            int -- how many messages may be posted to a channel at once before reply_rate applies
+        :param state_path:
+            str -- the database plugin state is kept in, one file per workspace
+        :param write_config_defaults:
+            bool -- whether defaults handed to get_option are written to the config file. Worker processes leave
+                    this to the supervisor.
         :return:
             nothing
         """
@@ -58,21 +131,86 @@ class Client:
         self.bot_id = bot_id
         self.token = token
         self.slack_client = SlackClient
+        # the class each rtm connection is made with, utilities/replay swaps in a fake to run without slack
+        self.slack_client_class = SlackClient
+        self.http = httpSession.SlackHttpSession(token, http_pool_size, http_timeout)
         # handle commands based on action character
         self.actionChar = actionCharacter
         # Handle @mentions if wanted
         self.at_bot = "<@{0}>".format(self.bot_id)
+        mentions = [self.at_bot] + list(bot_aliases or [])
+        self.classifier = messageClassifier.MessageClassifier(actionCharacter, mentions)
+        # frames which can't hold a command are skipped before they're decoded
+        self.framePrescan = codec.FramePrescan(actionCharacter, mentions, slack_api_constants.CHANNEL_EVENTS +
+                                               (slack_api_constants.EVENT_GOODBYE,))
         # configure behavior
         self.websocket_delay = websocket_delay
         self.registered_plugins = []
+        self._lazy_plugins = {}
+        # every object which registered anything (commands, routes, jobs), by the module it comes from
+        self._owners = {}
+        # held while a command is routed and while reload_plugin swaps plugins, so a swap never lands halfway
+        # through routing one
+        self._registry_lock = threading.RLock()
+        # the registrations held back while reload_plugin creates a plugin, on the thread creating it
+        self._held = threading.local()
+        self.router = commandRouter.CommandRouter()
+        self.metrics = metrics.Metrics(metrics_sample_rate)
+        self.metrics_port = metrics_port
+        self.dispatcher = pluginDispatcher.PluginDispatcher(max_workers, max_queue, command_timeout, self.metrics)
+        self.sender = outboundSender.OutboundSender(self.api_call,
+                                                    reply_rate,
+                                                    reply_burst,
+                                                    metrics=self.metrics)
+        self.scheduler = scheduler.Scheduler(self.dispatcher.submit,
+                                             app.SCHEDULER_MAX_JOBS_PER_PLUGIN,
+                                             app.SCHEDULER_BUSY_DELAY)
+        self.metrics.gauge("dispatch_queue_depth", self.dispatcher.pending)
+        self.metrics.gauge("scheduled_jobs", self.scheduler.pending)
+        self.metrics.gauge("dispatch_dropped", lambda: self.dispatcher.dropped)
+        self.metrics.gauge("outbound_queue_depth", self.sender.pending)
+        self.metrics.gauge("http_connections_reused", lambda: self.http.stats()["reused"])
+        self.metrics.gauge("admission_active_users", lambda: self.admission.stats()["users"])
+        self.responseCache = responseCache.ResponseCache(app.RESPONSE_CACHE_SIZE)
+        self.metrics.gauge("response_cache_hits", lambda: self.responseCache.hits)
+        self.metrics.gauge("response_cache_misses", lambda: self.responseCache.misses)
+        self.metrics.gauge("frames_skipped", lambda: self.framePrescan.skipped, labels=_SKIPPED_EVENT)
+        self.metrics.gauge("frames_skipped", lambda: self.framePrescan.chatter, labels=_SKIPPED_CHATTER)
+        # replies made while a cacheable command runs are collected here, per dispatcher thread
+        self._reply_capture = threading.local()
+        self.metrics_server = None
+        self.conversations = conversations.Conversations(self.api_call,
+                                                         app.DM_CHANNEL_CACHE_SIZE,
+                                                         app.THREAD_CACHE_SIZE,
+                                                         app.THREAD_CACHE_TTL)
         self.commands = {}
-        self.channelDirectory = {}
-        self.commandParser = commandParser.util()
+        self.helpRenderer = helpRenderer.HelpRenderer(actionCharacter[:1], app.HELP_MESSAGE_LENGTH)
+        self.channelDirectory = channelDirectory.ChannelDirectory(os.path.abspath(channel_cache_path))
+        self.commandParser = commandParser.commandParser()
+        self.state = stateStore.StateStore(os.path.abspath(state_path), app.STATE_CACHE_SIZE,
+                                           app.STATE_COMMIT_INTERVAL)
         # prepare the config reader
-        self.config_reader = doddleUtil.DoddleUtil()
+        self.config_reader = doddleUtil.DoddleUtil(write_config_defaults)
         self.config_reader.configure()
         # maintain state
         self.connected_status = False
+        self.supervisor = connectionSupervisor.ConnectionSupervisor(app.RECONNECT_BASE_DELAY,
+                                                                    app.RECONNECT_MAX_DELAY,
+                                                                    app.PING_INTERVAL,
+                                                                    app.PONG_TIMEOUT,
+                                                                    app.REPLAY_WINDOW,
+                                                                    stable_after=app.RECONNECT_STABLE_AFTER)
+        self.admission = admissionController.AdmissionController(app.USER_COMMAND_RATE,
+                                                                 app.USER_COMMAND_BURST,
+                                                                 app.CHANNEL_COMMAND_RATE,
+                                                                 app.CHANNEL_COMMAND_BURST,
+                                                                 app.DEDUP_WINDOW,
+                                                                 app.ADMISSION_MAX_KEYS)
+        self._sessions = 0
+        self._stopped = threading.Event()
+        # missed messages fetched by the replay thread, waiting to be handled on the rtm thread
+        self._replayed = collections.deque()
+        self._replay_thread = None
 
     def start(self):
         """
@@ -80,117 +218,506 @@ class Client:
         messages from slack, determines if it should be broadcasted to the plugin list and broadcasts the message to
         registered plugins if all criteria are satisfied.
 
+        If the connection can't be made, or drops, the client reconnects with jittered exponential backoff. The
+        channel directory and plugin registry are kept across reconnects, and commands sent while the bot was away
+        are replayed from channel history.
+
+        see:
+        utilities/connectionSupervisor
+
         :return:
-            nothing.
+            nothing -- returns once stop() is called.
         """
-        self.slack_client = SlackClient(self.token)
+        self.config_reader.start_watcher()
+        if self.metrics_port and self.metrics_server is None:
+            self.metrics_server = metrics.MetricsServer(self.metrics, self.metrics_port)
+            self.metrics_server.start()
+        self._stopped.clear()
 
-        if self.slack_client.rtm_connect():
-            log.info("Connected to slack.")
-            self._set_channel_directory()
-            self.connected_status = True
-            while True:
-                command, channel = self._parse_slack_output(self.slack_client.rtm_read())
-                if command and channel:
-                    self._handle_command(command, channel)
-                time.sleep(self.websocket_delay)
-            log.error(app.BOT_NAME + "has disconnected...Attempting to reconnect")
-        else:
+        while not self._stopped.is_set():
+            if not self._connect():
+                self.metrics.increment("reconnects")
+                delay = self.supervisor.next_delay()
+                log.error("{0} was unable to connect...Attempting to reconnect in {1:.1f}s".format(app.BOT_NAME,
+                                                                                                  delay))
+                self._stopped.wait(delay)
+                continue
+
+            self._read_until_disconnected()
             self.connected_status = False
-            log.error(app.BOT_NAME + "has disconnected...Attempting to reconnect")
-            self.start()
+            if not self._stopped.is_set():
+                self.metrics.increment("reconnects")
+                delay = self.supervisor.disconnected()
+                log.error("{0} has disconnected...Attempting to reconnect in {1:.1f}s".format(app.BOT_NAME, delay))
+                self._stopped.wait(delay)
+
+        self.state.flush()
+
+    def stop(self):
+        """
+        Stops the client. start() returns once the message currently being read has been handled.
+
+        :return:
+            nothing.
+        """
+        self._stopped.set()
+
+    def get_metrics(self):
+        """
+        Returns the bot's instrumentation: latency histograms for each stage of the message loop (rtm_read, parse,
+        handle, reply) and each plugin, error/timeout counters per plugin, queue depths and reconnects. Timings are
+        sampled, see metrics_sample_rate.
+
+        see:
+        utilities/metrics
+
+        :return:
+            dict -- {"counters": {...}, "gauges": {...}, "histograms": {...}}, keyed by (name, labels)
+        """
+        return self.metrics.snapshot()
+
+    def get_state(self, plugin):
+        """
+        Returns a plugin's persistent state, a key-value store which survives reconnects and restarts. Values can be
+        anything json serializable. Reads are served from memory where possible and writes are saved in the
+        background, so both are cheap enough to use on every command.
+
+        see:
+        utilities/stateStore
+
+        :param plugin:
+            object -- the plugin, its state is namespaced by its module and class
+        :return:
+            PluginState -- get(key, default=None), set(key, value), delete(key) and keys()
+
+        :example:
+            self.state = bot.get_state(self)
+            self.state.set("last_deploy", {"machine": "web1", "at": 1539734400})
+        """
+        return stateStore.PluginState(self.state, "{0}.{1}".format(type(plugin).__module__, type(plugin).__name__))
 
     def get_channel_directory(self):
         """
         :return:
-            dict - a directory of channels.
-            Key = human readable name, Value = slack channel id.
+            ChannelDirectory - a directory of channels, which behaves like a dict.
+            Key = human readable name, Value = slack channel id. Use name_for(channel_id) for the reverse lookup.
         """
         return self.channelDirectory
 
     def reply_to_channel(self, channel, text, attatchments=None):
         """
+        Queues a message for the channel. The message is posted by the outbound sender, which keeps each channel
+        under slack's rate limit and may merge several short replies to the same channel into one post, so this
+        never blocks.
+
+        see:
+        utilities/outboundSender
+
         :param channel:
             string -- the channel/user where the message originated from.
+        :param text:
+            string -- the message to send
         :param attatchments:
             dict/json -- allows for better slack messaging.
                 * See https://api.slack.com/docs/message-attachments
         :return:
-            nothing -- This doesn't return anything to the caller function, instead if sends a message via the rtm_api
+            Future -- resolves to the slack api response once the message has been posted
         """
         attachments = None
-        if attachments:
-            attachment = json.dumps(attatchments)
+        if attatchments:
+            attachments = codec.dumps(attatchments)
+
+        replies = getattr(self._reply_capture, "replies", None)
+        if replies is not None:
+            replies.append((channel, text, attachments))
+        return self.sender.send(channel, text, attachments)
+
+    def api_call(self, method, **kwargs):
+        """
+        Calls a slack web api method over the client's pooled keep-alive HTTP session. Plugins should use this
+        rather than reaching for the underlying slack client.
+
+        :param method:
+            string -- the api method, i.e. "chat.postMessage"
+        :param kwargs:
+            the arguments for the api method
+        :return:
+            dict -- the decoded api response
+        """
+        return self.http.api_call(method, **kwargs)
+
+    def reply_to_thread(self, channel, thread_ts, text, attatchments=None, broadcast=False):
+        """
+        Queues a reply in a thread, see reply_to_channel.
+
+        :param channel:
+            string -- the channel id the thread is in
+        :param thread_ts:
+            string -- the ts of the thread's parent message. Replying to a message which isn't in a thread yet
+                      starts one.
+        :param text:
+            string -- the message to send
+        :param attatchments:
+            dict/json -- allows for better slack messaging.
+        :param broadcast:
+            bool -- also show the reply in the channel
+        :return:
+            Future -- resolves to the slack api response once the message has been posted
+        """
+        attachments = None
+        if attatchments:
+            attachments = codec.dumps(attatchments)
+
+        kwargs = {slack_api_constants.SLACK_THREAD_TS: thread_ts}
+        if broadcast:
+            kwargs[slack_api_constants.REPLY_BROADCAST] = "true"
+        return self.sender.send(channel, text, attachments, **kwargs)
+
+    def reply_to_direct_message(self, user, text, attatchments=None):
+        """
+        Queues a direct message to a user. The direct message channel is opened the first time a user is messaged
+        and remembered after that, so only the first message to a user waits on the web api.
+
+        :param user:
+            string -- the user id
+        :param text:
+            string -- the message to send
+        :param attatchments:
+            dict/json -- allows for better slack messaging.
+        :return:
+            Future -- resolves to the slack api response once the message has been posted, or None if the direct
+                      message channel couldn't be opened
+        """
+        channel = self.conversations.dm_channel(user)
+        if channel is None:
+            return None
+        return self.reply_to_channel(channel, text, attatchments)
+
+    def get_thread(self, channel, thread_ts):
+        """
+        Returns every message in a thread. Threads are cached until a new message is posted in them.
+
+        see:
+        utilities/conversations
+
+        :param channel:
+            string -- the channel id the thread is in
+        :param thread_ts:
+            string -- the ts of the thread's parent message
+        :return:
+            list -- the messages, parent first, or None if the thread couldn't be read
+        """
+        return self.conversations.thread(channel, thread_ts)
+
+    def get_threads(self, channel, thread_timestamps):
+        """
+        Returns the messages of several threads, reading the ones which aren't cached concurrently.
 
-        self.slack_client.api_call(slack_api_constants.CALL_CHAT_POST_MESSAGE,
-                                   channel=channel,
-                                   text=text,
-                                   as_user=True,
-                                   attatchments=attachment)
+        :param channel:
+            string -- the channel id the threads are in
+        :param thread_timestamps:
+            list -- the ts of each thread's parent message
+        :return:
+            dict -- the messages of each thread (None if it couldn't be read), by thread ts
+        """
+        return self.conversations.threads(channel, thread_timestamps)
 
-    def reply_to_thread(self):
+    def run_at(self, when, job, plugin=None):
         """
-        TODO
+        Runs a job once, at a given time, on the plugin worker pool.
+
+        see:
+        utilities/scheduler
 
+        :param when:
+            float -- the unix time to run the job at
+        :param job:
+            callable -- the job, called without arguments
+        :param plugin:
+            object -- the plugin the job belongs to. Its jobs are cancelled when it is unregistered.
         :return:
+            Job -- pass it to cancel_job to cancel it
         """
+        if plugin is not None:
+            self._own(plugin)
+        return self.scheduler.run_at(when, job, plugin)
 
-    def reply_to_direct_message(self):
+    def run_every(self, interval, job, plugin=None, jitter=0):
         """
-        TODO
+        Runs a job every interval seconds on the plugin worker pool. A run which is still going when the next one
+        comes due delays it rather than overlapping it.
 
+        :param interval:
+            float -- seconds between runs
+        :param job:
+            callable -- the job, called without arguments
+        :param plugin:
+            object -- the plugin the job belongs to. Its jobs are cancelled when it is unregistered.
+        :param jitter:
+            float -- up to this many seconds are added to every run, so jobs with the same interval spread out
         :return:
+            Job -- pass it to cancel_job to cancel it
+
+        :example:
+            bot.run_every(300, self.poll_status_page, self, jitter=30)
         """
+        if plugin is not None:
+            self._own(plugin)
+        return self.scheduler.run_every(interval, job, plugin, jitter)
 
-    def register_command(self, example, about):
+    def run_cron(self, expression, job, plugin=None, jitter=0):
+        """
+        Runs a job on a cron schedule, in local time, on the plugin worker pool.
+
+        :param expression:
+            string -- "minute hour day-of-month month day-of-week", i.e. "0 9 * * 1-5" for 9am on weekdays
+        :param job:
+            callable -- the job, called without arguments
+        :param plugin:
+            object -- the plugin the job belongs to. Its jobs are cancelled when it is unregistered.
+        :param jitter:
+            float -- up to this many seconds are added to every run
+        :return:
+            Job -- pass it to cancel_job to cancel it
+        """
+        if plugin is not None:
+            self._own(plugin)
+        return self.scheduler.run_cron(expression, job, plugin, jitter)
+
+    def cancel_job(self, job):
+        """
+        :param job:
+            Job -- a job returned by run_at, run_every or run_cron
+        :return:
+            none -- changes application state
+        """
+        self.scheduler.cancel(job)
+
+    def register_command(self, example, about, plugin=None, cache_ttl=None, cache_per_channel=False):
         """
         Registers a command provided by a plugin by adding the instructions to the "help" reply.
 
+        Read-only commands which always give the same answer can be made cacheable with cache_ttl. Repeats of the
+        same command within cache_ttl seconds are then answered with the replies the plugin sent the first time,
+        without calling on_command. Only replies sent through reply_to_channel from within on_command are cached.
+
         :param example:
             string -- example of the command provided plugin in use
         :param about:
             string -- a description of the command
+        :param plugin:
+            object -- optional, the plugin which owns the command. The first word of the example is routed to it.
+        :param cache_ttl:
+            float -- optional, how long (in seconds) the response to the command may be reused. Requires plugin.
+        :param cache_per_channel:
+            bool -- cache the response separately for each channel the command is sent in
         :return:
             none -- changes application state
 
         :example:
-            self.bot.register_command("restart <machine>", "restarts the target machine")
+            self.bot.register_command("restart <machine>", "restarts the target machine", self)
+            self.bot.register_command("status <machine>", "shows the machine status", self, cache_ttl=30)
         """
+        if self._hold(self.register_command, example, about, plugin, cache_ttl, cache_per_channel):
+            return
         self.commands[example] = self.actionChar + about
+        self.helpRenderer.add(example, about, plugin)
+        if plugin is not None:
+            self._own(plugin)
+        if plugin is not None and example.split():
+            self.router.add(plugin, [example.split()[0]])
+            if cache_ttl:
+                self.responseCache.set_policy(plugin, example.split()[0], cache_ttl, cache_per_channel)
 
-    def register_plugin(self, plugin):
+    def register_plugin(self, plugin, commands=None):
         """
-        Registers a new plugin by adding it into a list of plugins. Each plugin is required to have an on_command
-        function to process the command parts/channel that get broadcast to it.
+        Registers a new plugin by adding it into a list of plugins. Each plugin is required to have a handle_command
+        function to process the commands that get routed to it, or an on_command function taking their
+        channel/parts.
 
         :param plugin:
             object -- pass in self, or an instance of the plugin.
+        :param commands:
+            list -- optional, the command verbs (first word after the action character) the plugin owns. Plugins
+                    which don't declare any commands receive every command.
         :return:
             none -- changes application state
 
         :example:
-            bot.register_plugin(self)
+            bot.register_plugin(self, ["restart", "status"])
+        """
+        if self._hold(self.register_plugin, plugin, commands):
+            return
+        # a plugin that was registered lazily replaces its stand-in once it is actually loaded
+        stand_in = self._lazy_plugins.pop(type(plugin).__module__, None)
+        if stand_in is not None and stand_in is not plugin:
+            self.unregister_plugin(stand_in)
+
+        if plugin not in self.registered_plugins:
+            self.registered_plugins.append(plugin)
+        self.router.add(plugin, commands)
+        self._own(plugin)
+
+    def register_lazy_plugin(self, plugin, module_name, commands=None, help_entries=None):
+        """
+        Registers a stand-in for a plugin module which hasn't been imported yet. The stand-in is swapped out for the
+        real plugin with reload_plugin once the module is imported.
+
+        see:
+        utilities/pluginLoader
+
+        :param plugin:
+            object -- the stand-in, which must provide handle_command or on_command
+        :param module_name:
+            string -- the name of the plugin module the stand-in is for
+        :param commands:
+            list -- the command verbs the plugin is known to own
+        :param help_entries:
+            list -- (example, about) for every command the plugin puts in the help reply
+        :return:
+            none -- changes application state
+        """
+        self._lazy_plugins[module_name] = plugin
+        self._own(plugin, module_name)
+        self.register_plugin(plugin, commands)
+        # straight into the help reply, routing them would take a catch-all stand-in off every other command
+        for example, about in help_entries or ():
+            self.commands[example] = self.actionChar + about
+            self.helpRenderer.add(example, about, plugin)
+
+    def unregister_plugin(self, plugin):
+        """
+        Removes a plugin, every command verb routed to it and its scheduled jobs.
+
+        :param plugin:
+            object -- the plugin instance
+        :return:
+            none -- changes application state
+        """
+        self.router.remove(plugin)
+        self.responseCache.remove_policies(plugin)
+        self.scheduler.cancel_plugin(plugin)
+        for example in self.helpRenderer.remove(plugin):
+            self.commands.pop(example, None)
+        with self._registry_lock:
+            if plugin in self.registered_plugins:
+                self.registered_plugins.remove(plugin)
+            for module_name, owners in list(self._owners.items()):
+                if plugin in owners:
+                    owners.remove(plugin)
+                    if not owners:
+                        del self._owners[module_name]
+                    if self._lazy_plugins.get(module_name) is plugin:
+                        del self._lazy_plugins[module_name]
+
+    def reload_plugin(self, module_name, create=None, drain=True):
+        """
+        Swaps the plugins registered from a module for a new one without touching the rtm connection or any cache
+        but the old plugins' own. Every object from the module which registered anything (commands, routes, cache
+        policies, jobs) counts as one of its plugins.
+
+        Work already queued or running for the old plugins is drained first (for up to their dispatch timeout)
+        while commands keep being read and routed. The new plugin is created next, and whatever it registers with
+        register_command or register_plugin is held back so no command reaches it half built. Only the swap itself
+        holds the lock routing takes: the old plugins are unregistered and the new plugin's registrations applied,
+        so a command is routed either to the old plugins or to the new one, never both. Commands the old plugins
+        took on while draining finish on the old code.
+
+        If create raises nothing is swapped, the held back registrations are dropped and any job the new plugin
+        scheduled is cancelled.
+
+        see:
+        utilities/pluginLoader
+
+        :param module_name:
+            string -- the name of the plugin module
+        :param create:
+            callable -- builds and returns the new plugin, None to remove the module's plugins
+        :param drain:
+            bool -- wait for the old plugins' work before swapping. A lazy stand-in replacing itself while it
+                    handles a command can't wait on itself.
+        :return:
+            object -- the new plugin, or None
+        """
+        old = self._plugins_from(module_name)
+        if drain:
+            for plugin in old:
+                if not self.dispatcher.wait_idle(plugin, getattr(plugin, "dispatch_timeout", self.dispatcher.timeout)):
+                    log.warning("{0} is still busy, reloading it anyway".format(type(plugin).__name__))
+
+        plugin = None
+        held = []
+        if create is not None:
+            self._held.registrations = held
+            try:
+                plugin = create()
+            except Exception:
+                log.exception("Unable to create plugin {0}, keeping the running version".format(module_name))
+                for added in self._plugins_from(module_name):
+                    if added not in old:
+                        self.unregister_plugin(added)
+                return None
+            finally:
+                self._held.registrations = None
+
+        with self._registry_lock:
+            for stale in old:
+                self.unregister_plugin(stale)
+            for register, args in held:
+                register(*args)
+        return plugin
+
+    def describe_plugin(self, module_name):
+        """
+        Describes what the plugins of a module registered, for the plugin manifest.
+
+        see:
+        utilities/pluginLoader
+
+        :param module_name:
+            string -- the name of the plugin module
+        :return:
+            dict -- "commands": the command verbs routed to the plugins, empty if one of them receives every
+                    command. "help": [example, about] for each of their commands in the help reply. "jobs": the
+                    number of jobs they have scheduled.
         """
-        self.registered_plugins.append(plugin)
+        commands = set()
+        catch_all = False
+        help_entries = []
+        jobs = 0
+        for owner in self._plugins_from(module_name):
+            verbs = self.router.verbs_for(owner)
+            if not verbs and owner in self.registered_plugins:
+                catch_all = True
+            commands.update(verbs)
+            help_entries.extend([example, about] for example, about in self.helpRenderer.entries(owner))
+            jobs += len(self.scheduler.jobs_for(owner))
+        return {"commands": [] if catch_all else sorted(commands),
+                "help": sorted(help_entries),
+                "jobs": jobs}
 
-    def get_option(self, section, option, default=None):
+    def get_option(self, section, option, default=None, option_type=str):
         """
-        Returns the value of the result for the section/option keys provided
+        Returns the value of the result for the section/option keys provided. Values are served from an in-memory
+        snapshot of the config which is refreshed when the file changes, so this is cheap enough for hot paths.
 
         :param section:
             string -- string specifying section of config file
         :param option:
             string -- string specifying option within the section of config file.
         :param default:
-            string --
+            string -- returned, and written to the config in the background, if the option is missing
+        :param option_type:
+            type -- one of str, int, float, bool or list (comma separated) to coerce the value to
         :return:
             object -- returns value for config field specified
         """
         try:
-            return self.config_reader.read_config(section, option, default)
+            return self.config_reader.get_option(section, option, default, option_type)
         except doddle_exceptions.ConfigOptionRetrievalException:
             log.error("Unable to read configuration {0} {1}".format(section,
                                                                     option))
+            return default
 
     def parse_command(self, options, parts):
         """
@@ -200,97 +727,461 @@ class Client:
         utilities/commandParser
 
         :param options:
-            dict -- a dictionary with possible options/values
+            dict or CompiledOptions -- a dictionary with possible options/values, or the grammar returned by
+                                       compile_options
         :param parts:
-            list -- a space delimited list of words from the original command
+            list or Command -- a space delimited list of words from the original command, or the command itself,
+                               which remembers the result for the next plugin parsing it with the same options
         :return:
             dict -- returns a dictionary of parsed commands.
         """
+        if isinstance(parts, commandEvent.Command):
+            return parts.parse(self.commandParser, options)
         return self.commandParser.parse_command(options, parts)
 
+    def compile_options(self, options):
+        """
+        Compiles a dictionary of options/values once, so that parse_command doesn't have to rebuild it for every
+        command.
+
+        see:
+        utilities/commandParser
+
+        :param options:
+            dict -- a dictionary with possible options/values
+        :return:
+            CompiledOptions -- the compiled grammar to pass to parse_command
+
+        :example:
+            self.options = bot.compile_options({"command": ["start", "stop"], "target": ["machine1"]})
+            parsed = bot.parse_command(self.options, parts)
+        """
+        return self.commandParser.compile_options(options)
+
+    def _own(self, plugin, module_name=None):
+        """
+        Remembers which module a registered object comes from, see reload_plugin.
+        """
+        with self._registry_lock:
+            owners = self._owners.setdefault(module_name or type(plugin).__module__, [])
+            if plugin not in owners:
+                owners.append(plugin)
+
+    def _plugins_from(self, module_name):
+        with self._registry_lock:
+            return list(self._owners.get(module_name, ()))
+
+    def _hold(self, register, *args):
+        """
+        Holds a registration back if it is made while reload_plugin creates a plugin.
+
+        :return:
+            bool -- True if the registration was held back
+        """
+        held = getattr(self._held, "registrations", None)
+        if held is None:
+            return False
+        held.append((register, args))
+        return True
+
     def _set_channel_directory(self):
         """
-        This method builds a directory of available slack channels.
+        This method builds a directory of available slack channels. If a directory was persisted by a previous
+        run it is loaded straight away and refreshed in the background, otherwise it is built before returning.
+
+        see:
+        utilities/channelDirectory
 
         :return:
             Nothing
         """
+        if self.channelDirectory.load():
+            log.info("Refreshing cached channel directory in the background.")
+            refresh = threading.Thread(target=self._build_channel_directory, name="doddle-channel-directory")
+            refresh.daemon = True
+            refresh.start()
+        else:
+            self._build_channel_directory()
+
+    def _build_channel_directory(self):
         log.info("Building channel directory.")
-        channels = self.slack_client.api_call(slack_api_constants.CALL_CHANNELS_LIST)
         try:
-            for channel in channels[slack_api_constants.CHANNELS]:
-                self.channelDirectory[channel['name']] = channel["id"]
-            log.info("Channel directory built. {0} channels.".format(len(self.channelDirectory)))
-        except doddle_exceptions.DirectoryCreateException:
-            log.error("Unable to create channel directory.")
+            if self.channelDirectory.build(self.api_call):
+                log.info("Channel directory built. {0} channels.".format(len(self.channelDirectory)))
+            else:
+                log.error("Unable to create channel directory.")
+        except Exception:
+            log.exception("Unable to create channel directory.")
+
+    def _connect(self):
+        """
+        Opens the rtm connection. The channel directory is only built for the first connection, later ones reuse it
+        (it is kept current by rtm events) and replay whatever was missed while disconnected instead. The replay
+        runs in the background so the connection is read straight away.
+
+        :return:
+            bool -- True if connected
+        """
+        self.slack_client = self.slack_client_class(self.token)
+        try:
+            connected = self.slack_client.rtm_connect()
+        except Exception:
+            log.exception("rtm_connect failed.")
+            connected = False
+        if not connected:
+            return False
+
+        log.info("Connected to slack.")
+        self.connected_status = True
+        self.supervisor.connected()
+        self._sessions += 1
+        if self._sessions == 1:
+            self._set_channel_directory()
+        elif self._replay_thread is None or not self._replay_thread.is_alive():
+            self._replay_thread = threading.Thread(target=self._replay_missed_commands, name="doddle-replay")
+            self._replay_thread.daemon = True
+            self._replay_thread.start()
+        return True
+
+    def _read_until_disconnected(self):
+        """
+        Reads and handles rtm events until the connection drops, slack says goodbye, a ping goes unanswered or the
+        client is stopped.
+
+        :return:
+            nothing.
+        """
+        while self.connected_status and not self._stopped.is_set():
+            while self._replayed:
+                self._dispatch(self._replayed.popleft())
+
+            started = self.metrics.start()
+            try:
+                received, rtm_output = self._read_rtm()
+            except Exception:
+                log.exception("Lost the rtm connection.")
+                return
+            self.metrics.observe("rtm_read_seconds", started)
+
+            if received:
+                self.supervisor.saw_traffic()
+                if rtm_output:
+                    self._dispatch(rtm_output)
+                # rtm_read hands back at most a frame at a time, so only block once the socket has been drained.
+                continue
+
+            now = time.time()
+            if self.supervisor.is_dead(now):
+                log.warning("No reply to ping in {0}s, the rtm connection is dead.".format(app.PONG_TIMEOUT))
+                return
+            if self.supervisor.needs_ping(now):
+                try:
+                    self.slack_client.server.ping()
+                except Exception:
+                    log.exception("Unable to ping slack.")
+                    return
+                self.supervisor.pinged(now)
+            self._wait_for_events()
+
+    def _read_rtm(self):
+        """
+        Reads the next frame from the rtm websocket. Rather than leaving slackclient to decode every event, the raw
+        frame is read and prescanned: events the bot doesn't handle are dropped undecoded, messages which can't be
+        commands only have their channel and timestamps read, and the rest are decoded with the fastest json
+        library available. slackclient's own bookkeeping of channels and users is skipped, doddle keeps its own
+        (see utilities/channelDirectory).
+
+        see:
+        utilities/codec
+
+        :return:
+            tuple -- (received, events) where received is True if the websocket delivered anything at all
+        """
+        read = getattr(self.slack_client.server, "websocket_safe_read", None)
+        if read is None:
+            rtm_output = self.slack_client.rtm_read()
+            return bool(rtm_output), rtm_output
+
+        frames = read()
+        if not frames:
+            return False, []
+        return True, self._decode_frames(frames)
+
+    def _decode_frames(self, frames):
+        """
+        :param frames:
+            str -- raw json events, one per line
+        :return:
+            list -- the decoded events which may need handling
+        """
+        events = []
+        for frame in frames.split("\n"):
+            verdict = self.framePrescan.scan(frame)
+            if verdict == codec.DECODE:
+                try:
+                    events.append(codec.loads(frame))
+                except ValueError:
+                    log.error("Unable to decode rtm frame: {0}".format(frame[:200]))
+            elif verdict == codec.CHATTER:
+                channel, ts, thread_ts = self.framePrescan.message_fields(frame)
+                self.supervisor.saw_message(channel, ts)
+                self.conversations.saw_message(channel, thread_ts)
+        return events
+
+    def _dispatch(self, rtm_output):
+        """
+        Handles every command in a batch of events.
+
+        :param rtm_output:
+            list -- the batch of events
+        :return:
+            nothing.
+        """
+        for command in self._parse_slack_output(rtm_output):
+            if command.text and command.channel:
+                started = self.metrics.start()
+                with self._registry_lock:
+                    self._handle_command(command)
+                self.metrics.observe("handle_seconds", started)
+
+    def _replay_missed_commands(self):
+        """
+        Fetches the messages sent to the most recently active channels since the last one the bot saw in each. The
+        fetched messages are handed to the rtm thread, which handles any commands among them between reads.
+
+        :return:
+            nothing.
+        """
+        for channel, oldest in self.supervisor.replay_points(limit=app.REPLAY_MAX_CHANNELS):
+            if self._stopped.is_set():
+                return
+            try:
+                response = self.api_call(slack_api_constants.CALL_CONVERSATIONS_HISTORY,
+                                         channel=channel,
+                                         oldest=oldest,
+                                         limit=app.REPLAY_LIMIT)
+            except Exception:
+                log.exception("Unable to fetch missed messages for channel: {0}".format(channel))
+                continue
+
+            messages = response.get(slack_api_constants.MESSAGES) or []
+            if not messages:
+                continue
+            log.info("Replaying {0} missed message(s) in channel: {1}".format(len(messages), channel))
+            for message in messages:
+                message.setdefault(slack_api_constants.SLACK_CHANNEL, channel)
+            # history is newest first
+            self._replayed.append(list(reversed(messages)))
+
+    def _wait_for_events(self):
+        """
+        Blocks until the rtm websocket has a frame ready to read instead of sleeping for a fixed interval, so a
+        command is picked up as soon as it arrives. websocket_delay is only used as an upper bound on how long to
+        block on an idle socket, or as a plain sleep when the underlying socket isn't available.
+
+        :return:
+            nothing.
+        """
+        try:
+            sock = self.slack_client.server.websocket.sock
+        except AttributeError:
+            sock = None
+
+        if sock is None:
+            time.sleep(self.websocket_delay)
+            return
+
+        # ssl sockets can already hold decrypted bytes that select() won't report.
+        pending = getattr(sock, "pending", None)
+        if pending and pending():
+            return
+
+        try:
+            select.select([sock], [], [], self.websocket_delay)
+        except (ValueError, select.error, socket.error):
+            log.debug("Unable to wait on rtm websocket, it may have been closed.")
 
     def _parse_slack_output(self, rtm_output):
         """
-        This function parses all messages retrieved from the slack api. It returns a list of space delimited
-        commands if the any of the following criteria are satisfied.
+        This function parses all messages retrieved from the slack api. It is a generator which yields every
+        actionable command in the batch, rather than just the first one, if any of the following criteria are
+        satisfied.
 
         - If the output starts with the action character
         - If the output contains an @mention directed at the bot
         - If a help command is issued
 
+        Each event is classified in a single pass, see utilities/messageClassifier. Duplicates and commands over
+        the per-user/per-channel rate limits are skipped, see utilities/admissionController.
+
         :param rtm_output:
-            list -- the output of a message from the slack api
+            list -- the batch of events read from the slack rtm api
 
         :return:
-            list -- returns a list of space delimited words from the rtm_output
+            generator -- yields a Command (see utilities/commandEvent) for each actionable event in rtm_output
         """
-        output_list = rtm_output
+        if not rtm_output:
+            return
 
-        if output_list and len(output_list) > 0:
+        for output in rtm_output:
+            try:
+                if not output:
+                    continue
 
-            for output in output_list:
-                try:
-                    # Check for action character & help text
-                    if output and slack_api_constants.MESSAGE_TEXT in output \
-                            and self.actionChar in output[slack_api_constants.MESSAGE_TEXT][0]:
-                        if app.HELP_COMMAND_TEXT in output[slack_api_constants.MESSAGE_TEXT]\
-                                .split(self.actionChar)[1]\
-                                .strip():
-                            self.help(output[slack_api_constants.SLACK_USER])
-
-                    # Check for action character
-                    if output and slack_api_constants.MESSAGE_TEXT in output \
-                            and self.actionChar in output[slack_api_constants.MESSAGE_TEXT][0]:
-                        return output[slack_api_constants.MESSAGE_TEXT]\
-                                   .split(self.actionChar)[1]\
-                                   .strip(), output[slack_api_constants.SLACK_CHANNEL]
-
-                    # Check for @mention
-                    elif output and slack_api_constants.MESSAGE_TEXT in output \
-                            and self.at_bot in output[slack_api_constants.MESSAGE_TEXT]:
-                        return output[slack_api_constants.MESSAGE_TEXT]\
-                                   .split(self.at_bot)[1]\
-                                   .strip(), output[slack_api_constants.SLACK_CHANNEL]
-
-                except doddle_exceptions.CommandParseException:
-                    log.error("Unable to parse rtm_output")
-        return None, None
-
-    def _handle_command(self, command, channel):
-        """
-        This function splits the string of text that the bot has decided to process into a space-delimited
-        list of words and then broadcasts the command and channel to all registered plugins.
+                started = self.metrics.start()
+                kind, command = self.classifier.classify(output)
+                self.metrics.observe("parse_seconds", started)
+
+                if kind == messageClassifier.NON_MESSAGE:
+                    event_type = output.get(slack_api_constants.EVENT_TYPE)
+                    if event_type in slack_api_constants.CHANNEL_EVENTS:
+                        self.channelDirectory.handle_event(output)
+                    elif event_type == slack_api_constants.EVENT_GOODBYE:
+                        log.info("Slack is closing the rtm connection.")
+                        self.connected_status = False
+                    continue
+
+                channel = output.get(slack_api_constants.SLACK_CHANNEL)
+                self.supervisor.saw_message(channel, output.get(slack_api_constants.SLACK_TS))
+                self.conversations.saw_message(channel, output.get(slack_api_constants.SLACK_THREAD_TS))
+                if kind == messageClassifier.CHATTER:
+                    continue
+
+                command = commandEvent.Command.from_event(output, command)
+                if not self._admit(command.channel,
+                                   command.user or output.get(slack_api_constants.SLACK_BOT_ID),
+                                   command.ts):
+                    continue
+                if kind == messageClassifier.HELP:
+                    self._send_help(command)
+                yield command
+
+            except doddle_exceptions.CommandParseException:
+                log.error("Unable to parse rtm_output")
+
+    def _send_help(self, command):
+        """
+        Queues the help reply for the channel. The reply is rendered once and cached until a command is registered
+        or removed, see utilities/helpRenderer. "help <topic>" narrows it to one plugin or command verb.
+
+        :param command:
+            Command -- the help command, i.e. "help" or "help <topic>"
+        :return:
+            nothing.
+        """
+        if not command.channel:
+            return
+        parts = command.parts
+        topic = parts[1] if len(parts) > 1 else None
+        messages = self.helpRenderer.render(topic)
+        if messages is None:
+            messages = [app.HELP_UNKNOWN_TOPIC.format(topic)]
+        for message in messages:
+            self.sender.send(command.channel, message)
+
+    def _admit(self, channel, user, ts):
+        """
+        Asks the admission controller whether a command should be handled, counting the ones which are turned away.
+
+        see:
+        utilities/admissionController
+
+        :param channel:
+            string -- the channel id the command was sent in
+        :param user:
+            string -- the id of the user or integration which sent it
+        :param ts:
+            string -- the slack timestamp of the message
+        :return:
+            bool -- True if the command should be handled
+        """
+        verdict = self.admission.admit(channel, user, ts)
+        if verdict == admissionController.ADMITTED:
+            return True
+        if verdict == admissionController.DUPLICATE:
+            log.debug("Ignoring duplicate message %s in channel: %s", ts, channel)
+            self.metrics.increment("commands_rejected", labels=_REJECTED_DUPLICATE)
+        else:
+            log.debug("Throttling command from %s in channel: %s", user, channel)
+            self.metrics.increment("commands_rejected",
+                                   labels=_REJECTED_USER if verdict == admissionController.THROTTLED_USER
+                                   else _REJECTED_CHANNEL)
+        return False
+
+    def _handle_command(self, command):
+        """
+        This function queues the command for the plugins that its first word is routed to. Plugins are run by the
+        dispatcher, off of the rtm thread, in the order commands arrived for each channel. Cacheable commands with
+        a fresh response are answered from the response cache instead.
+
+        The command is only split into its words once a plugin asks for them, see utilities/commandEvent.
 
         See Also:
         utilities/commandParser
 
         :param command:
-            string -- the string of text following the actionChar.
-        :param channel:
-            string -- the channel id that the command was sent from.
+            Command -- the command following the actionChar.
         :return:
-            nothing -- broadcasts channel & parts to all registered plugins
+            nothing -- sends the command to the routed plugins
         """
-        log.debug("Handling command: {0} in channel: {1}".format(command,
-                                                                 channel))
-        parts = command.split()
-        for plugin in self.registered_plugins:
-            plugin.on_command(channel, parts)
+        log.debug("Handling command: %s in channel: %s", command.text, command.channel)
+        verb = command.verb
+        if verb is None:
+            return
+        channel = command.channel
+        for plugin in self.router.route(verb):
+            cacheable = self.responseCache.key_for(plugin, channel, command)
+            if cacheable is None:
+                self.dispatcher.submit(channel, plugin, commandEvent.deliver, plugin, command)
+                continue
+
+            key, ttl = cacheable
+            replies = self.responseCache.get(key)
+            if replies is None:
+                self.dispatcher.submit(channel, plugin, self._run_cacheable, plugin, key, ttl, command)
+            else:
+                # queued behind the channel's other commands, so the replies keep their order
+                self.dispatcher.submit(channel, plugin, self._send_cached, channel, replies)
 
+    def _send_cached(self, channel, replies):
+        """
+        Sends the cached replies to a command again.
 
+        :param channel:
+            str -- the channel id the command was repeated in
+        :param replies:
+            list -- (channel, text, attachments) for every reply, channel being None for the command's channel
+        :return:
+            nothing.
+        """
+        for reply_channel, text, attachments in replies:
+            self.sender.send(channel if reply_channel is None else reply_channel, text, attachments)
 
+    def _run_cacheable(self, plugin, key, ttl, command):
+        """
+        Runs a plugin on a cacheable command, and caches the replies it sends once it returns successfully. Replies
+        to the channel the command came from are cached relative to it, so a response shared across channels is
+        sent back to wherever the command is repeated.
+
+        :param plugin:
+            object -- the plugin
+        :param key:
+            tuple -- the response cache key for the command
+        :param ttl:
+            float -- how long (in seconds) the response may be reused
+        :param command:
+            Command -- the command
+        :return:
+            nothing.
+        """
+        channel = command.channel
+        self._reply_capture.replies = []
+        try:
+            commandEvent.deliver(plugin, command)
+            replies = self._reply_capture.replies
+        finally:
+            self._reply_capture.replies = None
+        # nothing captured usually means the plugin replied from another thread, which can't be replayed
+        if replies:
+            self.responseCache.put(key, [(None if reply_channel == channel else reply_channel, text, attachments)
+                                         for reply_channel, text, attachments in replies], ttl)
@@ -15,23 +15,113 @@ BOT_NAME = "doddle"
 ROOT_LOGGING_IDENTITY = "doddle"
 ENVIRONMENT_VARIABLE_BOT_ID = "BOT_ID"
 ENVIRONMENT_VARIABLE_BOT_TOKEN = "SLACK_BOT_TOKEN"
+# "BOT_ID:TOKEN,BOT_ID:TOKEN", one worker process is run for every workspace listed
+ENVIRONMENT_VARIABLE_BOT_TOKENS = "SLACK_BOT_TOKENS"
 HELP_COMMAND_TEXT = "help"
+HELP_MESSAGE_LENGTH = 3000
+HELP_UNKNOWN_TOPIC = "There are no commands for {0}. Try help on its own for every command."
+
+"""
+CONFIG CONSTANTS
+"""
+
+CONFIG_WATCH_INTERVAL = 5
+CONFIG_SECTION_BOT = "bot"
+CONFIG_OPTION_ACTION_CHARACTER = "action_character"
+CONFIG_OPTION_METRICS_PORT = "metrics_port"
+CONFIG_SECTION_PLUGINS = "plugins"
+CONFIG_OPTION_LAZY_IMPORT = "lazy_import"
+CONFIG_OPTION_PREWARM = "prewarm"
+CONFIG_OPTION_HOT_RELOAD = "hot_reload"
+CONFIG_SECTION_LOGGING = "logging"
+CONFIG_OPTION_LOG_QUEUED = "queued"
+CONFIG_OPTION_LOG_FORMAT = "format"
+CONFIG_OPTION_LOG_MAX_BYTES = "max_bytes"
+CONFIG_OPTION_LOG_BACKUP_COUNT = "backup_count"
+CONFIG_OPTION_LOG_ROTATE_WHEN = "rotate_when"
 
 """
 LOGGING CONSTANTS
 """
 
 LOG_NAME = "doddle.log"
-LOG_CONFIG = "%s(asctime)s - %s(name)s - %s(levelname)s - %(message)s"
+LOG_CONFIG = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_FORMAT_TEXT = "text"
+LOG_FORMAT_JSON = "json"
 LOG_LEVEL = logging.DEBUG
 
 SLACK_API_CLIENT_LOG_LEVEL = logging.DEBUG
 
+"""
+CONNECTION CONSTANTS
+"""
+
+RECONNECT_BASE_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+RECONNECT_STABLE_AFTER = 60
+PING_INTERVAL = 30
+PONG_TIMEOUT = 10
+REPLAY_WINDOW = 300
+REPLAY_LIMIT = 100
+REPLAY_MAX_CHANNELS = 20
+
+"""
+ADMISSION CONSTANTS
+"""
+
+USER_COMMAND_RATE = 0.5
+USER_COMMAND_BURST = 5
+CHANNEL_COMMAND_RATE = 2.0
+CHANNEL_COMMAND_BURST = 10
+DEDUP_WINDOW = 600
+ADMISSION_MAX_KEYS = 10000
+
+"""
+STATE CONSTANTS
+"""
+
+STATE_STORE_PATH = "data/doddle_state.db"
+WORKSPACE_STATE_STORE_PATH = "data/doddle_state.{0}.db"
+STATE_CACHE_SIZE = 10000
+STATE_COMMIT_INTERVAL = 0.05
+
+"""
+SCHEDULER CONSTANTS
+"""
+
+SCHEDULER_MAX_JOBS_PER_PLUGIN = 2
+SCHEDULER_BUSY_DELAY = 1.0
+
+"""
+WORKER CONSTANTS
+"""
+
+WORKER_RESTART_BASE_DELAY = 1
+WORKER_RESTART_MAX_DELAY = 60
+WORKER_STABLE_AFTER = 60
+WORKER_METRICS_INTERVAL = 10
+
 """
 PLUGIN CONSTANTS
 """
 
 RELATIVE_PLUGIN_DIRECTORY_PATH = "plugins/"
+PLUGIN_MANIFEST_PATH = "data/plugin_manifest.json"
+WORKSPACE_PLUGIN_MANIFEST_PATH = "data/plugin_manifest.{0}.json"
+PLUGIN_IMPORT_WORKERS = 4
+# seconds between checks of the plugin directory for changed plugins
+PLUGIN_WATCH_INTERVAL = 2
+
+"""
+CACHE CONSTANTS
+"""
+
+CHANNEL_DIRECTORY_CACHE_PATH = "data/channel_directory.json"
+WORKSPACE_CHANNEL_DIRECTORY_CACHE_PATH = "data/channel_directory.{0}.json"
+RESPONSE_CACHE_SIZE = 1024
+DM_CHANNEL_CACHE_SIZE = 1000
+THREAD_CACHE_SIZE = 256
+THREAD_CACHE_TTL = 300
 
 """
 MISC CONSTANTS
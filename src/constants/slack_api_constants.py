@@ -4,13 +4,47 @@
 
 """
 
+# Endpoints
+WEB_API_URL = "https://slack.com/api/"
+
 # Actions
 CALL_CHANNELS_LIST = "channels.list"
 CALL_CHAT_POST_MESSAGE = "chat.postMessage"
+CALL_CONVERSATIONS_HISTORY = "conversations.history"
+CALL_CONVERSATIONS_OPEN = "conversations.open"
+CALL_CONVERSATIONS_REPLIES = "conversations.replies"
 
 # Terms
 SLACK_CLIENT_NAME = "slackclient"
 CHANNELS = "channels"
 MESSAGE_TEXT = "text"
 SLACK_CHANNEL = "channel"
-SLACK_USER = "user"
\ No newline at end of file
+SLACK_USER = "user"
+SLACK_BOT_ID = "bot_id"
+SLACK_TS = "ts"
+SLACK_THREAD_TS = "thread_ts"
+REPLY_BROADCAST = "reply_broadcast"
+CHANNEL_ID = "id"
+CHANNEL_NAME = "name"
+MESSAGES = "messages"
+RESPONSE_METADATA = "response_metadata"
+NEXT_CURSOR = "next_cursor"
+
+# Events
+EVENT_TYPE = "type"
+EVENT_MESSAGE = "message"
+EVENT_CHANNEL_CREATED = "channel_created"
+EVENT_CHANNEL_RENAME = "channel_rename"
+EVENT_CHANNEL_DELETED = "channel_deleted"
+CHANNEL_EVENTS = (EVENT_CHANNEL_CREATED, EVENT_CHANNEL_RENAME, EVENT_CHANNEL_DELETED)
+EVENT_GOODBYE = "goodbye"
+
+# Responses
+RESPONSE_ERROR = "error"
+RESPONSE_HEADERS = "headers"
+ERROR_RATELIMITED = "ratelimited"
+HEADER_RETRY_AFTER = "retry-after"
+
+# Limits
+CHAT_POST_MESSAGE_RATE = 1.0
+CHAT_POST_MESSAGE_BURST = 3
@@ -48,3 +48,14 @@ class ConfigOptionRetrievalException(Exception):
 
     def __str__(self):
         return repr(self.value)
+
+
+class ScheduleException(Exception):
+    """
+    Raised when a job can't be scheduled, i.e. because of an invalid cron expression.
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return repr(self.value)
@@ -0,0 +1,133 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from src.utilities import tokenBucket
+
+# verdicts
+ADMITTED = 0
+DUPLICATE = 1
+THROTTLED_USER = 2
+THROTTLED_CHANNEL = 3
+
+
+class AdmissionController(object):
+    """
+    The AdmissionController decides whether a command gets dispatched at all. It sits in front of the plugins and
+    turns away:
+
+        - duplicates, a message whose (channel, ts) was already admitted within dedup_window seconds, which rtm
+          redelivery and history replay after a reconnect can both produce
+        - commands from a user, or to a channel, whose token bucket is empty
+
+    Buckets and seen messages are kept in insertion ordered dicts so expiry only ever looks at the oldest entries.
+    A bucket which has refilled to capacity is dropped, since a fresh bucket would behave the same, so memory only
+    grows with the number of keys active recently. max_keys caps each dict regardless.
+
+    Init:
+        :Args:
+            user_rate -- float, commands per second each user may send
+            user_burst -- int, how many commands a user may send at once
+            channel_rate -- float, commands per second each channel may receive
+            channel_burst -- int, how many commands a channel may receive at once
+            dedup_window -- float, how long (in seconds) an admitted message is remembered
+            max_keys -- int, the most users, channels or messages remembered
+    """
+
+    def __init__(self, user_rate=0.5, user_burst=5, channel_rate=2.0, channel_burst=10, dedup_window=600,
+                 max_keys=10000):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.dedup_window = dedup_window
+        self.max_keys = max_keys
+
+        self.admitted = 0
+        self.duplicates = 0
+        self.throttled = 0
+        self._users = OrderedDict()
+        self._channels = OrderedDict()
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, channel, user, ts, now=None):
+        """
+        :param channel:
+            str -- the channel id the command was sent in
+        :param user:
+            str -- the id of the user (or integration) which sent it
+        :param ts:
+            str -- the slack timestamp of the message, None to skip duplicate suppression
+        :param now:
+            float -- the current time, if the caller already has it
+        :return:
+            int -- ADMITTED, DUPLICATE, THROTTLED_USER or THROTTLED_CHANNEL
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire_seen(now)
+            key = (channel, ts)
+            if ts is not None and key in self._seen:
+                self.duplicates += 1
+                return DUPLICATE
+
+            user_bucket = self._bucket(self._users, user, self.user_rate, self.user_burst, now)
+            if user_bucket.wait_time(1, now):
+                self.throttled += 1
+                return THROTTLED_USER
+            channel_bucket = self._bucket(self._channels, channel, self.channel_rate, self.channel_burst, now)
+            if channel_bucket.wait_time(1, now):
+                self.throttled += 1
+                return THROTTLED_CHANNEL
+
+            user_bucket.consume(1, now)
+            channel_bucket.consume(1, now)
+            if ts is not None:
+                self._seen[key] = now
+                if len(self._seen) > self.max_keys:
+                    self._seen.popitem(last=False)
+            self.admitted += 1
+            return ADMITTED
+
+    def stats(self):
+        """
+        :return:
+            dict -- admitted, duplicate and throttled command counts, and how many users, channels and messages are
+                    currently remembered
+        """
+        with self._lock:
+            return {"admitted": self.admitted,
+                    "duplicates": self.duplicates,
+                    "throttled": self.throttled,
+                    "users": len(self._users),
+                    "channels": len(self._channels),
+                    "seen": len(self._seen)}
+
+    def _bucket(self, buckets, key, rate, burst, now):
+        bucket = buckets.pop(key, None)
+        if bucket is None:
+            bucket = tokenBucket.TokenBucket(rate, burst)
+            bucket.updated = now
+        # most recently used last, so the idle buckets are at the front
+        buckets[key] = bucket
+
+        while len(buckets) > 1:
+            oldest_key = next(iter(buckets))
+            if len(buckets) <= self.max_keys and not buckets[oldest_key].is_full(now):
+                break
+            del buckets[oldest_key]
+        return bucket
+
+    def _expire_seen(self, now):
+        oldest = now - self.dedup_window
+        while self._seen:
+            key = next(iter(self._seen))
+            if self._seen[key] >= oldest:
+                break
+            del self._seen[key]
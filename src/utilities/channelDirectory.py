@@ -0,0 +1,207 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import json
+import logging
+import threading
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from src.constants import slack_api_constants
+
+log = logging.getLogger("doddle.util.channelDirectory")
+
+
+class ChannelDirectory(Mapping):
+    """
+    A directory of slack channels which maps human readable names to channel ids, and ids back to names, in O(1).
+
+    It behaves like the plain {name: id} dictionary the client used to hand out, with id_for/name_for for explicit
+    lookups in either direction. The directory is built from cursor-paginated channels.list calls, persisted to disk
+    so that the next start is warm, and kept current from rtm channel events.
+
+    Init:
+        :Args:
+            cache_path -- str, where the directory is persisted, or None to keep it in memory only
+            page_size -- int, channels requested per channels.list page
+            save_delay -- float, seconds to wait after a change before persisting, so bursts are written once
+    """
+
+    def __init__(self, cache_path=None, page_size=1000, save_delay=5):
+        self.cache_path = cache_path
+        self.page_size = page_size
+        self.save_delay = save_delay
+        self._by_name = {}
+        self._by_id = {}
+        self._lock = threading.Lock()
+        # events seen while a build is running, replayed onto the result
+        self._replay = None
+        self._save_timer = None
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __iter__(self):
+        return iter(self._by_name)
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def id_for(self, name):
+        """
+        :param name:
+            str -- a channel name, without the leading #
+        :return:
+            str -- the channel id, or None if the channel isn't known
+        """
+        return self._by_name.get(name)
+
+    def name_for(self, channel_id):
+        """
+        :param channel_id:
+            str -- a channel id
+        :return:
+            str -- the channel name, or None if the channel isn't known
+        """
+        return self._by_id.get(channel_id)
+
+    def load(self):
+        """
+        Loads the directory persisted by a previous run.
+
+        :return:
+            bool -- True if a cached directory was loaded
+        """
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path) as cache_file:
+                by_id = json.load(cache_file)
+        except (IOError, ValueError):
+            log.info("No usable channel directory cache at {0}".format(self.cache_path))
+            return False
+
+        self._swap(by_id)
+        log.info("Loaded {0} channels from {1}".format(len(by_id), self.cache_path))
+        return True
+
+    def build(self, api_call):
+        """
+        Rebuilds the directory one page of channels.list at a time, then swaps it in and persists it. Channel events
+        which arrive while the build runs are applied on top of the result.
+
+        :param api_call:
+            callable -- api_call(method, **kwargs) returning the decoded slack response
+        :return:
+            bool -- True if every page was read
+        """
+        with self._lock:
+            self._replay = []
+
+        by_id = {}
+        cursor = None
+        complete = True
+        while True:
+            kwargs = {"limit": self.page_size, "exclude_archived": "true", "exclude_members": "true"}
+            if cursor:
+                kwargs["cursor"] = cursor
+            response = api_call(slack_api_constants.CALL_CHANNELS_LIST, **kwargs)
+            if not response or not response.get("ok", True) or slack_api_constants.CHANNELS not in response:
+                log.error("Unable to read channel list page: {0}".format(
+                    response.get(slack_api_constants.RESPONSE_ERROR) if response else None))
+                complete = False
+                break
+
+            for channel in response[slack_api_constants.CHANNELS]:
+                by_id[channel[slack_api_constants.CHANNEL_ID]] = channel[slack_api_constants.CHANNEL_NAME]
+
+            cursor = (response.get(slack_api_constants.RESPONSE_METADATA) or {}).get(
+                slack_api_constants.NEXT_CURSOR)
+            if not cursor:
+                break
+
+        with self._lock:
+            replay, self._replay = self._replay, None
+            if not complete:
+                # keep what we had rather than replace it with part of the list
+                return False
+        self._swap(by_id)
+        for event in replay:
+            self.handle_event(event)
+        self.save()
+        return True
+
+    def handle_event(self, event):
+        """
+        Applies a channel_created, channel_rename or channel_deleted rtm event.
+
+        :param event:
+            dict -- the rtm event
+        :return:
+            bool -- True if the event changed the directory
+        """
+        event_type = event.get(slack_api_constants.EVENT_TYPE)
+        channel = event.get(slack_api_constants.SLACK_CHANNEL)
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(event)
+
+            if event_type in (slack_api_constants.EVENT_CHANNEL_CREATED, slack_api_constants.EVENT_CHANNEL_RENAME):
+                channel_id = channel[slack_api_constants.CHANNEL_ID]
+                name = channel[slack_api_constants.CHANNEL_NAME]
+                old_name = self._by_id.get(channel_id)
+                if old_name is not None and self._by_name.get(old_name) == channel_id:
+                    del self._by_name[old_name]
+                self._by_id[channel_id] = name
+                self._by_name[name] = channel_id
+            elif event_type == slack_api_constants.EVENT_CHANNEL_DELETED:
+                name = self._by_id.pop(channel, None)
+                if name is None:
+                    return False
+                if self._by_name.get(name) == channel:
+                    del self._by_name[name]
+            else:
+                return False
+
+        log.debug("Channel directory updated by {0}".format(event_type))
+        self._schedule_save()
+        return True
+
+    def save(self):
+        """
+        Persists the directory.
+
+        :return:
+            None
+        """
+        if not self.cache_path:
+            return
+        with self._lock:
+            by_id = dict(self._by_id)
+            self._save_timer = None
+        try:
+            with open(self.cache_path, "w") as cache_file:
+                json.dump(by_id, cache_file)
+        except IOError:
+            log.error("Unable to write channel directory cache {0}".format(self.cache_path))
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._save_timer is not None or not self.cache_path:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _swap(self, by_id):
+        by_name = dict((name, channel_id) for channel_id, name in by_id.items())
+        with self._lock:
+            self._by_id = by_id
+            self._by_name = by_name
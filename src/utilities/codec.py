@@ -0,0 +1,172 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import json
+import logging
+import re
+
+from src.constants import slack_api_constants
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+log = logging.getLogger("doddle.util.codec")
+
+# frame verdicts, see FramePrescan
+SKIP = 0
+CHATTER = 1
+DECODE = 2
+
+
+def _orjson_dumps(value):
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+def _json_loads(text):
+    if isinstance(text, bytes) and not isinstance(text, str):
+        text = text.decode("utf-8")
+    return json.loads(text)
+
+
+# the fastest first, every one of them decodes to the same python objects
+_BACKENDS = [("orjson", orjson and orjson.loads, orjson and _orjson_dumps),
+             ("ujson", ujson and ujson.loads, ujson and ujson.dumps),
+             ("json", _json_loads, json.dumps)]
+
+BACKEND = None
+loads = None
+dumps = None
+
+
+def use(name=None):
+    """
+    Picks the json library every frame and api payload is encoded and decoded with.
+
+    :param name:
+        str -- "orjson", "ujson" or "json", None for the fastest one installed
+    :return:
+        str -- the library in use
+    """
+    global BACKEND, loads, dumps
+    for backend, backend_loads, backend_dumps in _BACKENDS:
+        if backend_loads is not None and (name is None or name == backend):
+            BACKEND, loads, dumps = backend, backend_loads, backend_dumps
+            log.debug("Encoding json with " + backend)
+            return backend
+    raise ValueError("json library isn't available: {0}".format(name))
+
+
+use()
+
+
+class FramePrescan(object):
+    """
+    Looks at a raw rtm frame before it is decoded, so frames the bot has no use for never are:
+
+        - SKIP: events of a type the client doesn't handle (typing indicators, presence changes, pongs...)
+        - CHATTER: messages which can't be commands, because neither an action character starts any text in them
+          nor is the bot mentioned anywhere. The client only needs their channel and timestamps, which
+          message_fields reads straight from the frame.
+        - DECODE: everything else
+
+    Frames are only scanned on the rtm thread, the counts of skipped frames and chatter aren't locked.
+
+    The scan is conservative, a frame which merely might be a command is decoded and classified as usual (see
+    utilities/messageClassifier), so the worst a misjudged frame costs is a decode.
+
+    Init:
+        :Args:
+            action_characters -- str or list, every character which marks the start of a command
+            mentions -- list, the strings which address the bot, i.e. "<@U123>"
+            event_types -- list, every event type besides messages the client handles
+    """
+
+    __slots__ = ("skipped", "chatter", "_handled", "_commands", "_type_key", "_message", "_channel", "_ts",
+                 "_thread_ts_key", "_thread_ts")
+
+    def __init__(self, action_characters, mentions, event_types=()):
+        self.skipped = 0
+        self.chatter = 0
+        self._handled = tuple('"{0}"'.format(event_type)
+                              for event_type in (slack_api_constants.EVENT_MESSAGE,) + tuple(event_types))
+
+        # plain substrings rather than patterns, in both the raw and the json escaped spelling and with or without
+        # a space after the colon, since slack doesn't always encode the same way
+        commands = set()
+        for character in action_characters or ():
+            for spelling in (character, json.dumps(character)[1:-1]):
+                for separator in _SEPARATORS:
+                    commands.add('"{0}"{1}"{2}'.format(slack_api_constants.MESSAGE_TEXT, separator, spelling))
+        for mention in mentions:
+            if mention:
+                commands.update((mention, json.dumps(mention)[1:-1]))
+        self._commands = tuple(commands)
+
+        self._type_key = '"{0}"'.format(slack_api_constants.EVENT_TYPE)
+        self._message = tuple('"{0}"{1}"{2}"'.format(slack_api_constants.EVENT_TYPE, separator,
+                                                      slack_api_constants.EVENT_MESSAGE) for separator in _SEPARATORS)
+        self._channel = self._field(slack_api_constants.SLACK_CHANNEL)
+        self._ts = self._field(slack_api_constants.SLACK_TS)
+        self._thread_ts_key = '"{0}"'.format(slack_api_constants.SLACK_THREAD_TS)
+        self._thread_ts = self._field(slack_api_constants.SLACK_THREAD_TS)
+
+    @staticmethod
+    def _field(name):
+        # escaped quotes inside strings are preceded by a backslash, so this only matches real keys
+        return re.compile(r'"{0}"\s*:\s*"([^"\\]+)"'.format(re.escape(name)))
+
+    def scan(self, frame):
+        """
+        :param frame:
+            str -- one raw json event
+        :return:
+            int -- SKIP, CHATTER or DECODE
+        """
+        for event_type in self._handled:
+            if event_type in frame:
+                break
+        else:
+            self.skipped += 1
+            return SKIP
+
+        # objects nested in an event have types too (blocks, the item of a reaction...), the event's own type is
+        # only known for certain when it comes first
+        if not frame.startswith(self._message, frame.find(self._type_key)):
+            return DECODE
+        for command in self._commands:
+            if command in frame:
+                return DECODE
+        self.chatter += 1
+        return CHATTER
+
+    def message_fields(self, frame):
+        """
+        :param frame:
+            str -- a raw message frame
+        :return:
+            tuple -- (channel, ts, thread_ts), any of which may be None. Frames quoting other messages carry more
+                     than one ts, the newest is the frame's own.
+        """
+        channel = self._channel.search(frame)
+        timestamps = self._ts.findall(frame)
+        if len(timestamps) > 1:
+            try:
+                timestamps.sort(key=float)
+            except ValueError:
+                pass
+        thread_ts = self._thread_ts.search(frame) if self._thread_ts_key in frame else None
+        return channel.group(1) if channel else None, \
+            timestamps[-1] if timestamps else None, \
+            thread_ts.group(1) if thread_ts else None
+
+
+# json encoders put nothing or a space between a key and its value
+_SEPARATORS = (":", ": ")
@@ -0,0 +1,133 @@
+"""
+:date: 10/17/2026
+
+"""
+
+from src.constants import slack_api_constants
+
+# channel and user ids repeat across every event, one copy of each is shared by all the commands which carry it
+_ids = {}
+_MAX_IDS = 100000
+
+
+def intern_id(value):
+    """
+    :param value:
+        str -- a slack id, or None
+    :return:
+        str -- the shared copy of the id
+    """
+    if value is None:
+        return None
+    shared = _ids.get(value)
+    if shared is None:
+        if len(_ids) >= _MAX_IDS:
+            _ids.clear()
+        shared = _ids.setdefault(value, value)
+    return shared
+
+
+class Command(object):
+    """
+    A command for the bot, built once from the rtm event it arrived in and handed to every plugin it is routed to.
+    Only what the pipeline and the plugins use is kept, so the event itself can be released as soon as the command
+    is built.
+
+    The words of the command are only split when something first asks for them, and a command parsed against the
+    same options twice (see Client.parse_command) is only parsed once.
+
+    Init:
+        :Args:
+            text -- str, the command text following the action character or mention
+            channel -- str, the channel id the command was sent in
+            user -- str, the id of the user which sent it
+            ts -- str, the slack timestamp of the message
+            thread_ts -- str, the thread the message was posted in, if any
+    """
+
+    __slots__ = ("text", "channel", "user", "ts", "thread_ts", "_parts", "_parsed")
+
+    def __init__(self, text, channel, user=None, ts=None, thread_ts=None):
+        self.text = text
+        self.channel = intern_id(channel)
+        self.user = intern_id(user)
+        self.ts = ts
+        self.thread_ts = thread_ts
+        self._parts = None
+        self._parsed = None
+
+    @classmethod
+    def from_event(cls, event, text):
+        """
+        :param event:
+            dict -- the decoded rtm event
+        :param text:
+            str -- the command text the classifier pulled out of it
+        :return:
+            Command -- the command
+        """
+        get = event.get
+        return cls(text,
+                   get(slack_api_constants.SLACK_CHANNEL),
+                   get(slack_api_constants.SLACK_USER),
+                   get(slack_api_constants.SLACK_TS),
+                   get(slack_api_constants.SLACK_THREAD_TS))
+
+    @property
+    def parts(self):
+        """
+        :return:
+            list -- the space-delimited words of the command
+        """
+        if self._parts is None:
+            self._parts = self.text.split()
+        return self._parts
+
+    @property
+    def verb(self):
+        """
+        :return:
+            str -- the first word of the command, or None if it is empty
+        """
+        if self._parts is not None:
+            return self._parts[0] if self._parts else None
+        words = self.text.split(None, 1)
+        return words[0] if words else None
+
+    def parse(self, parser, options):
+        """
+        :param parser:
+            CommandParser -- the parser
+        :param options:
+            dict or CompiledOptions -- the options to parse the command against
+        :return:
+            dict -- the parsed command
+        """
+        parsed = self._parsed
+        if parsed is not None and parsed[0] is options:
+            return parsed[1]
+        result = parser.parse_command(options, self.parts)
+        self._parsed = (options, result)
+        return result
+
+    def __repr__(self):
+        return "Command({0!r}, channel={1!r}, user={2!r})".format(self.text, self.channel, self.user)
+
+
+def deliver(plugin, command):
+    """
+    Hands a command to a plugin. Plugins which define handle_command(command) are given the Command, older plugins
+    are called with on_command(channel, parts) as before.
+
+    :param plugin:
+        object -- the plugin
+    :param command:
+        Command -- the command
+    :return:
+        None
+    """
+    handler = getattr(plugin, "handle_command", None)
+    if handler is not None:
+        handler(command)
+    else:
+        plugin.on_command(command.channel, command.parts)
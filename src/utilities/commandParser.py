@@ -4,6 +4,13 @@
 
 """
 
+import collections
+import threading
+
+WILDCARD_KEY = "wildcard%d"
+DEFAULT_CACHE_SIZE = 256
+
+
 class commandParser:
 
 
@@ -16,11 +23,27 @@ class commandParser:
             :Args:
                 None
         """
+        self._compiled = {}
 
-    def parse_command(self, option, parts):
+    def compile_options(self, option, cache_size=DEFAULT_CACHE_SIZE):
         """
+        Compiles a plugin supplied options dictionary into a CompiledOptions grammar. Plugins should compile their
+        options once and hand the result to parse_command rather than the raw dictionary.
+
         :param option:
             dict -- the plugin supplied dictionary containing valid options & values
+        :param cache_size:
+            int -- how many parsed commands the grammar remembers
+        :return:
+            CompiledOptions -- the compiled grammar
+        """
+        return CompiledOptions(option, cache_size)
+
+    def parse_command(self, option, parts):
+        """
+        :param option:
+            dict or CompiledOptions -- the plugin supplied dictionary containing valid options & values, or the
+                                       grammar compiled from it by compile_options
         :param parts:
             list -- each space delimited word from the initial command split into a list
         :return:
@@ -40,28 +63,95 @@ class commandParser:
 
         >> {'wildcard1': 'meaninglessInput', 'command': 'start', 'target': 'machine1'}
         """
-        parsed_commands = {}
-        tmp_dict = {}
-        tmp_known_values = []
-        tmp_known_keys = []
-
-        # Integer i keeps track of parsed wildcard options
-        i = 0
-
-        for command, options in option.items():
-            parsed_commands.update({command: ''.join(set(option).intersection(parts))})
-        tmp_dict.update({'wildcard': list(set(parsed_commands).symmetric_difference(parts))})
-
-        for key, value in parsed_commands.items():
-            tmp_known_values.append(value)
-            tmp_known_keys.append(key)
-
-        tmp_wild = set(parsed_commands).symmetric_difference(parts)
-
-        tmp_list = [x for x in tmp_wild if x not in tmp_known_values]
-        final_tmp_list = [x for x in tmp_list if x not in tmp_known_keys]
-
-        for item in final_tmp_list:
-            parsed_commands.update({'wildcard%d' % i: item})
+        if not isinstance(option, CompiledOptions):
+            option = self._compiled_for(option)
+        return option.parse(parts)
+
+    def _compiled_for(self, option):
+        # raw dictionaries are compiled once and looked up by their contents afterwards
+        signature = tuple((key, tuple(values)) for key, values in option.items())
+        compiled = self._compiled.get(signature)
+        if compiled is None:
+            if len(self._compiled) >= DEFAULT_CACHE_SIZE:
+                self._compiled.clear()
+            compiled = CompiledOptions(option)
+            self._compiled[signature] = compiled
+        return compiled
+
+
+class CompiledOptions(object):
+    """
+    An immutable grammar compiled from a plugin's options dictionary. A reverse index from each value to the
+    option it belongs to is built once, so parsing a command is a single pass over its parts.
+
+    Every option key is present in the parsed result, with an empty string if no part matched it. Parts which match
+    no option, or whose option has already been matched, are returned as wildcard1, wildcard2, ... in the order
+    they appear in the command.
+
+    Results for recently parsed commands are kept in an LRU cache.
+
+    Init:
+        :Args:
+            option -- dict, the plugin supplied dictionary containing valid options & values
+            cache_size -- int, how many parsed commands to remember
+    """
+
+    __slots__ = ("_keys", "_index", "_cache", "_cache_size", "_lock")
+
+    def __init__(self, option, cache_size=DEFAULT_CACHE_SIZE):
+        index = {}
+        for key, values in option.items():
+            for value in values:
+                # the first option to claim a value owns it
+                index.setdefault(value, key)
+
+        object.__setattr__(self, "_keys", tuple(option))
+        object.__setattr__(self, "_index", index)
+        object.__setattr__(self, "_cache", collections.OrderedDict())
+        object.__setattr__(self, "_cache_size", cache_size)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledOptions is immutable")
+
+    @property
+    def keys(self):
+        """
+        :return:
+            tuple -- the option keys of the grammar
+        """
+        return self._keys
 
-        return parsed_commands
+    def parse(self, parts):
+        """
+        :param parts:
+            list -- each space delimited word from the initial command split into a list
+        :return:
+            dict -- returns a dictionary with matched options & values
+        """
+        signature = tuple(parts)
+        with self._lock:
+            parsed = self._cache.get(signature)
+            if parsed is not None:
+                self._cache.pop(signature)
+                self._cache[signature] = parsed
+                return dict(parsed)
+
+        parsed = dict.fromkeys(self._keys, '')
+        matched = set()
+        wildcards = 0
+        for part in parts:
+            key = self._index.get(part)
+            if key is not None and key not in matched:
+                matched.add(key)
+                parsed[key] = part
+            else:
+                wildcards += 1
+                parsed[WILDCARD_KEY % wildcards] = part
+
+        if self._cache_size > 0:
+            with self._lock:
+                self._cache[signature] = parsed
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return dict(parsed)
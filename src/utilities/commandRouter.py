@@ -0,0 +1,103 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import threading
+
+
+class CommandRouter(object):
+    """
+    The CommandRouter maps the first word of a command (the verb) to the plugins which own it, so a command is only
+    handed to the plugins that declared it rather than being broadcast to every registered plugin.
+
+    Plugins that don't declare any verbs are kept in a catch-all list and still receive every command.
+
+    Lookups never take the lock; the index values are tuples which are replaced, not mutated, when the routing
+    table changes.
+
+    Init:
+        :Args:
+            None
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}
+        self._catch_all = ()
+
+    def add(self, plugin, verbs=None):
+        """
+        Adds a plugin to the routing table.
+
+        :param plugin:
+            object -- the plugin instance
+        :param verbs:
+            list -- the command verbs the plugin owns. If empty or None the plugin receives every command.
+        :return:
+            None -- changes state
+        """
+        with self._lock:
+            if not verbs:
+                if plugin not in self._catch_all:
+                    self._catch_all = self._catch_all + (plugin,)
+                return
+
+            for verb in verbs:
+                verb = self.normalize(verb)
+                plugins = self._index.get(verb, ())
+                if plugin not in plugins:
+                    self._index[verb] = plugins + (plugin,)
+
+            # once a plugin owns verbs it no longer needs to see everything
+            if plugin in self._catch_all:
+                self._catch_all = tuple(p for p in self._catch_all if p is not plugin)
+
+    def remove(self, plugin):
+        """
+        Removes a plugin, and every verb it owns, from the routing table.
+
+        :param plugin:
+            object -- the plugin instance
+        :return:
+            None -- changes state
+        """
+        with self._lock:
+            self._catch_all = tuple(p for p in self._catch_all if p is not plugin)
+            for verb, plugins in list(self._index.items()):
+                remaining = tuple(p for p in plugins if p is not plugin)
+                if remaining:
+                    self._index[verb] = remaining
+                else:
+                    del self._index[verb]
+
+    def route(self, verb):
+        """
+        :param verb:
+            str -- the first word of the command
+        :return:
+            tuple -- the plugins owning the verb followed by the catch-all plugins
+        """
+        owners = self._index.get(self.normalize(verb), ())
+        if not owners:
+            return self._catch_all
+        return owners + self._catch_all
+
+    def verbs_for(self, plugin):
+        """
+        :param plugin:
+            object -- the plugin instance
+        :return:
+            list -- the verbs routed to the plugin, empty if the plugin is a catch-all
+        """
+        return [verb for verb, plugins in self._index.items() if plugin in plugins]
+
+    @staticmethod
+    def normalize(verb):
+        """
+        :param verb:
+            str -- a command verb
+        :return:
+            str -- the verb as it is stored in the index
+        """
+        return verb.strip().lower() if verb else ""
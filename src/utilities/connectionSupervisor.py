@@ -0,0 +1,155 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import random
+import threading
+import time
+
+
+class ConnectionSupervisor(object):
+    """
+    The ConnectionSupervisor holds the state the client needs to keep its rtm connection alive:
+
+        - jittered exponential backoff between connection attempts, so an outage isn't met with a flood of
+          rtm.connect calls. A connection which drops before it has been up for stable_after seconds counts as a
+          failed attempt too, so one which opens and drops straight away backs off like one which can't be made
+        - liveness, the connection is pinged after ping_interval seconds of silence and considered dropped if
+          nothing (not even the pong) comes back within pong_timeout
+        - the ts of the last message seen in each channel, so that commands sent while the bot was disconnected can
+          be replayed from history once it is back
+
+    Init:
+        :Args:
+            base_delay -- float, the backoff ceiling after the first failed attempt, in seconds
+            max_delay -- float, the largest backoff ceiling, in seconds
+            ping_interval -- float, seconds of silence before the connection is pinged
+            pong_timeout -- float, seconds to wait for any traffic after a ping
+            replay_window -- float, how far back (in seconds) missed messages are replayed
+            max_channels -- int, the most channels whose last message is remembered
+            stable_after -- float, seconds a connection has to stay up before the backoff is reset
+    """
+
+    def __init__(self, base_delay=1, max_delay=60, ping_interval=30, pong_timeout=10, replay_window=300,
+                 max_channels=500, stable_after=60):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.ping_interval = ping_interval
+        self.pong_timeout = pong_timeout
+        self.replay_window = replay_window
+        self.max_channels = max_channels
+        self.stable_after = stable_after
+
+        self.attempts = 0
+        self.connected_at = None
+        self.last_seen = time.time()
+        self.last_ping = None
+        self._last_ts = {}
+        self._lock = threading.Lock()
+
+    def next_delay(self):
+        """
+        Registers a failed connection attempt.
+
+        :return:
+            float -- seconds to wait before the next attempt
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** self.attempts))
+        self.attempts += 1
+        return random.uniform(ceiling / 2.0, ceiling)
+
+    def connected(self, now=None):
+        """
+        Registers a successful connection, resetting the liveness state. The backoff is only reset once the
+        connection has stayed up, see disconnected().
+
+        :return:
+            None
+        """
+        self.connected_at = self.last_seen = time.time() if now is None else now
+        self.last_ping = None
+
+    def disconnected(self, now=None):
+        """
+        Registers that the connection dropped. The backoff starts over if it had been up for stable_after seconds,
+        otherwise the drop counts as another failed attempt.
+
+        :return:
+            float -- seconds to wait before reconnecting
+        """
+        now = time.time() if now is None else now
+        if self.connected_at is not None and now - self.connected_at >= self.stable_after:
+            self.attempts = 0
+        self.connected_at = None
+        return self.next_delay()
+
+    def saw_traffic(self, now=None):
+        """
+        Registers that the connection delivered something, which proves it is alive.
+
+        :return:
+            None
+        """
+        self.last_seen = time.time() if now is None else now
+        self.last_ping = None
+
+    def needs_ping(self, now):
+        """
+        :param now:
+            float -- the current time
+        :return:
+            bool -- True if the connection has been quiet long enough to ping
+        """
+        return self.last_ping is None and now - self.last_seen >= self.ping_interval
+
+    def pinged(self, now):
+        """
+        :param now:
+            float -- when the ping was sent
+        :return:
+            None
+        """
+        self.last_ping = now
+
+    def is_dead(self, now):
+        """
+        :param now:
+            float -- the current time
+        :return:
+            bool -- True if a ping went unanswered for longer than pong_timeout
+        """
+        return self.last_ping is not None and now - self.last_ping >= self.pong_timeout
+
+    def saw_message(self, channel, ts):
+        """
+        Remembers the newest message seen in a channel.
+
+        :param channel:
+            str -- the channel id
+        :param ts:
+            str -- the slack timestamp of the message
+        :return:
+            None
+        """
+        if not channel or not ts:
+            return
+        self._last_ts[channel] = ts
+        if len(self._last_ts) > self.max_channels:
+            with self._lock:
+                newest = sorted(self._last_ts.items(), key=lambda item: float(item[1]), reverse=True)
+                self._last_ts = dict(newest[:self.max_channels])
+
+    def replay_points(self, now=None, limit=None):
+        """
+        :param now:
+            float -- the current time
+        :param limit:
+            int -- the most channels to replay, the most recently active first
+        :return:
+            list -- (channel, ts) for every channel with a message inside the replay window, to replay after ts
+        """
+        oldest = (time.time() if now is None else now) - self.replay_window
+        points = [(channel, ts) for channel, ts in list(self._last_ts.items()) if float(ts) >= oldest]
+        points.sort(key=lambda point: float(point[1]), reverse=True)
+        return points if limit is None else points[:limit]
@@ -0,0 +1,181 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent import futures
+
+from src.constants import slack_api_constants
+
+log = logging.getLogger("doddle.util.conversations")
+
+
+class Conversations(object):
+    """
+    Caches the conversation lookups plugins need to reply in threads and direct messages, so that a reply costs at
+    most one web api round trip:
+
+        - the direct message channel of each user, opened with conversations.open the first time it is needed and
+          remembered after that
+        - the messages of a thread, read a page of conversations.replies at a time. Threads are kept for thread_ttl
+          seconds, or until the rtm connection delivers a new message in the thread. Several threads can be fetched
+          at once with threads(), which reads the ones that aren't cached concurrently.
+
+    Both caches are LRU and bounded.
+
+    Init:
+        :Args:
+            api_call -- callable, api_call(method, **kwargs) returning the decoded slack response
+            dm_cache_size -- int, the most users whose direct message channel is remembered
+            thread_cache_size -- int, the most threads kept
+            thread_ttl -- float, how long (in seconds) a cached thread is served
+            page_size -- int, the messages asked for per conversations.replies call
+            max_workers -- int, the most threads fetched at once
+    """
+
+    def __init__(self, api_call, dm_cache_size=1000, thread_cache_size=256, thread_ttl=300, page_size=200,
+                 max_workers=4):
+        self.api_call = api_call
+        self.dm_cache_size = dm_cache_size
+        self.thread_cache_size = thread_cache_size
+        self.thread_ttl = thread_ttl
+        self.page_size = page_size
+        self.max_workers = max_workers
+
+        self.dm_hits = 0
+        self.thread_hits = 0
+        self.fetches = 0
+        self._dm_channels = OrderedDict()
+        self._threads = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def dm_channel(self, user):
+        """
+        :param user:
+            str -- the user id
+        :return:
+            str -- the id of the direct message channel with the user, or None if it couldn't be opened
+        """
+        with self._lock:
+            channel = self._dm_channels.pop(user, None)
+            if channel is not None:
+                self._dm_channels[user] = channel
+                self.dm_hits += 1
+                return channel
+
+        response = self.api_call(slack_api_constants.CALL_CONVERSATIONS_OPEN, users=user)
+        channel = ((response or {}).get(slack_api_constants.SLACK_CHANNEL) or {}).get(slack_api_constants.CHANNEL_ID)
+        if channel is None:
+            log.error("Unable to open a direct message with {0}: {1}".format(
+                user, (response or {}).get(slack_api_constants.RESPONSE_ERROR)))
+            return None
+
+        with self._lock:
+            self._dm_channels[user] = channel
+            while len(self._dm_channels) > self.dm_cache_size:
+                self._dm_channels.popitem(last=False)
+        return channel
+
+    def thread(self, channel, thread_ts):
+        """
+        :param channel:
+            str -- the channel id the thread is in
+        :param thread_ts:
+            str -- the ts of the thread's parent message
+        :return:
+            list -- every message in the thread, parent first, or None if it couldn't be read
+        """
+        key = (channel, thread_ts)
+        now = time.time()
+        with self._lock:
+            entry = self._threads.pop(key, None)
+            if entry is not None and entry[0] > now:
+                self._threads[key] = entry
+                self.thread_hits += 1
+                return entry[1]
+
+        messages = self._fetch(channel, thread_ts)
+        if messages is not None:
+            with self._lock:
+                self._threads[key] = (now + self.thread_ttl, messages)
+                while len(self._threads) > self.thread_cache_size:
+                    self._threads.popitem(last=False)
+        return messages
+
+    def threads(self, channel, thread_timestamps):
+        """
+        Reads several threads of a channel, fetching the ones which aren't cached concurrently.
+
+        :param channel:
+            str -- the channel id the threads are in
+        :param thread_timestamps:
+            list -- the ts of each thread's parent message
+        :return:
+            dict -- the messages of each thread (None if it couldn't be read), by thread ts
+        """
+        thread_timestamps = list(OrderedDict.fromkeys(thread_timestamps))
+        if len(thread_timestamps) <= 1:
+            return dict((ts, self.thread(channel, ts)) for ts in thread_timestamps)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(self.max_workers)
+        pending = dict((ts, self._executor.submit(self.thread, channel, ts)) for ts in thread_timestamps)
+        return dict((ts, future.result()) for ts, future in pending.items())
+
+    def saw_message(self, channel, thread_ts):
+        """
+        Forgets a cached thread once a new message arrives in it.
+
+        :param channel:
+            str -- the channel id
+        :param thread_ts:
+            str -- the thread the message was posted in
+        :return:
+            None
+        """
+        if thread_ts is not None and self._threads:
+            with self._lock:
+                self._threads.pop((channel, thread_ts), None)
+
+    def stats(self):
+        """
+        :return:
+            dict -- cache hits, conversations.replies calls and the size of each cache
+        """
+        with self._lock:
+            return {"dm_hits": self.dm_hits,
+                    "dm_channels": len(self._dm_channels),
+                    "thread_hits": self.thread_hits,
+                    "thread_fetches": self.fetches,
+                    "threads": len(self._threads)}
+
+    def _fetch(self, channel, thread_ts):
+        messages = []
+        cursor = None
+        while True:
+            kwargs = {"channel": channel, "ts": thread_ts, "limit": self.page_size}
+            if cursor:
+                kwargs["cursor"] = cursor
+            try:
+                response = self.api_call(slack_api_constants.CALL_CONVERSATIONS_REPLIES, **kwargs)
+            except Exception:
+                log.exception("Unable to read thread {0} in channel: {1}".format(thread_ts, channel))
+                return None
+            with self._lock:
+                self.fetches += 1
+            if not response or not response.get("ok", True):
+                log.error("Unable to read thread {0} in channel: {1}: {2}".format(
+                    thread_ts, channel, (response or {}).get(slack_api_constants.RESPONSE_ERROR)))
+                return None
+
+            messages.extend(response.get(slack_api_constants.MESSAGES) or [])
+            cursor = (response.get(slack_api_constants.RESPONSE_METADATA) or {}).get(
+                slack_api_constants.NEXT_CURSOR)
+            if not cursor:
+                return messages
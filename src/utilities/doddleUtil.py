@@ -6,22 +6,46 @@
 
 import os
 import logging
-import ConfigParser
+import threading
+try:
+    import ConfigParser as configparser
+except ImportError:
+    import configparser
+
+from src.constants import app
+from src import doddle_exceptions
 
 log = logging.getLogger("doddle.util.doddleUtil")
 
+BOOLEAN_STATES = {"1": True, "yes": True, "true": True, "on": True,
+                  "0": False, "no": False, "false": False, "off": False}
+
 
 class DoddleUtil(object):
     """
     The doddleUtil currently only handles loading & reading the configuration file for the bot
 
+    The config file is parsed once into an in-memory snapshot and every read is served from it. A background watcher
+    (see start_watcher) replaces the snapshot whenever the file changes on disk, and writes defaults which were
+    handed to get_option back to the file in batches, so neither happens on the message path.
+
+    When several processes share the config file only one of them may write to it, the others are created with
+    write_defaults off and keep their defaults in memory.
+
     Init:
         :Args:
-            None
+            write_defaults -- bool, whether defaults handed to get_option are written to the config file
     """
 
-    def __init__(self):
+    def __init__(self, write_defaults=True):
         self.config_path = os.path.abspath('data/' + app.CONFIG_NAME)
+        self.write_defaults = write_defaults
+        self.snapshot = ConfigSnapshot({})
+        self._mtime = None
+        self._pending_defaults = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stopped = threading.Event()
 
         log.info("Using config " + self.config_path)
 
@@ -31,8 +55,35 @@ class DoddleUtil(object):
         :returns:
             None
         """
-        self.bot_config = ConfigParser.ConfigParser()
-        self.bot_config.read(self.config_path)
+        self.reload()
+
+    def reload(self):
+        """
+        Re-reads the config file and atomically swaps in the new snapshot.
+
+        :return:
+            bool -- True if the file was read
+        """
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            log.error("Unable to stat config {0}".format(self.config_path))
+            return False
+
+        bot_config = configparser.ConfigParser()
+        bot_config.read(self.config_path)
+        sections = {}
+        for section in bot_config.sections():
+            sections[section] = dict(bot_config.items(section))
+
+        with self._lock:
+            # defaults which haven't been written yet still need to be visible
+            for (section, option), value in self._pending_defaults.items():
+                sections.setdefault(section, {}).setdefault(option.lower(), value)
+            self.snapshot = ConfigSnapshot(sections)
+            self._mtime = mtime
+        log.debug("Loaded config {0}".format(self.config_path))
+        return True
 
     def read_config(self, section):
         """
@@ -42,47 +93,190 @@ class DoddleUtil(object):
         :return:
             dict -- returns a dictionary with the key specified and values from the doddle config file.
         """
+        return dict(self.snapshot.sections.get(section, {}))
 
-        section_dict = {}
-
-        try:
-            options = self.appConfig.options(section)
-        except IOError:
-            log.error("encountered an error reading config, %s" % IOError.message)
-
-        for option in options:
-            try:
-                section_dict[option] = self.appConfig.get(section, option)
-                if section_dict[option] == -1:
-                    log.debug("skipping option: %s" % option)
-            except:
-                log.error("error reading option %s" % option)
-
-        return section_dict
-
-    def get_option(self, section, option, default=None):
+    def get_option(self, section, option, default=None, option_type=str):
         """
         :param section:
             str -- pointing to the relevant section of the config
         :param option:
             str -- pointing to the relevant subsection of the config
         :param default:
+            object -- coerced to option_type and returned, and queued to be written to the config, if the option is
+                      missing
+        :param option_type:
+            type -- one of str, int, float, bool or list. The coerced value is cached with the snapshot.
 
         :return:
             returns the resulting object from the config (string, dictionary, list, etc)
+        :raises:
+            ConfigOptionRetrievalException -- if the value can't be coerced to option_type
 
         :example:
 
-        >>>
+        >>> util.get_option("bot", "websocket_delay", "1", int)
+        1
+        """
+        snapshot = self.snapshot
+        try:
+            return snapshot.get(section, option, option_type)
+        except KeyError:
+            pass
+        except ValueError:
+            raise doddle_exceptions.ConfigOptionRetrievalException(
+                "{0} {1} is not a valid {2}".format(section, option, option_type.__name__))
+
+        log.info("No option {0} {1}, queueing the default to be written to the config".format(section, option))
+        if default is None:
+            return None
+
+        raw = ", ".join(str(item) for item in default) if isinstance(default, (list, tuple)) else str(default)
+        try:
+            value = coerce(raw, option_type)
+        except ValueError:
+            raise doddle_exceptions.ConfigOptionRetrievalException(
+                "The default of {0} {1} is not a valid {2}".format(section, option, option_type.__name__))
+
+        with self._lock:
+            if self.write_defaults:
+                self._pending_defaults[(section, option)] = raw
+            self.snapshot = self.snapshot.with_option(section, option, raw)
+        return value
+
+    def start_watcher(self, interval=app.CONFIG_WATCH_INTERVAL):
+        """
+        Starts a daemon thread which reloads the snapshot when the config file changes and flushes queued defaults
+        to disk.
+
+        :param interval:
+            int -- seconds between checks of the config file
+        :return:
+            None
+        """
+        if self._watcher is not None:
+            return
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="doddle-config-watcher")
+        self._watcher.daemon = True
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """
+        Stops the watcher thread after a final flush of queued defaults.
+
+        :return:
+            None
+        """
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def flush_defaults(self):
+        """
+        Writes every queued default to the config file in a single write.
+
+        :return:
+            None
         """
+        with self._lock:
+            pending = self._pending_defaults
+            self._pending_defaults = {}
+        if not pending:
+            return
+
+        bot_config = configparser.ConfigParser()
+        bot_config.read(self.config_path)
+        for (section, option), value in pending.items():
+            if not bot_config.has_section(section):
+                bot_config.add_section(section)
+            if not bot_config.has_option(section, option):
+                bot_config.set(section, option, value)
         try:
-            value = self.bot_config.get(section, option)
-        except ConfigParser.NoOptionError:
-            log.error("Encountered no option error %s" % ConfigParser.NoOptionError.message)
-            log.info("No option provided, adding the default to the config, write and return default")
-            if default:
-                self.bot_config.set(section, option, default)
-                self.bot_config.write(open(self.configfile, "w"))
-            value = default
+            with open(self.config_path, "w") as config_file:
+                bot_config.write(config_file)
+            log.info("Wrote {0} default(s) to {1}".format(len(pending), self.config_path))
+        except IOError:
+            log.error("Unable to write defaults to config {0}".format(self.config_path))
+
+    def _watch(self, interval):
+        while not self._stopped.wait(interval):
+            self.flush_defaults()
+            try:
+                mtime = os.path.getmtime(self.config_path)
+            except OSError:
+                continue
+            if mtime != self._mtime:
+                self.reload()
+        self.flush_defaults()
+
+
+class ConfigSnapshot(object):
+    """
+    An immutable view of the parsed config. Coerced values are cached the first time they are asked for, and a new
+    snapshot (with an empty cache) replaces this one whenever the config changes.
+
+    Init:
+        :Args:
+            sections -- dict, section name to a dict of option/value strings
+    """
+
+    __slots__ = ("sections", "_typed")
 
+    def __init__(self, sections):
+        self.sections = sections
+        self._typed = {}
+
+    def get(self, section, option, option_type=str):
+        """
+        :param section:
+            str -- the section of the config
+        :param option:
+            str -- the option within the section
+        :param option_type:
+            type -- one of str, int, float, bool or list
+        :return:
+            object -- the coerced value
+        :raises:
+            KeyError -- if the option isn't in the config
+        """
+        key = (section, option, option_type)
+        try:
+            return self._typed[key]
+        except KeyError:
+            pass
+
+        value = coerce(self.sections[section][option.lower()], option_type)
+        self._typed[key] = value
         return value
+
+    def with_option(self, section, option, value):
+        """
+        :return:
+            ConfigSnapshot -- a copy of this snapshot with the option added
+        """
+        sections = dict(self.sections)
+        sections[section] = dict(sections.get(section, {}))
+        sections[section][option.lower()] = value
+        return ConfigSnapshot(sections)
+
+
+def coerce(value, option_type):
+    """
+    Coerces a raw config string into the requested type.
+
+    :param value:
+        str -- the raw value from the config file
+    :param option_type:
+        type -- one of str, int, float, bool or list. Lists are comma separated.
+    :return:
+        object -- the coerced value
+    """
+    if option_type is bool:
+        try:
+            return BOOLEAN_STATES[value.strip().lower()]
+        except KeyError:
+            raise ValueError("Not a boolean: {0}".format(value))
+    if option_type is list:
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return option_type(value)
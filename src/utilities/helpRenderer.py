@@ -0,0 +1,136 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import threading
+
+from src.utilities import commandRouter
+
+
+class HelpRenderer(object):
+    """
+    Renders the help reply from the registered commands. The reply is built once, already split into messages no
+    longer than max_length, and kept until a command is registered or removed, so answering help is a dict lookup
+    however many commands there are.
+
+    "help <topic>" narrows the reply to the commands of one plugin (by class or module name) or one command verb.
+    The topics are indexed when the reply is rendered.
+
+    Init:
+        :Args:
+            action_character -- str, the character commands start with, shown in front of every example
+            max_length -- int, the longest message the reply is split into
+    """
+
+    def __init__(self, action_character, max_length=3000):
+        self.action_character = action_character
+        self.max_length = max_length
+        self._entries = {}
+        self._index = None
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def add(self, example, about, owner=None):
+        """
+        :param example:
+            str -- an example of the command, i.e. "restart <machine>"
+        :param about:
+            str -- a description of the command
+        :param owner:
+            object -- the plugin which provides the command
+        :return:
+            None
+        """
+        with self._lock:
+            self._entries[example] = (about, owner)
+            self._invalidate()
+
+    def remove(self, owner):
+        """
+        Removes every command a plugin provides.
+
+        :param owner:
+            object -- the plugin
+        :return:
+            list -- the examples of the commands removed
+        """
+        with self._lock:
+            removed = [example for example, (about, entry_owner) in self._entries.items() if entry_owner is owner]
+            for example in removed:
+                del self._entries[example]
+            if removed:
+                self._invalidate()
+            return removed
+
+    def entries(self, owner):
+        """
+        :param owner:
+            object -- the plugin
+        :return:
+            list -- (example, about) for every command the plugin provides
+        """
+        with self._lock:
+            return [(example, about) for example, (about, entry_owner) in self._entries.items()
+                    if entry_owner is owner]
+
+    def render(self, topic=None):
+        """
+        :param topic:
+            str -- a plugin name or command verb to narrow the reply to, None for every command
+        :return:
+            tuple -- the messages of the reply, or None if nothing matches the topic
+        """
+        key = commandRouter.CommandRouter.normalize(topic) if topic else None
+        rendered = self._rendered.get(key)
+        if rendered is not None:
+            return rendered
+
+        with self._lock:
+            if self._index is None:
+                self._index = self._build_index()
+            examples = sorted(self._entries) if key is None else self._index.get(key)
+            if examples is None:
+                # unknown topics aren't cached, anyone can ask for any number of them
+                return None
+            title = "*Commands*" if key is None else "*Commands for {0}*".format(key)
+            rendered = self._chunk([title] + ["{0}{1} -- {2}".format(self.action_character, example,
+                                                                      self._entries[example][0])
+                                              for example in examples])
+            self._rendered[key] = rendered
+            return rendered
+
+    def _invalidate(self):
+        self._index = None
+        self._rendered = {}
+
+    def _build_index(self):
+        index = {}
+        for example in sorted(self._entries):
+            owner = self._entries[example][1]
+            topics = example.split()[:1]
+            if owner is not None:
+                # a stand-in (see utilities/pluginLoader) names the plugin it stands in for
+                topics += getattr(owner, "help_topics", None) or [type(owner).__name__,
+                                                                  type(owner).__module__.split(".")[-1]]
+            for topic in set(commandRouter.CommandRouter.normalize(topic) for topic in topics):
+                index.setdefault(topic, []).append(example)
+        return index
+
+    def _chunk(self, lines):
+        chunks = []
+        current = ""
+        for line in lines:
+            while len(line) > self.max_length:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(line[:self.max_length])
+                line = line[self.max_length:]
+            if current and len(current) + 1 + len(line) > self.max_length:
+                chunks.append(current)
+                current = ""
+            current = current + "\n" + line if current else line
+        if current:
+            chunks.append(current)
+        return tuple(chunks)
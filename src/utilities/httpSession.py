@@ -0,0 +1,114 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.constants import slack_api_constants
+from src.utilities import codec
+
+log = logging.getLogger("doddle.util.httpSession")
+
+
+class SlackHttpSession(object):
+    """
+    The SlackHttpSession makes slack web api calls over a single pooled, keep-alive HTTP session, so that replies
+    reuse open connections rather than paying for a new TCP & TLS handshake on every call.
+
+    Responses are decoded the same way slackclient's api_call decodes them, including the "headers" key, so it can
+    be used in its place.
+
+    Init:
+        :Args:
+            token -- str, the slack token
+            pool_size -- int, the most connections kept open to slack
+            timeout -- float, seconds to wait on a response before giving up
+            base_url -- str, the web api url methods are appended to
+    """
+
+    def __init__(self, token, pool_size=10, timeout=10, base_url=slack_api_constants.WEB_API_URL):
+        self.token = token
+        self.timeout = timeout
+        self.base_url = base_url
+
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({"Authorization": "Bearer {0}".format(token)})
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def api_call(self, method, timeout=None, **kwargs):
+        """
+        Calls a slack web api method.
+
+        :param method:
+            str -- the api method, i.e. "chat.postMessage"
+        :param timeout:
+            float -- overrides the session timeout for this call
+        :param kwargs:
+            the arguments for the api method. Lists and dicts are sent json encoded.
+        :return:
+            dict -- the decoded response, with the HTTP response headers under "headers"
+        """
+        for key, value in kwargs.items():
+            if isinstance(value, (list, dict)):
+                kwargs[key] = codec.dumps(value)
+
+        with self._lock:
+            self.calls += 1
+        try:
+            response = self.session.post(self.base_url + method,
+                                         data=kwargs,
+                                         timeout=timeout or self.timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            raise
+
+        result = {}
+        if response.text:
+            try:
+                result = codec.loads(response.content)
+            except ValueError:
+                log.error("Unable to decode response for {0}: HTTP {1}".format(method, response.status_code))
+                result = {"ok": False, slack_api_constants.RESPONSE_ERROR: "invalid_response"}
+        result[slack_api_constants.RESPONSE_HEADERS] = dict(response.headers)
+        return result
+
+    def stats(self):
+        """
+        :return:
+            dict -- api calls made, connections opened and how many requests reused an open connection
+        """
+        connections = 0
+        requests_sent = 0
+        pools = self.adapter.poolmanager.pools
+        # the pool container can't be iterated directly, only by key
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        return {"calls": self.calls,
+                "errors": self.errors,
+                "connections": connections,
+                "reused": max(requests_sent - connections, 0)}
+
+    def close(self):
+        """
+        Closes every pooled connection.
+
+        :return:
+            None
+        """
+        self.session.close()
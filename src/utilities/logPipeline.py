@@ -0,0 +1,156 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import json
+import logging
+import logging.handlers
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# attributes every LogRecord has, anything else was passed through extra= and belongs in the json output
+RECORD_ATTRIBUTES = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | frozenset(["message"])
+
+
+class QueueHandler(logging.Handler):
+    """
+    Hands log records to a queue instead of writing them, so logging on the rtm thread never waits on the disk.
+
+    Unlike the standard library's QueueHandler the record isn't formatted here; the message is only built by the
+    QueueListener's background thread, and only if a handler there actually wants the record.
+
+    Records bound for another process have to be pickled, and their arguments and traceback may not be, so with
+    prepare the message is built before the record is queued.
+
+    Init:
+        :Args:
+            log_queue -- Queue, the queue the QueueListener reads from
+            prepare -- bool, format the message and traceback into the record before queueing it
+    """
+
+    def __init__(self, log_queue, prepare=False):
+        logging.Handler.__init__(self)
+        self.queue = log_queue
+        self.prepare = prepare
+
+    def emit(self, record):
+        try:
+            if self.prepare:
+                record = self._prepare(record)
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # never block the caller, dropping a record is better than stalling the bot
+            pass
+        except Exception:
+            self.handleError(record)
+
+    @staticmethod
+    def _prepare(record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class QueueListener(object):
+    """
+    Writes records taken off a queue to its handlers from a background thread.
+
+    Init:
+        :Args:
+            handlers -- list, the handlers records are written to
+            max_size -- int, the most records which may be waiting, 0 for no limit
+    """
+
+    _STOP = None
+
+    def __init__(self, handlers, max_size=10000):
+        self.queue = queue.Queue(max_size)
+        self.handlers = list(handlers)
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the writer thread.
+
+        :return:
+            None
+        """
+        self._thread = threading.Thread(target=self._run, name="doddle-log-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Writes everything already queued and stops the writer thread.
+
+        :return:
+            None
+        """
+        if self._thread is None:
+            return
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.flush()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is self._STOP:
+                return
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single line of json, for log shippers which expect structured logs. Anything passed
+    through extra= is included as its own field.
+    """
+
+    def format(self, record):
+        entry = {"time": self.formatTime(record),
+                 "level": record.levelname,
+                 "logger": record.name,
+                 "thread": record.threadName,
+                 "message": record.getMessage()}
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def file_handler(path, max_bytes=0, backup_count=0, when=None):
+    """
+    Builds the handler for the log file.
+
+    :param path:
+        str -- the log file
+    :param max_bytes:
+        int -- rotate once the file reaches this size, 0 to never rotate on size
+    :param backup_count:
+        int -- how many rotated files to keep
+    :param when:
+        str -- rotate on time instead of size, i.e. "midnight" or "h". See TimedRotatingFileHandler.
+    :return:
+        Handler -- the file handler
+    """
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backup_count)
+    if max_bytes:
+        return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+    return logging.FileHandler(path)
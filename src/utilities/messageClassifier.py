@@ -0,0 +1,70 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import re
+
+from src.constants import app
+from src.constants import slack_api_constants
+
+# classifications
+NON_MESSAGE = 0
+CHATTER = 1
+ACTION = 2
+HELP = 3
+MENTION = 4
+
+
+class MessageClassifier(object):
+    """
+    The MessageClassifier decides, in a single pass over an rtm event, whether it is a command for the bot and pulls
+    the command text out of it.
+
+    Commands either start with one of the action characters or @mention the bot (or one of its aliases) anywhere in
+    the text. The first character is checked before anything else, so the common case of channel chatter that isn't
+    for the bot only costs one compiled search for the mentions.
+
+    Init:
+        :Args:
+            action_characters -- str or list, every character which marks the start of a command
+            mentions -- list, the strings which address the bot, i.e. "<@U123>"
+    """
+
+    __slots__ = ("action_characters", "mentions", "_mention_pattern")
+
+    def __init__(self, action_characters, mentions):
+        self.action_characters = frozenset(action_characters or ())
+        self.mentions = tuple(mention for mention in mentions if mention)
+        pattern = "|".join(re.escape(mention) for mention in sorted(self.mentions, key=len, reverse=True))
+        self._mention_pattern = re.compile(pattern) if pattern else None
+
+    def classify(self, event):
+        """
+        :param event:
+            dict -- a decoded rtm event
+        :return:
+            tuple -- (classification, command) where command is the stripped text following the action character
+                     or mention, or None if the event isn't a command
+        """
+        text = event.get(slack_api_constants.MESSAGE_TEXT)
+        if text is None:
+            return NON_MESSAGE, None
+        if not text:
+            return CHATTER, None
+
+        if text[0] in self.action_characters:
+            command = text[1:].strip()
+            kind = ACTION
+        else:
+            match = self._mention_pattern.search(text) if self._mention_pattern else None
+            if match is None:
+                return CHATTER, None
+            command = text[match.end():].strip()
+            kind = MENTION
+
+        if command.startswith(app.HELP_COMMAND_TEXT):
+            following = command[len(app.HELP_COMMAND_TEXT):len(app.HELP_COMMAND_TEXT) + 1]
+            if not following or following.isspace():
+                return HELP, command
+        return kind, command
@@ -0,0 +1,258 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import bisect
+import logging
+import random
+import threading
+import time
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+log = logging.getLogger("doddle.util.metrics")
+
+METRIC_PREFIX = "doddle_"
+# seconds, from a fast dict lookup to a slow web api call
+DEFAULT_BUCKETS = (0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class Metrics(object):
+    """
+    An in-process registry of counters, gauges and latency histograms for the bot.
+
+    Timing is sampled: start() only returns a start time for a random sample_rate fraction of calls, and observe()
+    ignores the calls which weren't sampled, which keeps the cost of instrumenting the message loop negligible. The
+    sample is random rather than every nth call so that stages timed in a fixed rotation are all sampled. Counters
+    are always exact.
+
+    Every metric can carry labels, passed as a tuple of (name, value) pairs so they can be built once and reused.
+
+    Init:
+        :Args:
+            sample_rate -- float, the fraction of timed calls which are actually measured
+            buckets -- tuple, the upper bounds (in seconds) of the histogram buckets
+    """
+
+    def __init__(self, sample_rate=0.1, buckets=DEFAULT_BUCKETS):
+        self.sample_rate = sample_rate
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._random = random.random
+
+    def start(self):
+        """
+        :return:
+            float -- the start time if this call is sampled, otherwise None
+        """
+        if self._random() >= self.sample_rate:
+            return None
+        return time.time()
+
+    def observe(self, name, started, labels=()):
+        """
+        Records the time since a sampled start().
+
+        :param name:
+            str -- the histogram name
+        :param started:
+            float -- what start() returned
+        :param labels:
+            tuple -- (name, value) label pairs
+        :return:
+            None
+        """
+        if started is None:
+            return
+        self.observe_value(name, time.time() - started, labels)
+
+    def observe_value(self, name, value, labels=()):
+        """
+        Records a value in a histogram, regardless of sampling.
+
+        :param name:
+            str -- the histogram name
+        :param value:
+            float -- the value, in seconds for latencies
+        :param labels:
+            tuple -- (name, value) label pairs
+        :return:
+            None
+        """
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, labels=()):
+        """
+        :param name:
+            str -- the counter name
+        :param amount:
+            int -- how much to add
+        :param labels:
+            tuple -- (name, value) label pairs
+        :return:
+            None
+        """
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, name, read, labels=()):
+        """
+        Registers a gauge, which is read when metrics are collected rather than being updated.
+
+        :param name:
+            str -- the gauge name
+        :param read:
+            callable -- returns the current value
+        :param labels:
+            tuple -- (name, value) label pairs
+        :return:
+            None
+        """
+        with self._lock:
+            self._gauges[(name, labels)] = read
+
+    def snapshot(self):
+        """
+        :return:
+            dict -- {"counters": {...}, "gauges": {...}, "histograms": {...}}, keyed by (name, labels)
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict((key, histogram.copy()) for key, histogram in self._histograms.items())
+
+        gauge_values = {}
+        for key, read in gauges.items():
+            try:
+                gauge_values[key] = read()
+            except Exception:
+                log.exception("Unable to read gauge {0}".format(key[0]))
+        return {"counters": counters,
+                "gauges": gauge_values,
+                "histograms": dict((key, histogram.summary()) for key, histogram in histograms.items())}
+
+    def render_prometheus(self):
+        """
+        :return:
+            str -- every metric in the prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            lines.append("{0}{1}_total{2} {3}".format(METRIC_PREFIX, name, _labels(labels), value))
+        for (name, labels), value in sorted(snapshot["gauges"].items()):
+            lines.append("{0}{1}{2} {3}".format(METRIC_PREFIX, name, _labels(labels), value))
+        for (name, labels), summary in sorted(snapshot["histograms"].items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, summary["buckets"]):
+                cumulative += count
+                lines.append("{0}{1}_bucket{2} {3}".format(METRIC_PREFIX, name,
+                                                           _labels(labels + (("le", repr(bound)),)), cumulative))
+            lines.append("{0}{1}_bucket{2} {3}".format(METRIC_PREFIX, name,
+                                                       _labels(labels + (("le", "+Inf"),)), summary["count"]))
+            lines.append("{0}{1}_sum{2} {3}".format(METRIC_PREFIX, name, _labels(labels), summary["sum"]))
+            lines.append("{0}{1}_count{2} {3}".format(METRIC_PREFIX, name, _labels(labels), summary["count"]))
+        return "\n".join(lines) + "\n"
+
+
+class Histogram(object):
+    """
+    Counts observations into fixed buckets, plus an overflow bucket.
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.bounds)
+        histogram.counts = list(self.counts)
+        histogram.total = self.total
+        histogram.count = self.count
+        return histogram
+
+    def summary(self):
+        """
+        :return:
+            dict -- per-bucket counts (not cumulative), the sum and the count of observations
+        """
+        return {"buckets": list(self.counts[:-1]), "sum": self.total, "count": self.count}
+
+
+class MetricsServer(object):
+    """
+    Serves metrics in the prometheus text format from a daemon thread.
+
+    Init:
+        :Args:
+            metrics -- Metrics, the registry to serve
+            port -- int, the port to listen on
+            host -- str, the address to bind, local only by default
+    """
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        registry = metrics
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug(format, *args)
+
+        self.server = HTTPServer((host, port), MetricsHandler)
+        self._thread = None
+
+    def start(self):
+        """
+        :return:
+            None
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name="doddle-metrics-server")
+        self._thread.daemon = True
+        self._thread.start()
+        log.info("Serving metrics on http://{0}:{1}/metrics".format(*self.server.server_address[:2]))
+
+    def stop(self):
+        """
+        :return:
+            None
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{0}="{1}"'.format(name, str(value).replace('"', '\\"')) for name, value in labels) + "}"
@@ -0,0 +1,274 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import collections
+import logging
+import threading
+import time
+from concurrent import futures
+
+from src.constants import slack_api_constants
+from src.utilities import tokenBucket
+
+log = logging.getLogger("doddle.util.outboundSender")
+
+
+class OutboundSender(object):
+    """
+    The OutboundSender posts messages to slack from a background thread, so replying never blocks the caller.
+
+    Each channel has its own queue and token bucket, which keeps the bot under slack's per-channel message rate
+    limit. When slack answers with "ratelimited" the channel is paused for the Retry-After period and the message is
+    retried. Optionally, short plain-text messages queued for the same channel are coalesced into a single post.
+
+    Init:
+        :Args:
+            api_call -- callable, api_call(method, **kwargs) returning the decoded slack response
+            rate -- float, messages per second allowed for each channel
+            burst -- int, how many messages a channel may send back to back
+            coalesce -- bool, merge queued plain-text messages to a channel into one post
+            max_coalesced_length -- int, the longest text a coalesced post may have
+            max_retries -- int, how many times a rate limited message is retried before it fails
+            metrics -- Metrics, optional, records how long each post takes
+    """
+
+    def __init__(self, api_call, rate=1.0, burst=3, coalesce=True, max_coalesced_length=3000, max_retries=5,
+                 metrics=None):
+        self.api_call = api_call
+        self.metrics = metrics
+        self.rate = rate
+        self.burst = burst
+        self.coalesce = coalesce
+        self.max_coalesced_length = max_coalesced_length
+        self.max_retries = max_retries
+
+        self._condition = threading.Condition()
+        self._channels = collections.OrderedDict()
+        self._pending = 0
+        self._thread = None
+        self._stopped = False
+
+        self.sent = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    def send(self, channel, text, attachments=None, **kwargs):
+        """
+        Queues a message for a channel.
+
+        :param channel:
+            str -- the channel id to post to
+        :param text:
+            str -- the message text
+        :param attachments:
+            str -- json encoded message attachments
+        :param kwargs:
+            any other chat.postMessage arguments
+        :return:
+            Future -- resolves to the slack response once the message has been posted. Once the sender has been
+                      stopped the message is not queued and the future has already failed.
+        """
+        message = OutboundMessage(channel, text, attachments, kwargs)
+        with self._condition:
+            if self._stopped:
+                log.warning("The outbound sender has been stopped, dropping message to channel: {0}".format(channel))
+                self.failed += 1
+                message.future.set_exception(RuntimeError("the outbound sender has been stopped"))
+                return message.future
+            if self._thread is None:
+                self._start()
+            queue = self._channels.get(channel)
+            if queue is None:
+                queue = ChannelQueue(tokenBucket.TokenBucket(self.rate, self.burst))
+                self._channels[channel] = queue
+            queue.messages.append(message)
+            self._pending += 1
+            self._condition.notify()
+        return message.future
+
+    def pending(self):
+        """
+        :return:
+            int -- the number of messages waiting to be posted
+        """
+        return self._pending
+
+    def stats(self):
+        """
+        :return:
+            dict -- sender counters
+        """
+        return {"pending": self._pending,
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "rate_limited": self.rate_limited,
+                "failed": self.failed}
+
+    def stop(self):
+        """
+        Stops the sender thread once the messages already queued have been posted. Messages sent afterwards are
+        rejected.
+
+        :return:
+            None
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="doddle-outbound-sender")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batch, wait = self._next_batch()
+                while batch is None:
+                    if self._stopped and not self._pending:
+                        return
+                    self._condition.wait(wait)
+                    batch, wait = self._next_batch()
+            self._post(*batch)
+
+    def _next_batch(self):
+        """
+        Picks the next channel allowed to post and takes its messages off the queue. Must hold the condition.
+
+        :return:
+            tuple -- ((channel, messages), None) or (None, seconds to wait before trying again)
+        """
+        now = time.time()
+        wait = None
+        for channel, queue in list(self._channels.items()):
+            if not queue.messages:
+                # forget channels which are idle and fully refilled
+                if queue.bucket.is_full(now):
+                    del self._channels[channel]
+                continue
+
+            delay = max(queue.blocked_until - now, queue.bucket.wait_time(1, now))
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+
+            queue.bucket.consume(1, now)
+            messages = [queue.messages.popleft()]
+            if self.coalesce and messages[0].is_plain():
+                length = len(messages[0].text or "")
+                while queue.messages and queue.messages[0].is_plain():
+                    length += len(queue.messages[0].text or "") + 1
+                    if length > self.max_coalesced_length:
+                        break
+                    messages.append(queue.messages.popleft())
+            self._pending -= len(messages)
+
+            # round robin, so a busy channel can't starve the others
+            self._channels.pop(channel)
+            self._channels[channel] = queue
+            return (channel, messages), None
+        return None, wait
+
+    def _post(self, channel, messages):
+        head = messages[0]
+        kwargs = dict(head.kwargs)
+        if head.attachments:
+            kwargs["attachments"] = head.attachments
+        text = "\n".join(message.text or "" for message in messages)
+
+        started = self.metrics.start() if self.metrics else None
+        try:
+            response = self.api_call(slack_api_constants.CALL_CHAT_POST_MESSAGE,
+                                     channel=channel,
+                                     text=text,
+                                     as_user=True,
+                                     **kwargs)
+        except Exception as e:
+            log.exception("Unable to post message to channel: {0}".format(channel))
+            self.failed += len(messages)
+            for message in messages:
+                message.future.set_exception(e)
+            return
+
+        if self.metrics:
+            self.metrics.observe("reply_seconds", started)
+
+        if response and response.get(slack_api_constants.RESPONSE_ERROR) == slack_api_constants.ERROR_RATELIMITED:
+            self._retry(channel, messages, response)
+            return
+
+        self.sent += 1
+        self.coalesced += len(messages) - 1
+        for message in messages:
+            message.future.set_result(response)
+
+    def _retry(self, channel, messages, response):
+        headers = dict((key.lower(), value) for key, value in
+                       (response.get(slack_api_constants.RESPONSE_HEADERS) or {}).items())
+        try:
+            retry_after = float(headers.get(slack_api_constants.HEADER_RETRY_AFTER, 1))
+        except (TypeError, ValueError):
+            retry_after = 1.0
+        log.warning("Rate limited posting to channel: {0}, retrying in {1}s".format(channel, retry_after))
+        self.rate_limited += 1
+
+        retry = []
+        for message in messages:
+            message.attempts += 1
+            if message.attempts > self.max_retries:
+                self.failed += 1
+                message.future.set_result(response)
+            else:
+                retry.append(message)
+
+        with self._condition:
+            queue = self._channels.get(channel)
+            if queue is None:
+                queue = ChannelQueue(tokenBucket.TokenBucket(self.rate, self.burst))
+                self._channels[channel] = queue
+            queue.blocked_until = time.time() + retry_after
+            queue.messages.extendleft(reversed(retry))
+            self._pending += len(retry)
+            self._condition.notify()
+
+
+class ChannelQueue(object):
+    """
+    The messages waiting for a channel, and the channel's rate limit state.
+    """
+
+    __slots__ = ("messages", "bucket", "blocked_until")
+
+    def __init__(self, bucket):
+        self.messages = collections.deque()
+        self.bucket = bucket
+        self.blocked_until = 0.0
+
+
+class OutboundMessage(object):
+    """
+    A message waiting to be posted, and the future its sender is holding.
+    """
+
+    __slots__ = ("channel", "text", "attachments", "kwargs", "future", "attempts")
+
+    def __init__(self, channel, text, attachments, kwargs):
+        self.channel = channel
+        self.text = text
+        self.attachments = attachments
+        self.kwargs = kwargs
+        self.future = futures.Future()
+        self.attempts = 0
+
+    def is_plain(self):
+        """
+        :return:
+            bool -- True if the message is only text, and so can be coalesced with others
+        """
+        return not self.attachments and not self.kwargs
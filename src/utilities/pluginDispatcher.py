@@ -0,0 +1,209 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import collections
+import logging
+import threading
+import time
+from concurrent import futures
+
+log = logging.getLogger("doddle.util.pluginDispatcher")
+
+DEFAULT_POOL = "default"
+
+
+class PluginDispatcher(object):
+    """
+    The PluginDispatcher runs plugin work off of the rtm thread so a slow plugin can't stop the bot from reading
+    messages.
+
+    Work is queued per channel and each channel is drained by one runner at a time, which keeps replies within a
+    channel in the order the commands arrived while different channels proceed in parallel. The total number of
+    queued tasks is bounded; once the bound is reached new tasks are dropped and counted instead of queueing up
+    behind a stuck plugin.
+
+    A plugin can tune how it is run by setting attributes on itself:
+        :dispatch_timeout:
+            float -- seconds to wait on the plugin before moving on to the next task for the channel
+        :dispatch_pool:
+            str -- the name of a dedicated worker pool, to keep slow or cpu-heavy plugins away from the rest
+
+    Init:
+        :Args:
+            max_workers -- int, the number of worker threads per pool
+            max_queue -- int, the most tasks which may be waiting across all channels
+            timeout -- float, the default per-plugin timeout in seconds
+            metrics -- Metrics, optional, records per-plugin latency, errors and timeouts
+    """
+
+    def __init__(self, max_workers=8, max_queue=256, timeout=30, metrics=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._channels = {}
+        self._pending = 0
+        # work queued or running for each plugin, timed out work counts until it really finishes
+        self._in_flight = {}
+        self._pools = {}
+        # the channel runners only wait on plugin futures, they never run plugin code themselves
+        self._runners = futures.ThreadPoolExecutor(max_workers)
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.timed_out = 0
+        self.errors = 0
+
+    def submit(self, channel, plugin, fn, *args):
+        """
+        Queues fn(*args) to run for a plugin, after any work already queued for the channel.
+
+        :param channel:
+            str -- the channel id the work belongs to, used to keep replies in order
+        :param plugin:
+            object -- the plugin the work is run on behalf of
+        :param fn:
+            callable -- the work to run
+        :return:
+            bool -- False if the queue is full and the task was dropped
+        """
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.dropped += 1
+                log.warning("Dispatch queue is full, dropping command for {0} in channel: {1}".format(
+                    type(plugin).__name__, channel))
+                return False
+
+            self._pending += 1
+            self.submitted += 1
+            self._in_flight[plugin] = self._in_flight.get(plugin, 0) + 1
+            tasks = self._channels.get(channel)
+            if tasks is not None:
+                tasks.append((plugin, fn, args))
+                return True
+            self._channels[channel] = collections.deque([(plugin, fn, args)])
+
+        self._runners.submit(self._drain, channel)
+        return True
+
+    def wait_idle(self, plugin, timeout):
+        """
+        Blocks until nothing is queued or running for a plugin.
+
+        :param plugin:
+            object -- the plugin
+        :param timeout:
+            float -- the most seconds to wait
+        :return:
+            bool -- False if the plugin still had work when the timeout ran out
+        """
+        deadline = time.time() + timeout
+        with self._idle:
+            while self._in_flight.get(plugin):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def pending(self):
+        """
+        :return:
+            int -- the number of tasks waiting to run
+        """
+        return self._pending
+
+    def stats(self):
+        """
+        :return:
+            dict -- dispatch counters
+        """
+        return {"pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "timed_out": self.timed_out,
+                "errors": self.errors}
+
+    def shutdown(self, wait=True):
+        """
+        Stops accepting work and shuts down every pool.
+
+        :param wait:
+            bool -- block until queued work has finished
+        :return:
+            None
+        """
+        self._runners.shutdown(wait)
+        for pool in list(self._pools.values()):
+            pool.shutdown(wait)
+
+    def _pool_for(self, plugin):
+        name = getattr(plugin, "dispatch_pool", None) or DEFAULT_POOL
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = futures.ThreadPoolExecutor(self.max_workers)
+                    self._pools[name] = pool
+        return pool
+
+    def _drain(self, channel):
+        while True:
+            with self._lock:
+                tasks = self._channels.get(channel)
+                if not tasks:
+                    self._channels.pop(channel, None)
+                    return
+                plugin, fn, args = tasks.popleft()
+                self._pending -= 1
+
+            self._run(channel, plugin, fn, args)
+
+    def _run(self, channel, plugin, fn, args):
+        timeout = getattr(plugin, "dispatch_timeout", self.timeout)
+        labels = (("plugin", type(plugin).__name__),)
+        started = self.metrics.start() if self.metrics else None
+        try:
+            future = self._pool_for(plugin).submit(fn, *args)
+        except RuntimeError:
+            # the pool has been shut down
+            self._finished(plugin)
+            raise
+        future.add_done_callback(lambda done: self._finished(plugin))
+        try:
+            future.result(timeout=timeout)
+            with self._lock:
+                self.completed += 1
+            if self.metrics:
+                self.metrics.observe("plugin_seconds", started, labels)
+        except futures.TimeoutError:
+            # the thread can't be interrupted, but the channel no longer waits on it
+            with self._lock:
+                self.timed_out += 1
+            if self.metrics:
+                self.metrics.increment("plugin_timeouts", labels=labels)
+            log.warning("{0} timed out after {1}s in channel: {2}".format(type(plugin).__name__, timeout, channel))
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            if self.metrics:
+                self.metrics.increment("plugin_errors", labels=labels)
+            log.exception("{0} raised while handling a command in channel: {1}".format(type(plugin).__name__,
+                                                                                       channel))
+
+    def _finished(self, plugin):
+        with self._idle:
+            remaining = self._in_flight.get(plugin, 1) - 1
+            if remaining:
+                self._in_flight[plugin] = remaining
+            else:
+                self._in_flight.pop(plugin, None)
+                self._idle.notify_all()
@@ -0,0 +1,386 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import glob
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent import futures
+try:
+    from importlib import util as importlib_util
+except ImportError:
+    # python 2
+    import imp
+    importlib_util = None
+
+from src.constants import app
+from src.utilities import commandEvent
+
+log = logging.getLogger("doddle.util.pluginLoader")
+
+
+class PluginLoader(object):
+    """
+    The PluginLoader finds plugins in the plugin directory and registers them with the client.
+
+    A manifest of every plugin (path, mtime, the command verbs it registered and its help entries) is kept next to
+    the config. A plugin which hasn't changed since the manifest was written is registered through a LazyPlugin
+    stand-in with its recorded commands and help, and is only imported the first time a command is routed to it.
+    New or changed plugins are imported up front, in parallel, and what they registered is recorded for the next
+    start.
+
+    Registering a plugin lazily delays its __init__, and everything __init__ does, until its first command. Plugins
+    which scheduled jobs are recorded as such and always imported up front. A plugin with other side effects in
+    __init__ (threads, connections, files) which have to happen at startup should set lazy = False on its class.
+
+    Once loaded, the plugin directory can be watched (see watch) so that a plugin whose file changes is reloaded in
+    place: the module is imported afresh and the new plugin replaces the running one (see Client.reload_plugin),
+    leaving the rtm connection and every other plugin alone. New plugin files are loaded and deleted ones are
+    removed the same way.
+
+    Init:
+        :Args:
+            plugin_directory -- str, the directory holding one folder per plugin
+            manifest_path -- str, where the plugin manifest is stored
+            lazy -- bool, register unchanged plugins without importing them
+            max_workers -- int, the number of threads used to import plugins
+    """
+
+    def __init__(self, plugin_directory, manifest_path, lazy=True, max_workers=4):
+        self.plugin_directory = os.path.abspath(plugin_directory)
+        self.manifest_path = os.path.abspath(manifest_path)
+        self.lazy = lazy
+        self.max_workers = max_workers
+        self.manifest = {}
+        self.lazy_plugins = []
+        self._mtimes = {}
+        self._watcher = None
+        self._stopped = threading.Event()
+
+    def discover(self):
+        """
+        Builds the list of plugin candidates, leaving out initialization and test files. Each plugin folder is
+        added to sys.path once here, so imports don't have to touch sys.path.
+
+        :return:
+            list -- a PluginSpec for every candidate
+        """
+        specs = []
+        for path in sorted(glob.glob(os.path.join(self.plugin_directory, "*", app.PYTHON_FILE))):
+            name = os.path.basename(path)[:-3]
+            if "__init__" in name or "test" in name:
+                log.debug("Removing plugin candidate: {0}".format(path))
+                continue
+            folder = os.path.dirname(path)
+            if folder not in sys.path:
+                sys.path.append(folder)
+            specs.append(PluginSpec(name, path, os.path.getmtime(path)))
+        return specs
+
+    def load(self, client):
+        """
+        Registers every discovered plugin with the client and rewrites the manifest.
+
+        :param client:
+            Client -- the doddle client passed to each plugin
+        :return:
+            list -- the plugins that were registered, LazyPlugin stand-ins included
+        """
+        self.manifest = self._read_manifest()
+        specs = self.discover()
+        log.info("Found {0} plugin candidates.".format(len(specs)))
+
+        eager = []
+        loaded = []
+        for spec in specs:
+            entry = self.manifest.get(spec.name)
+            if self.lazy and entry and entry.get("lazy", True) and entry.get("path") == spec.path \
+                    and entry.get("mtime") == spec.mtime:
+                log.info("Registering unchanged plugin without importing it: " + spec.name)
+                plugin = LazyPlugin(spec, client)
+                client.register_lazy_plugin(plugin, spec.name, entry.get("commands"), entry.get("help"))
+                self.lazy_plugins.append(plugin)
+                loaded.append(plugin)
+            else:
+                eager.append(spec)
+
+        pool = futures.ThreadPoolExecutor(self.max_workers)
+        try:
+            modules = list(pool.map(self._import, eager))
+        finally:
+            pool.shutdown()
+
+        self._mtimes = dict((spec.name, spec.mtime) for spec in specs)
+        names = set(spec.name for spec in specs)
+        manifest = dict((name, entry) for name, entry in self.manifest.items() if name in names)
+        for spec, module in zip(eager, modules):
+            manifest.pop(spec.name, None)
+            if module is None:
+                continue
+            log.info("Loading plugin: " + spec.name)
+            try:
+                plugin = instantiate(module, client)
+            except Exception:
+                log.exception("Unable to load plugin: " + spec.name)
+                continue
+            loaded.append(plugin)
+            manifest[spec.name] = self._entry(client, spec, plugin)
+
+        self.manifest = manifest
+        self._write_manifest()
+        return loaded
+
+    def prewarm(self):
+        """
+        Imports every lazily registered plugin in the background.
+
+        :return:
+            None
+        """
+        if not self.lazy_plugins:
+            return
+        pool = futures.ThreadPoolExecutor(self.max_workers)
+        for plugin in self.lazy_plugins:
+            pool.submit(plugin.materialize)
+        pool.shutdown(wait=False)
+
+    def watch(self, client, interval=app.PLUGIN_WATCH_INTERVAL):
+        """
+        Starts a daemon thread which reloads plugins whose files change.
+
+        :param client:
+            Client -- the doddle client the plugins are registered with
+        :param interval:
+            float -- seconds between checks of the plugin directory
+        :return:
+            None
+        """
+        if self._watcher is not None:
+            return
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(client, interval), name="doddle-plugin-watcher")
+        self._watcher.daemon = True
+        self._watcher.start()
+
+    def stop_watching(self):
+        """
+        :return:
+            None
+        """
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def check(self, client):
+        """
+        Reloads every plugin whose file changed since it was loaded, loads new plugins and removes the ones whose
+        file is gone.
+
+        :param client:
+            Client -- the doddle client the plugins are registered with
+        :return:
+            list -- the names of the plugins reloaded, loaded or removed
+        """
+        specs = self.discover()
+        changed = [spec for spec in specs if self._mtimes.get(spec.name) != spec.mtime]
+        removed = set(self._mtimes) - set(spec.name for spec in specs)
+        for spec in changed:
+            self.reload(client, spec)
+        for name in removed:
+            log.info("Removing deleted plugin: " + name)
+            client.reload_plugin(name)
+            self._forget(name)
+        if removed:
+            self._write_manifest()
+        return [spec.name for spec in changed] + sorted(removed)
+
+    def reload(self, client, spec):
+        """
+        Imports a plugin's module afresh and swaps the new plugin in for the running one. If the module can't be
+        imported, or the plugin can't be created, the running plugin is left as it was.
+
+        :param client:
+            Client -- the doddle client
+        :param spec:
+            PluginSpec -- the plugin on disk
+        :return:
+            object -- the new plugin, or None
+        """
+        log.info("Reloading plugin: " + spec.name)
+        self._mtimes[spec.name] = spec.mtime
+        try:
+            module = self._load_source(spec)
+        except Exception:
+            log.exception("Unable to import plugin {0}, keeping the running version".format(spec.name))
+            return None
+
+        plugin = client.reload_plugin(spec.name, lambda: instantiate(module, client))
+        if plugin is None:
+            return None
+        self._retire(spec.name, plugin)
+        self.manifest[spec.name] = self._entry(client, spec, plugin)
+        self._write_manifest()
+        return plugin
+
+    @staticmethod
+    def _entry(client, spec, plugin):
+        entry = client.describe_plugin(spec.name)
+        # a plugin with jobs has to be running for them to run
+        jobs = entry.pop("jobs")
+        entry.update({"path": spec.path,
+                      "mtime": spec.mtime,
+                      "lazy": bool(getattr(plugin, "lazy", True)) and not jobs})
+        return entry
+
+    def _watch(self, client, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.check(client)
+            except Exception:
+                log.exception("Unable to check the plugin directory for changes")
+
+    def _forget(self, name):
+        self._mtimes.pop(name, None)
+        self.manifest.pop(name, None)
+        self._retire(name, None)
+
+    def _retire(self, name, plugin):
+        # a stand-in can still have commands queued once it has been replaced, they go to its replacement
+        for lazy in self.lazy_plugins:
+            if lazy.spec.name == name:
+                lazy.retire(plugin)
+        self.lazy_plugins = [lazy for lazy in self.lazy_plugins if lazy.spec.name != name]
+
+    @staticmethod
+    def _load_source(spec):
+        # a new module object, so the running plugin keeps the old one and nothing changes if the import fails.
+        # python 2 can only re-run the module in place.
+        if importlib_util is None:
+            return imp.load_source(spec.name, spec.path)
+        module_spec = importlib_util.spec_from_file_location(spec.name, spec.path)
+        module = importlib_util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        sys.modules[spec.name] = module
+        return module
+
+    def _import(self, spec):
+        try:
+            return importlib.import_module(spec.name)
+        except Exception:
+            log.exception("Unable to import plugin: " + spec.name)
+            return None
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as manifest_file:
+                return json.load(manifest_file)
+        except (IOError, ValueError):
+            log.info("No usable plugin manifest at {0}, importing every plugin".format(self.manifest_path))
+            return {}
+
+    def _write_manifest(self):
+        try:
+            with open(self.manifest_path, "w") as manifest_file:
+                json.dump(self.manifest, manifest_file, indent=2, sort_keys=True)
+        except IOError:
+            log.error("Unable to write plugin manifest {0}".format(self.manifest_path))
+
+
+class PluginSpec(object):
+    """
+    A plugin candidate found on disk.
+    """
+
+    __slots__ = ("name", "path", "mtime")
+
+    def __init__(self, name, path, mtime):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+
+
+class LazyPlugin(object):
+    """
+    Stands in for a plugin which hasn't been imported yet. The first command routed to it imports and instantiates
+    the real plugin, which is swapped in for the stand-in (see Client.reload_plugin), and the command is handed on
+    to it. Until then the stand-in's help entries are listed under the plugin's name.
+
+    Init:
+        :Args:
+            spec -- PluginSpec, the plugin on disk
+            client -- Client, the doddle client passed to the plugin
+    """
+
+    def __init__(self, spec, client):
+        self.spec = spec
+        self.client = client
+        self.plugin = None
+        self.help_topics = [spec.name]
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def materialize(self):
+        """
+        Imports and instantiates the plugin if that hasn't already happened.
+
+        :return:
+            object -- the plugin instance, or None if it couldn't be loaded or has been removed
+        """
+        if self.plugin is not None or self._retired:
+            return self.plugin
+        with self._lock:
+            if self.plugin is None and not self._retired:
+                log.info("Loading plugin on first use: " + self.spec.name)
+                try:
+                    module = importlib.import_module(self.spec.name)
+                except Exception:
+                    log.exception("Unable to load plugin: " + self.spec.name)
+                    return None
+                # the stand-in may be handling a command right now, it can't wait for itself to finish
+                self.plugin = self.client.reload_plugin(self.spec.name, lambda: instantiate(module, self.client),
+                                                        drain=False)
+        return self.plugin
+
+    def retire(self, plugin):
+        """
+        Called once a reload has swapped in a new plugin for the stand-in, or the plugin was removed, so commands
+        still queued for the stand-in are handed to the new plugin rather than loading the plugin a second time.
+
+        :param plugin:
+            object -- the plugin which replaced the stand-in, None if it was removed
+        :return:
+            None
+        """
+        with self._lock:
+            self.plugin = plugin
+            self._retired = True
+
+    def handle_command(self, command):
+        plugin = self.materialize()
+        if plugin is not None:
+            commandEvent.deliver(plugin, command)
+
+    def on_command(self, channel, parts):
+        plugin = self.materialize()
+        if plugin is not None:
+            plugin.on_command(channel, parts)
+
+
+def instantiate(module, client):
+    """
+    Plugins define a class with the same name as their module, which takes the client as its only argument.
+
+    :param module:
+        module -- the imported plugin module
+    :param client:
+        Client -- the doddle client
+    :return:
+        object -- the plugin instance
+    """
+    return getattr(module, module.__name__)(client)
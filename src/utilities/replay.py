@@ -0,0 +1,365 @@
+"""
+:date: 10/17/2026
+
+Runs the client against recorded or synthetic rtm traffic instead of slack, for load testing and profiling.
+
+    - RecordingSlackClient wraps a real SlackClient and writes every rtm frame it reads to a file
+    - load() reads a recording back, synthetic_frames() generates traffic
+    - FakeSlackClient replays frames into Client.start at a configurable rate
+    - FakeHttpSession stands in for the web api and captures every api_call
+
+:example:
+    frames = replay.synthetic_frames(10000, "!", verbs=["echo"])
+    replay.attach(bot, frames, rate=500)
+    bot.start()    # returns once every frame has been read
+"""
+
+import json
+import logging
+import random
+import socket
+import threading
+import time
+
+from src.constants import slack_api_constants
+from src.utilities import codec
+
+log = logging.getLogger("doddle.util.replay")
+
+
+class FakeSlackClient(object):
+    """
+    Stands in for slackclient.SlackClient. server.websocket_safe_read hands out the replayed frames undecoded, and
+    rtm_read decoded, the same way the real client does. The websocket is a socket pair which is made readable
+    whenever a frame is due, so the client's select() wakes up exactly as it would for slack.
+
+    read_at and sent_at map the ts of every event replayed to when the client read it, and when it was due (when
+    slack would have sent it).
+
+    Init:
+        :Args:
+            frames -- list, (offset, frame) pairs where frame is the raw json text and offset is when (in seconds
+                      from the start of the replay) it was received
+            rate -- float, replay this many frames a second, ignoring the recorded offsets
+            speed -- float, when rate isn't given, replay the recorded offsets this much faster. Without either
+                     frames are replayed as fast as the client reads them.
+            on_exhausted -- callable, called once every frame has been read
+    """
+
+    def __init__(self, frames, rate=None, speed=None, on_exhausted=None):
+        self.frames = frames
+        self.rate = rate
+        self.speed = speed
+        self.on_exhausted = on_exhausted
+        self.server = FakeServer(self._read_frame)
+        self.read_at = {}
+        self.sent_at = {}
+        # the ts of every event in each frame, worked out up front so reading a frame costs nothing extra
+        self._timestamps = [[event[slack_api_constants.SLACK_TS] for event in
+                             (json.loads(line) for line in frame.split("\n") if line)
+                             if event.get(slack_api_constants.SLACK_TS) is not None]
+                            for offset, frame in frames]
+        self._position = 0
+        self._started = None
+        self._wake = None
+
+    def rtm_connect(self, *args, **kwargs):
+        self._started = time.time()
+        return True
+
+    def rtm_read(self):
+        frame = self._read_frame()
+        return [codec.loads(line) for line in frame.split("\n") if line]
+
+    def _read_frame(self):
+        self.server.drain()
+        if self._position >= len(self.frames):
+            if self.on_exhausted is not None:
+                on_exhausted, self.on_exhausted = self.on_exhausted, None
+                on_exhausted()
+                # don't leave the client waiting out its select() timeout before it notices
+                self.server.wake()
+            return ""
+
+        offset, frame = self.frames[self._position]
+        due = self._started + self._due(self._position, offset)
+        now = time.time()
+        if due > now:
+            if self._wake is None:
+                self._wake = threading.Timer(due - now, self._wake_up)
+                self._wake.daemon = True
+                self._wake.start()
+            return ""
+
+        for ts in self._timestamps[self._position]:
+            self.read_at[ts] = now
+            self.sent_at[ts] = due
+        self._position += 1
+        return frame
+
+    def _due(self, position, offset):
+        if self.rate:
+            return position / float(self.rate)
+        if self.speed:
+            return offset / float(self.speed)
+        return 0
+
+    def _wake_up(self):
+        self._wake = None
+        self.server.wake()
+
+
+class FakeServer(object):
+    """
+    The parts of slackclient.server.Server the client uses.
+
+    Init:
+        :Args:
+            read -- callable, returns the next raw frame, or "" if there isn't one
+    """
+
+    def __init__(self, read):
+        self.websocket = FakeWebsocket()
+        self.websocket_safe_read = read
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+        self.wake()
+
+    def wake(self):
+        try:
+            self.websocket.writer.send(b"x")
+        except socket.error:
+            pass
+
+    def drain(self):
+        try:
+            while self.websocket.sock.recv(4096):
+                pass
+        except socket.error:
+            pass
+
+
+class FakeWebsocket(object):
+
+    def __init__(self):
+        self.sock, self.writer = socket.socketpair()
+        self.sock.setblocking(False)
+
+
+class FakeHttpSession(object):
+    """
+    Stands in for utilities/httpSession.SlackHttpSession. Every call is captured along with when it was made.
+
+    Init:
+        :Args:
+            responses -- dict, the response (or a callable taking the call's kwargs and returning one) for each api
+                         method. Methods without one get {"ok": True}.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = {slack_api_constants.CALL_CHANNELS_LIST: {"ok": True, slack_api_constants.CHANNELS: []}}
+        self.responses.update(responses or {})
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def api_call(self, method, timeout=None, **kwargs):
+        with self._lock:
+            self.calls.append((time.time(), method, kwargs))
+        response = self.responses.get(method, {"ok": True})
+        if callable(response):
+            response = response(**kwargs)
+        response = dict(response)
+        response.setdefault(slack_api_constants.RESPONSE_HEADERS, {})
+        return response
+
+    def calls_to(self, method):
+        """
+        :param method:
+            str -- the api method
+        :return:
+            list -- (time, kwargs) for every call made to method
+        """
+        with self._lock:
+            return [(called, kwargs) for called, name, kwargs in self.calls if name == method]
+
+    def stats(self):
+        return {"calls": len(self.calls), "errors": 0, "connections": 0, "reused": 0}
+
+    def close(self):
+        pass
+
+
+class RecordingSlackClient(object):
+    """
+    Wraps a real SlackClient and appends every frame read from the rtm websocket to a file, one json line per
+    frame, so real traffic can be replayed later with load(). Frames are recorded exactly as they were received.
+
+    :example:
+        bot.slack_client_class = lambda token: replay.RecordingSlackClient(token, "data/rtm_recording.jsonl")
+
+    Init:
+        :Args:
+            token -- str, the bot token
+            path -- str, the file to append the recording to
+    """
+
+    def __init__(self, token, path):
+        from slackclient import SlackClient
+        self._client = SlackClient(token)
+        self._file = open(path, "a")
+        self._started = None
+        self.server = None
+
+    def rtm_connect(self, *args, **kwargs):
+        self._started = time.time()
+        connected = self._client.rtm_connect(*args, **kwargs)
+        if self._client.server is not None:
+            self.server = _RecordingServer(self._client.server, self._record)
+        return connected
+
+    def rtm_read(self):
+        events = self._client.rtm_read()
+        if events:
+            self._record({"events": events})
+        return events
+
+    def _record(self, entry):
+        entry["offset"] = time.time() - self._started
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _RecordingServer(object):
+    """
+    Wraps the real client's server, so frames the client reads straight off the websocket are recorded too.
+    """
+
+    def __init__(self, server, record):
+        self._server = server
+        self._record = record
+
+    def websocket_safe_read(self):
+        frame = self._server.websocket_safe_read()
+        if frame:
+            self._record({"frame": frame})
+        return frame
+
+    def __getattr__(self, name):
+        return getattr(self._server, name)
+
+
+def load(path):
+    """
+    Reads a recording made by RecordingSlackClient.
+
+    :param path:
+        str -- the recording
+    :return:
+        list -- (offset, frame) pairs for FakeSlackClient
+    """
+    frames = []
+    with open(path) as recording:
+        for line in recording:
+            if line.strip():
+                entry = json.loads(line)
+                if "frame" in entry:
+                    frames.append((entry["offset"], entry["frame"]))
+                else:
+                    frames.append((entry["offset"], "\n".join(json.dumps(event) for event in entry["events"])))
+    return frames
+
+
+def synthetic_frames(count, action_character, verbs=("echo",), channels=10, command_ratio=0.2, user="U0BENCH",
+                     event_ratio=0):
+    """
+    Generates rtm traffic: a mix of commands and channel chatter spread over a number of channels, optionally
+    interleaved with the typing indicators and presence changes which make up much of a real workspace's traffic.
+    One event per frame. Every message has a unique ts.
+
+    :param count:
+        int -- the number of frames
+    :param action_character:
+        str -- the character commands start with
+    :param verbs:
+        list -- the command verbs to send, in rotation
+    :param channels:
+        int -- the number of channels to spread the messages over
+    :param command_ratio:
+        float -- the fraction of messages which are commands
+    :param user:
+        str -- the user id every message is from
+    :param event_ratio:
+        float -- the fraction of frames which aren't messages
+    :return:
+        list -- (offset, frame) pairs for FakeSlackClient
+    """
+    frames = []
+    every = max(1, int(round(1 / command_ratio))) if command_ratio else 0
+    start = int(time.time())
+    # the same traffic every time, so runs can be compared
+    chance = random.Random(0)
+    number = 0
+    while len(frames) < count:
+        if event_ratio and chance.random() < event_ratio:
+            if chance.random() < 0.5:
+                event = {slack_api_constants.EVENT_TYPE: "user_typing",
+                         slack_api_constants.SLACK_CHANNEL: "C{0:08d}".format(len(frames) % channels),
+                         slack_api_constants.SLACK_USER: user}
+            else:
+                event = {slack_api_constants.EVENT_TYPE: "presence_change",
+                         slack_api_constants.SLACK_USER: user,
+                         "presence": "active"}
+            frames.append((0, json.dumps(event)))
+            continue
+
+        if every and number % every == 0:
+            text = "{0}{1} argument{2} another".format(action_character, verbs[(number // every) % len(verbs)],
+                                                       number)
+        else:
+            text = "just some channel chatter, message number {0}".format(number)
+        # built from integers, a float this size can't hold every microsecond
+        ts = "{0}.{1:06d}".format(start + number // 1000000, number % 1000000)
+        # shaped like the message events slack sends, text blocks and all
+        event = {"client_msg_id": "00000000-0000-4000-8000-{0:012d}".format(number),
+                 slack_api_constants.EVENT_TYPE: slack_api_constants.EVENT_MESSAGE,
+                 slack_api_constants.MESSAGE_TEXT: text,
+                 slack_api_constants.SLACK_USER: user,
+                 "team": "T0BENCH",
+                 "blocks": [{"type": "rich_text", "block_id": "b{0}".format(number), "elements": [
+                     {"type": "rich_text_section", "elements": [{"type": "text", "text": text}]}]}],
+                 slack_api_constants.SLACK_CHANNEL: "C{0:08d}".format(number % channels),
+                 "event_ts": ts,
+                 slack_api_constants.SLACK_TS: ts}
+        frames.append((0, json.dumps(event)))
+        number += 1
+    return frames
+
+
+def attach(client, frames, rate=None, speed=None, responses=None):
+    """
+    Points a Client at replayed traffic and a fake web api. Client.start() returns once every frame has been read.
+
+    :param client:
+        Client -- the client, which must not have been started
+    :param frames:
+        list -- (offset, frame) pairs, see load() and synthetic_frames()
+    :param rate:
+        float -- frames a second
+    :param speed:
+        float -- replay the recorded offsets this much faster, instead of using rate. Without either frames are
+                 replayed as fast as the client reads them.
+    :param responses:
+        dict -- canned web api responses, see FakeHttpSession
+    :return:
+        tuple -- (FakeSlackClient, FakeHttpSession) to inspect once the replay is done
+    """
+    http = FakeHttpSession(responses)
+    fake = FakeSlackClient(frames, rate=rate, speed=speed, on_exhausted=client.stop)
+    client.http = http
+    client.slack_client_class = lambda token: fake
+    return fake, http
@@ -0,0 +1,132 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from src.utilities import commandRouter
+
+
+class ResponseCache(object):
+    """
+    An LRU cache, with a TTL on every entry, of the replies plugins made to cacheable commands. A plugin marks a
+    command verb as cacheable with set_policy (see Client.register_command) and repeated identical commands are then
+    answered from the cache without running the plugin.
+
+    Commands are keyed on the plugin and their parts, with the verb normalized the same way the router does, plus
+    the channel when the policy is scoped per channel.
+
+    Init:
+        :Args:
+            max_size -- int, the most responses kept
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._policies = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_policy(self, plugin, verb, ttl, per_channel=False):
+        """
+        :param plugin:
+            object -- the plugin which owns the verb
+        :param verb:
+            str -- the command verb
+        :param ttl:
+            float -- how long (in seconds) a response stays fresh
+        :param per_channel:
+            bool -- cache responses separately for each channel, for commands whose answer depends on where they
+                    were asked
+        :return:
+            None
+        """
+        with self._lock:
+            self._policies[(plugin, commandRouter.CommandRouter.normalize(verb))] = (ttl, per_channel)
+
+    def remove_policies(self, plugin):
+        """
+        Forgets every policy, and every cached response, of a plugin.
+
+        :param plugin:
+            object -- the plugin
+        :return:
+            None
+        """
+        with self._lock:
+            for key in [key for key in self._policies if key[0] is plugin]:
+                del self._policies[key]
+            for key in [key for key in self._entries if key[0] is plugin]:
+                del self._entries[key]
+
+    def key_for(self, plugin, channel, command):
+        """
+        :param plugin:
+            object -- the plugin the command is routed to
+        :param channel:
+            str -- the channel the command was sent in
+        :param command:
+            Command -- the command, which is only split into words if the verb is cacheable
+        :return:
+            tuple -- (key, ttl) if the command is cacheable for the plugin, otherwise None
+        """
+        if not self._policies:
+            return None
+        verb = commandRouter.CommandRouter.normalize(command.verb)
+        policy = self._policies.get((plugin, verb))
+        if policy is None:
+            return None
+        ttl, per_channel = policy
+        return (plugin, channel if per_channel else None, verb) + tuple(command.parts[1:]), ttl
+
+    def get(self, key, now=None):
+        """
+        :param key:
+            tuple -- a key from key_for
+        :param now:
+            float -- the current time, if the caller already has it
+        :return:
+            object -- the cached response, or None if there isn't a fresh one
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response, ttl, now=None):
+        """
+        :param key:
+            tuple -- a key from key_for
+        :param response:
+            object -- the response to cache
+        :param ttl:
+            float -- how long (in seconds) the response stays fresh
+        :param now:
+            float -- the current time, if the caller already has it
+        :return:
+            None
+        """
+        expires = (time.time() if now is None else now) + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, response)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        :return:
+            dict -- hit and miss counts, and the number of cached responses
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,350 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import collections
+import datetime
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from src import doddle_exceptions
+
+log = logging.getLogger("doddle.util.scheduler")
+
+
+class Scheduler(object):
+    """
+    Runs plugin jobs at a time, at an interval or on a cron schedule. Every job shares one heap and one timer thread,
+    which sleeps until the next job is due, so thousands of idle timers cost nothing between runs. Due jobs are not
+    run on the timer thread; they are handed to submit (the plugin dispatcher) so they run on the plugin worker pool.
+
+    A job never overlaps itself, and a plugin never has more than max_per_plugin jobs running at once. A job which
+    comes due while its last run is still going is postponed by busy_delay. A job which comes due while its plugin
+    is at the cap waits in line, and runs as soon as one of the plugin's running jobs finishes.
+
+    Init:
+        :Args:
+            submit -- callable, submit(key, plugin, fn) queues fn on the worker pool and returns False if it couldn't
+            max_per_plugin -- int, the most jobs of one plugin which may run at once
+            busy_delay -- float, how long (in seconds) to postpone a job whose last run is still going
+    """
+
+    def __init__(self, submit, max_per_plugin=2, busy_delay=1.0):
+        self.submit = submit
+        self.max_per_plugin = max_per_plugin
+        self.busy_delay = busy_delay
+
+        self.runs = 0
+        self.postponed = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._running = {}
+        self._waiting = {}
+        self._jobs = set()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def run_at(self, when, fn, plugin=None):
+        """
+        :param when:
+            float -- the unix time to run fn at
+        :param fn:
+            callable -- the job, called without arguments
+        :param plugin:
+            object -- the plugin the job belongs to
+        :return:
+            Job -- the job, which can be cancelled
+        """
+        return self._add(Job(fn, plugin), when)
+
+    def run_every(self, interval, fn, plugin=None, jitter=0, first=None):
+        """
+        :param interval:
+            float -- seconds between runs
+        :param fn:
+            callable -- the job, called without arguments
+        :param plugin:
+            object -- the plugin the job belongs to
+        :param jitter:
+            float -- up to this many seconds are added to every run, so jobs with the same interval spread out
+        :param first:
+            float -- the unix time of the first run, one interval from now by default
+        :return:
+            Job -- the job, which can be cancelled
+        """
+        job = Job(fn, plugin, interval=interval, jitter=jitter)
+        return self._add(job, (time.time() + interval if first is None else first) + job.jitter_delay())
+
+    def run_cron(self, expression, fn, plugin=None, jitter=0):
+        """
+        :param expression:
+            str -- "minute hour day-of-month month day-of-week", in local time. Each field is *, a number, a range
+                   (1-5), a step (*/15 or 0-30/10) or a comma separated list of those. Days of the week run from
+                   0 (sunday) to 6.
+        :param fn:
+            callable -- the job, called without arguments
+        :param plugin:
+            object -- the plugin the job belongs to
+        :param jitter:
+            float -- up to this many seconds are added to every run
+        :return:
+            Job -- the job, which can be cancelled
+        """
+        job = Job(fn, plugin, cron=CronSchedule(expression), jitter=jitter)
+        return self._add(job, job.cron.next_after(time.time()) + job.jitter_delay())
+
+    def cancel(self, job):
+        """
+        :param job:
+            Job -- the job to stop running. A run already in progress finishes.
+        :return:
+            None
+        """
+        with self._condition:
+            job.cancelled = True
+            self._jobs.discard(job)
+            # cancelled jobs are skipped when they come due, compact the heap if they pile up
+            if len(self._heap) > 2 * len(self._jobs) + 64:
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+
+    def cancel_plugin(self, plugin):
+        """
+        Cancels every job of a plugin.
+
+        :param plugin:
+            object -- the plugin
+        :return:
+            None
+        """
+        for job in self.jobs_for(plugin):
+            self.cancel(job)
+
+    def jobs_for(self, plugin):
+        """
+        :param plugin:
+            object -- the plugin
+        :return:
+            list -- every scheduled job of the plugin
+        """
+        with self._condition:
+            return [job for job in self._jobs if job.plugin is plugin]
+
+    def pending(self):
+        """
+        :return:
+            int -- the number of scheduled jobs
+        """
+        return len(self._jobs)
+
+    def stop(self):
+        """
+        Stops the timer thread. Jobs already handed to the worker pool still run.
+
+        :return:
+            None
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _add(self, job, due):
+        with self._condition:
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name="doddle-scheduler")
+                self._thread.daemon = True
+                self._thread.start()
+            self._jobs.add(job)
+            self._push(job, due)
+        return job
+
+    def _push(self, job, due):
+        first = not self._heap or due < self._heap[0][0]
+        heapq.heappush(self._heap, (due, next(self._sequence), job))
+        if first:
+            # the timer thread is sleeping until a later job
+            self._condition.notify()
+
+    def _run(self):
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, sequence, job = self._heap[0]
+                now = time.time()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                if not job.cancelled:
+                    self._start(job, now)
+
+    def _start(self, job, now):
+        if job.running:
+            self.postponed += 1
+            self._push(job, now + self.busy_delay)
+            return
+        if self._running.get(job.owner, 0) >= self.max_per_plugin:
+            self.postponed += 1
+            self._waiting.setdefault(job.owner, collections.deque()).append(job)
+            return
+
+        job.running = True
+        self._running[job.owner] = self._running.get(job.owner, 0) + 1
+        self.runs += 1
+        if not self.submit(job.key, job.owner, lambda: self._call(job)):
+            self._finished(job)
+
+        following = job.next_after(now)
+        if following is None:
+            self._jobs.discard(job)
+        else:
+            self._push(job, following)
+
+    def _call(self, job):
+        try:
+            job.fn()
+        finally:
+            with self._condition:
+                self._finished(job)
+
+    def _finished(self, job):
+        job.running = False
+        running = self._running.get(job.owner, 1) - 1
+        if running:
+            self._running[job.owner] = running
+        else:
+            self._running.pop(job.owner, None)
+
+        # hand the free slot to the job which has waited longest
+        waiting = self._waiting.get(job.owner)
+        while waiting and waiting[0].cancelled:
+            waiting.popleft()
+        if waiting:
+            self._push(waiting.popleft(), time.time())
+        if waiting is not None and not waiting:
+            del self._waiting[job.owner]
+
+
+class Job(object):
+    """
+    A scheduled job, pass it to Scheduler.cancel to stop it running. Jobs without a plugin count as their own
+    owner for the per-plugin cap.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, plugin=None, interval=None, cron=None, jitter=0):
+        self.fn = fn
+        self.plugin = plugin
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter
+        self.key = "job-{0}".format(next(self._ids))
+        self.owner = self if plugin is None else plugin
+        self.running = False
+        self.cancelled = False
+
+    def jitter_delay(self):
+        return random.uniform(0, self.jitter) if self.jitter else 0
+
+    def next_after(self, now):
+        """
+        :param now:
+            float -- when the job last came due
+        :return:
+            float -- when the job is next due, or None if it only runs once
+        """
+        if self.interval is not None:
+            return now + self.interval + self.jitter_delay()
+        if self.cron is not None:
+            return self.cron.next_after(now) + self.jitter_delay()
+        return None
+
+
+class CronSchedule(object):
+    """
+    A parsed cron expression, see Scheduler.run_cron.
+
+    Init:
+        :Args:
+            expression -- str, "minute hour day-of-month month day-of-week"
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != len(self.FIELDS):
+            raise doddle_exceptions.ScheduleException("A cron expression needs 5 fields: {0}".format(expression))
+        try:
+            self.minutes, self.hours, self.days, self.months, self.weekdays = [
+                self._parse(field, low, high) for field, (low, high) in zip(fields, self.FIELDS)]
+        except ValueError:
+            raise doddle_exceptions.ScheduleException("Unable to parse cron expression: {0}".format(expression))
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def next_after(self, now):
+        """
+        :param now:
+            float -- a unix time
+        :return:
+            float -- the first unix time after now which matches the expression
+        """
+        moment = datetime.datetime.fromtimestamp(now).replace(second=0, microsecond=0) + \
+            datetime.timedelta(minutes=1)
+        # no schedule goes more than a few years without matching (i.e. the 29th of february)
+        limit = moment + datetime.timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return time.mktime(moment.timetuple())
+        raise doddle_exceptions.ScheduleException("The cron expression never matches")
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        # python counts monday as 0, cron counts sunday as 0
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday
+        if self.any_weekday:
+            return day
+        # when both are restricted cron runs on either
+        return day or weekday
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = [int(value) for value in spec.split("-", 1)]
+            else:
+                start = int(spec)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(part)
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
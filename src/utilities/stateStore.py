@@ -0,0 +1,306 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger("doddle.util.stateStore")
+
+# cached marker for keys known not to be in the store
+_ABSENT = object()
+# pending marker for keys waiting to be deleted
+_DELETED = object()
+
+
+class StateStore(object):
+    """
+    A persistent key-value store for plugin state, kept in a SQLite database in WAL mode. Keys live in namespaces,
+    one per plugin, and values are anything json can encode.
+
+    Reads go through an LRU cache of encoded values (so every get returns a fresh copy a plugin can't corrupt the
+    cache through). Writes update the cache straight away and are queued for a background thread, which commits
+    everything queued in one transaction every commit_interval seconds, so a plugin saving state never waits on
+    the disk and a burst of writes to the same key costs a single row write.
+
+    The database is only opened when it is first used.
+
+    Init:
+        :Args:
+            path -- str, the database file
+            cache_size -- int, the most values kept in memory
+            commit_interval -- float, how long (in seconds) writes are gathered before they are committed
+    """
+
+    def __init__(self, path, cache_size=10000, commit_interval=0.05):
+        self.path = path
+        self.cache_size = cache_size
+        self.commit_interval = commit_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.commits = 0
+        self.written = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._committing = {}
+        # [readers, writes] for every key being read from the database, see get
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self._writer = None
+        self._stopped = False
+        self._registered = False
+
+    def get(self, namespace, key, default=None):
+        """
+        :param namespace:
+            str -- the namespace
+        :param key:
+            str -- the key
+        :param default:
+            object -- returned if the key isn't set
+        :return:
+            object -- the value
+        """
+        item = (namespace, key)
+        with self._lock:
+            encoded = self._pending.get(item, self._committing.get(item))
+            if encoded is None:
+                encoded = self._cache.pop(item, None)
+                if encoded is not None:
+                    self._cache[item] = encoded
+                    self.hits += 1
+            if encoded is None:
+                self.misses += 1
+                generation = self._generations.setdefault(item, [0, 0])
+                generation[0] += 1
+                writes = generation[1]
+
+        if encoded is None:
+            rows = None
+            try:
+                rows = self._read("SELECT value FROM state WHERE namespace = ? AND key = ?", item)
+                encoded = rows[0][0] if rows else _ABSENT
+            finally:
+                with self._lock:
+                    generation = self._generations[item]
+                    generation[0] -= 1
+                    if not generation[0]:
+                        del self._generations[item]
+                    # a write which raced the read wins, even one committed while the read was running
+                    if rows is not None and generation[1] == writes:
+                        self._remember(item, encoded)
+
+        if encoded is _ABSENT or encoded is _DELETED:
+            return default
+        return json.loads(encoded)
+
+    def set(self, namespace, key, value):
+        """
+        :param namespace:
+            str -- the namespace
+        :param key:
+            str -- the key
+        :param value:
+            object -- the value, which must be json serializable
+        :return:
+            None
+        """
+        self._write((namespace, key), json.dumps(value))
+
+    def delete(self, namespace, key):
+        """
+        :param namespace:
+            str -- the namespace
+        :param key:
+            str -- the key
+        :return:
+            None
+        """
+        self._write((namespace, key), _DELETED)
+
+    def keys(self, namespace):
+        """
+        :param namespace:
+            str -- the namespace
+        :return:
+            list -- every key set in the namespace
+        """
+        keys = set(row[0] for row in self._read("SELECT key FROM state WHERE namespace = ?", (namespace,)))
+        with self._lock:
+            for changes in (self._committing, self._pending):
+                for (item_namespace, key), encoded in changes.items():
+                    if item_namespace != namespace:
+                        continue
+                    if encoded is _DELETED:
+                        keys.discard(key)
+                    else:
+                        keys.add(key)
+        return sorted(keys)
+
+    def flush(self):
+        """
+        Blocks until every write made so far has been committed.
+
+        :return:
+            None
+        """
+        with self._condition:
+            while self._writer is not None and (self._pending or self._committing):
+                self._condition.wait(self.commit_interval * 4)
+
+    def stats(self):
+        """
+        :return:
+            dict -- cache hits and misses, commits, rows written and writes waiting to be committed
+        """
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "commits": self.commits,
+                    "written": self.written,
+                    "pending": len(self._pending) + len(self._committing)}
+
+    def close(self):
+        """
+        Commits every pending write and closes the database. It is opened again if the store is used afterwards.
+
+        :return:
+            None
+        """
+        self.flush()
+        with self._condition:
+            writer, self._writer = self._writer, None
+            self._stopped = True
+            self._condition.notify_all()
+        if writer is not None:
+            writer.join()
+        with self._reader_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _write(self, item, encoded):
+        with self._condition:
+            if self._writer is None:
+                self._start()
+            if not self._pending:
+                # the writer is idle until there is something to commit
+                self._condition.notify_all()
+            self._pending[item] = encoded
+            self._remember(item, _ABSENT if encoded is _DELETED else encoded)
+            generation = self._generations.get(item)
+            if generation is not None:
+                generation[1] += 1
+
+    def _remember(self, item, encoded):
+        self._cache.pop(item, None)
+        self._cache[item] = encoded
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _read(self, query, args):
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = self._open()
+            return self._reader.execute(query, args).fetchall()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL is consistent after a crash with NORMAL, the last few commits may be lost but nothing is corrupted
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS state (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                           "value TEXT NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID")
+        connection.commit()
+        return connection
+
+    def _start(self):
+        if not self._registered:
+            # commit whatever is still pending when the bot exits
+            atexit.register(self.close)
+            self._registered = True
+        self._stopped = False
+        self._writer = threading.Thread(target=self._run, name="doddle-state-writer")
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _run(self):
+        connection = self._open()
+        try:
+            while True:
+                with self._condition:
+                    while not self._pending and not self._stopped:
+                        self._condition.wait()
+                    if not self._pending and self._stopped:
+                        return
+                # gather whatever else is written in the meantime into the same commit
+                time.sleep(self.commit_interval)
+                with self._condition:
+                    self._committing, self._pending = self._pending, {}
+                    batch = list(self._committing.items())
+
+                try:
+                    self._commit(connection, batch)
+                except Exception:
+                    log.exception("Unable to save {0} plugin state changes".format(len(batch)))
+                with self._condition:
+                    self._committing = {}
+                    self.commits += 1
+                    self.written += len(batch)
+                    self._condition.notify_all()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _commit(connection, batch):
+        upserts = [(namespace, key, encoded) for (namespace, key), encoded in batch if encoded is not _DELETED]
+        deletes = [(namespace, key) for (namespace, key), encoded in batch if encoded is _DELETED]
+        with connection:
+            if upserts:
+                connection.executemany("INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)",
+                                       upserts)
+            if deletes:
+                connection.executemany("DELETE FROM state WHERE namespace = ? AND key = ?", deletes)
+
+
+class PluginState(object):
+    """
+    One plugin's view of the StateStore, see Client.get_state.
+
+    Init:
+        :Args:
+            store -- StateStore, the store
+            namespace -- str, the plugin's namespace
+    """
+
+    __slots__ = ("store", "namespace")
+
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+
+    def get(self, key, default=None):
+        return self.store.get(self.namespace, key, default)
+
+    def set(self, key, value):
+        self.store.set(self.namespace, key, value)
+
+    def delete(self, key):
+        self.store.delete(self.namespace, key)
+
+    def keys(self):
+        return self.store.keys(self.namespace)
@@ -0,0 +1,68 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import time
+
+
+class TokenBucket(object):
+    """
+    A token bucket which refills at a steady rate up to a burst capacity. Tokens are refilled lazily when the bucket
+    is consulted, so an idle bucket costs nothing. Callers are expected to do their own locking.
+
+    Init:
+        :Args:
+            rate -- float, tokens added per second
+            capacity -- float, the most tokens the bucket holds
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.time()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, tokens=1, now=None):
+        """
+        :param tokens:
+            float -- how many tokens to take
+        :param now:
+            float -- the current time, if the caller already has it
+        :return:
+            bool -- True if the tokens were available and have been taken
+        """
+        self._refill(time.time() if now is None else now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens=1, now=None):
+        """
+        :param tokens:
+            float -- how many tokens are wanted
+        :param now:
+            float -- the current time, if the caller already has it
+        :return:
+            float -- seconds until the tokens will be available, 0 if they are available now
+        """
+        self._refill(time.time() if now is None else now)
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def is_full(self, now=None):
+        """
+        :return:
+            bool -- True if the bucket has refilled to capacity, i.e. it is safe to forget about
+        """
+        self._refill(time.time() if now is None else now)
+        return self.tokens >= self.capacity
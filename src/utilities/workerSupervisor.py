@@ -0,0 +1,188 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from src.utilities import metrics
+
+log = logging.getLogger("doddle.util.workerSupervisor")
+
+
+class WorkerSupervisor(object):
+    """
+    The WorkerSupervisor runs one worker process per slack workspace so a single deployment can serve several
+    workspaces and use every core. Each worker has its own rtm connection and loads its own plugins, so events never
+    cross a process boundary; the only traffic back to the supervisor is log records and periodic metric snapshots,
+    both over pipe-backed multiprocessing queues.
+
+    Crashed workers are restarted with exponential backoff. Worker log records are re-emitted through the
+    supervisor's own loggers, and the latest metric snapshot from every worker is served, labelled by workspace,
+    from the supervisor's metrics registry.
+
+    Init:
+        :Args:
+            workspaces -- list, (bot_id, token) for every workspace
+            target -- callable, target(bot_id, token, log_queue, metrics_queue) runs a worker. It must be importable
+                      by name so it can be started in a new process.
+            base_delay -- float, the restart delay after the first crash, in seconds
+            max_delay -- float, the largest restart delay, in seconds
+            stable_after -- float, seconds a worker has to run before its restart delay is reset
+    """
+
+    def __init__(self, workspaces, target, base_delay=1, max_delay=60, stable_after=60):
+        self.workspaces = list(workspaces)
+        self.target = target
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+
+        self.log_queue = multiprocessing.Queue()
+        self.metrics_queue = multiprocessing.Queue()
+        self.metrics = AggregateMetrics()
+        self.workers = {}
+        self.restarts = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Starts every worker and supervises them until stop() is called.
+
+        :return:
+            None
+        """
+        for name, pump in (("doddle-worker-logs", self._pump_logs), ("doddle-worker-metrics", self._pump_metrics)):
+            thread = threading.Thread(target=pump, name=name)
+            thread.daemon = True
+            thread.start()
+
+        for bot_id, token in self.workspaces:
+            self.workers[bot_id] = Worker(bot_id, token)
+            self._spawn(self.workers[bot_id])
+
+        try:
+            while not self._stopped.wait(1):
+                self._check_workers()
+        finally:
+            self._terminate()
+
+    def stop(self):
+        """
+        Stops supervising and terminates every worker.
+
+        :return:
+            None
+        """
+        self._stopped.set()
+
+    def _spawn(self, worker):
+        worker.process = multiprocessing.Process(target=self.target,
+                                                 args=(worker.bot_id, worker.token, self.log_queue,
+                                                       self.metrics_queue),
+                                                 name="doddle-worker-{0}".format(worker.bot_id))
+        worker.process.daemon = True
+        worker.process.start()
+        worker.started = time.time()
+        worker.restart_at = None
+        log.info("Started worker for workspace {0} (pid {1})".format(worker.bot_id, worker.process.pid))
+
+    def _check_workers(self):
+        now = time.time()
+        for worker in self.workers.values():
+            if worker.process.is_alive():
+                continue
+
+            if worker.restart_at is None:
+                if now - worker.started >= self.stable_after:
+                    worker.crashes = 0
+                delay = min(self.max_delay, self.base_delay * (2 ** worker.crashes))
+                worker.crashes += 1
+                worker.restart_at = now + delay
+                log.error("Worker for workspace {0} exited with {1}, restarting in {2}s".format(
+                    worker.bot_id, worker.process.exitcode, delay))
+            elif now >= worker.restart_at:
+                self.restarts += 1
+                self._spawn(worker)
+
+    def _terminate(self):
+        for worker in self.workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(5)
+
+    def _pump_logs(self):
+        while not self._stopped.is_set():
+            try:
+                record = self.log_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, IOError):
+                return
+            logging.getLogger(record.name).handle(record)
+
+    def _pump_metrics(self):
+        while not self._stopped.is_set():
+            try:
+                bot_id, snapshot = self.metrics_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, IOError):
+                return
+            self.metrics.update(bot_id, snapshot)
+
+
+class Worker(object):
+    """
+    A workspace and the process serving it.
+    """
+
+    def __init__(self, bot_id, token):
+        self.bot_id = bot_id
+        self.token = token
+        self.process = None
+        self.started = 0
+        self.crashes = 0
+        self.restart_at = None
+
+
+class AggregateMetrics(metrics.Metrics):
+    """
+    Serves the latest metric snapshot reported by each worker, with a workspace label added to every metric.
+    """
+
+    def __init__(self):
+        metrics.Metrics.__init__(self, sample_rate=0)
+        self._snapshots = {}
+
+    def update(self, workspace, snapshot):
+        """
+        :param workspace:
+            str -- the bot id of the worker
+        :param snapshot:
+            dict -- the worker's Metrics.snapshot()
+        :return:
+            None
+        """
+        with self._lock:
+            self._snapshots[workspace] = snapshot
+
+    def snapshot(self):
+        combined = metrics.Metrics.snapshot(self)
+        with self._lock:
+            snapshots = dict(self._snapshots)
+        for workspace, snapshot in snapshots.items():
+            label = (("workspace", workspace),)
+            for kind in ("counters", "gauges", "histograms"):
+                for (name, labels), value in snapshot.get(kind, {}).items():
+                    combined[kind][(name, label + tuple(labels))] = value
+        return combined
@@ -0,0 +1,76 @@
+"""
+:date: 10/17/2026
+
+Fixtures for running a Client against the replay harness (see src/utilities/replay) instead of slack.
+"""
+
+import os
+import sys
+
+import pytest
+
+from src import client
+from src.utilities import admissionController
+from src.utilities import replay
+from tests import support
+
+
+@pytest.fixture
+def make_client(tmpdir):
+    """
+    Makes clients which keep their state and channel directory in a temporary directory, talk to a fake web api
+    and leave the config file alone. Admission and reply limits are lifted unless unlimited=False is passed.
+    Every client made is shut down after the test.
+    """
+    made = []
+
+    def make(unlimited=True, **kwargs):
+        kwargs.setdefault("metrics_sample_rate", 0)
+        kwargs.setdefault("channel_cache_path", str(tmpdir.join("channel_directory.{0}.json".format(len(made)))))
+        kwargs.setdefault("state_path", str(tmpdir.join("doddle_state.{0}.db".format(len(made)))))
+        if unlimited:
+            kwargs.setdefault("reply_rate", support.UNLIMITED_RATE)
+            kwargs.setdefault("reply_burst", support.UNLIMITED_RATE)
+        bot = client.Client(support.BOT_ID, "xoxb-test", support.ACTION_CHARACTER, write_config_defaults=False,
+                            **kwargs)
+        if unlimited:
+            bot.admission = admissionController.AdmissionController(support.UNLIMITED_RATE, support.UNLIMITED_RATE,
+                                                                    support.UNLIMITED_RATE, support.UNLIMITED_RATE)
+        bot.http = replay.FakeHttpSession()
+        made.append(bot)
+        return bot
+
+    yield make
+
+    for bot in made:
+        bot.stop()
+        bot.scheduler.stop()
+        bot.dispatcher.shutdown(False)
+        bot.sender.stop()
+        bot.config_reader.stop_watcher()
+        bot.state.close()
+
+
+@pytest.fixture
+def slack_api():
+    """
+    A local stand-in for the slack web api, see support.FakeSlackApi.
+    """
+    api = support.FakeSlackApi()
+    api.start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def plugin_directory(tmpdir):
+    """
+    An empty plugin directory. The plugins written to it are unloaded after the test, so the next one can reuse
+    their names.
+    """
+    directory = str(tmpdir.mkdir("plugins"))
+    path = list(sys.path)
+    yield directory
+    sys.path[:] = path
+    for name in os.listdir(directory):
+        sys.modules.pop(name, None)
@@ -0,0 +1,226 @@
+"""
+:date: 10/17/2026
+
+Helpers shared by the tests: rtm events, replies, a plugin which echoes its arguments back and a local stand-in for
+the slack web api which speaks real HTTP.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs
+
+from src.constants import slack_api_constants
+
+ACTION_CHARACTER = "!"
+BOT_ID = "U0DODDLE"
+ECHO_VERB = "echo"
+# effectively unlimited, so tests aren't at the mercy of the rate limits they aren't testing
+UNLIMITED_RATE = 1e9
+
+_timestamps = itertools.count(1)
+
+
+def message(text, channel="C0TEST", user="U0USER", ts=None, **fields):
+    """
+    :param text:
+        str -- the message text
+    :param channel:
+        str -- the channel id it was sent in
+    :param user:
+        str -- the user id it was sent by
+    :param ts:
+        str -- the slack timestamp, a unique one by default
+    :return:
+        dict -- an rtm message event
+    """
+    event = {slack_api_constants.EVENT_TYPE: slack_api_constants.EVENT_MESSAGE,
+             slack_api_constants.MESSAGE_TEXT: text,
+             slack_api_constants.SLACK_CHANNEL: channel,
+             slack_api_constants.SLACK_USER: user,
+             slack_api_constants.SLACK_TS: ts or "1500000000.{0:06d}".format(next(_timestamps))}
+    event.update(fields)
+    return event
+
+
+def frames(events, every=0):
+    """
+    :param events:
+        list -- rtm events
+    :param every:
+        float -- seconds between frames
+    :return:
+        list -- (offset, frame) pairs for replay.FakeSlackClient, one event per frame
+    """
+    return [(index * every, json.dumps(event)) for index, event in enumerate(events)]
+
+
+def wait_for(condition, timeout=5):
+    """
+    :param condition:
+        callable -- polled until it returns something truthy
+    :param timeout:
+        float -- seconds to wait
+    :return:
+        the condition's last result
+    """
+    deadline = time.time() + timeout
+    result = condition()
+    while not result and time.time() < deadline:
+        time.sleep(0.01)
+        result = condition()
+    return result
+
+
+def replies(http, channel=None):
+    """
+    :param http:
+        FakeHttpSession -- the fake web api the client posted to
+    :param channel:
+        str -- only the replies to this channel
+    :return:
+        list -- the text of every reply, split back apart where the sender merged them into one post
+    """
+    texts = []
+    for called, kwargs in http.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE):
+        if channel is None or kwargs.get("channel") == channel:
+            texts.extend(kwargs.get("text", "").split("\n"))
+    return texts
+
+
+class EchoPlugin(object):
+    """
+    Replies to "echo <arguments>" with the arguments.
+    """
+
+    def __init__(self, bot, verbs=(ECHO_VERB,)):
+        self.bot = bot
+        self.commands = []
+        bot.register_plugin(self, list(verbs))
+
+    def on_command(self, channel, parts):
+        self.commands.append(parts)
+        if len(parts) > 1:
+            self.bot.reply_to_channel(channel, " ".join(parts[1:]))
+
+
+class FakeSlackApi(object):
+    """
+    A local HTTP server standing in for the slack web api, so utilities/httpSession can be tested over a real
+    connection. Responses are scripted per api method and served in order, the last one repeating; methods without
+    a script answer {"ok": true}.
+
+    :example:
+        api.script("chat.postMessage", (429, {"Retry-After": "1"}, {"ok": False, "error": "ratelimited"}))
+        session = httpSession.SlackHttpSession("xoxb-test", base_url=api.base_url)
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._scripts = {}
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self.base_url = "http://127.0.0.1:{0}/api/".format(self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-slack-api")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def script(self, method, *responses):
+        """
+        :param method:
+            str -- the api method
+        :param responses:
+            (status, headers, body) tuples, served in order
+        """
+        with self._lock:
+            self._scripts[method] = list(responses)
+
+    def calls_to(self, method):
+        """
+        :param method:
+            str -- the api method
+        :return:
+            list -- (time, params) for every call made to method
+        """
+        with self._lock:
+            return [(called, params) for called, name, params in self.calls if name == method]
+
+    def _respond(self, method, params):
+        with self._lock:
+            self.calls.append((time.time(), method, params))
+            script = self._scripts.get(method)
+            if not script:
+                return 200, {}, {"ok": True}
+            return script.pop(0) if len(script) > 1 else script[0]
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _handler(api):
+
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive, as slack does
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8")
+            params = dict((key, values[0]) for key, values in parse_qs(body).items())
+            status, headers, response = api._respond(self.path.split("/")[-1], params)
+
+            content = json.dumps(response).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def write_plugin(directory, name, body, mtime=None):
+    """
+    Writes a plugin the way the plugin loader expects to find it, <directory>/<name>/<name>.py.
+
+    :param directory:
+        str -- the plugin directory
+    :param name:
+        str -- the plugin (and its module and class) name
+    :param body:
+        str -- the class body, indented by four spaces
+    :param mtime:
+        float -- the file's modification time, so a rewrite within the filesystem's resolution is noticed
+    :return:
+        str -- the plugin file
+    """
+    folder = os.path.join(directory, name)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    path = os.path.join(folder, name + ".py")
+    with open(path, "w") as plugin_file:
+        plugin_file.write("class {0}(object):\n{1}".format(name, body))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
@@ -0,0 +1,75 @@
+"""
+:date: 10/17/2026
+
+"""
+
+from src.utilities import admissionController
+from tests import support
+
+NOW = 1000.0
+
+
+def test_a_redelivered_message_is_a_duplicate_until_the_window_passes():
+    admission = admissionController.AdmissionController(dedup_window=60)
+
+    assert admission.admit("C1", "U1", "1.000001", now=NOW) == admissionController.ADMITTED
+    assert admission.admit("C1", "U1", "1.000001", now=NOW + 30) == admissionController.DUPLICATE
+    # the same ts in another channel is another message
+    assert admission.admit("C2", "U1", "1.000001", now=NOW + 30) == admissionController.ADMITTED
+    assert admission.admit("C1", "U1", "1.000001", now=NOW + 61) == admissionController.ADMITTED
+    assert admission.stats()["duplicates"] == 1
+
+
+def test_a_user_over_their_burst_is_throttled_until_it_refills():
+    admission = admissionController.AdmissionController(user_rate=1, user_burst=2)
+
+    verdicts = [admission.admit("C1", "U1", str(number), now=NOW) for number in range(3)]
+    assert verdicts == [admissionController.ADMITTED, admissionController.ADMITTED,
+                        admissionController.THROTTLED_USER]
+    # other users aren't affected
+    assert admission.admit("C1", "U2", "3", now=NOW) == admissionController.ADMITTED
+    assert admission.admit("C1", "U1", "4", now=NOW + 1) == admissionController.ADMITTED
+
+
+def test_a_busy_channel_is_throttled_across_users():
+    admission = admissionController.AdmissionController(channel_rate=1, channel_burst=3)
+
+    verdicts = [admission.admit("C1", "U{0}".format(number), str(number), now=NOW) for number in range(4)]
+    assert verdicts[-1] == admissionController.THROTTLED_CHANNEL
+    assert admission.admit("C2", "U9", "9", now=NOW) == admissionController.ADMITTED
+    assert admission.stats()["throttled"] == 1
+
+
+def test_a_throttled_message_is_not_remembered_as_seen():
+    admission = admissionController.AdmissionController(user_rate=1, user_burst=1)
+
+    admission.admit("C1", "U1", "1", now=NOW)
+    assert admission.admit("C1", "U1", "2", now=NOW) == admissionController.THROTTLED_USER
+    assert admission.admit("C1", "U1", "2", now=NOW + 1) == admissionController.ADMITTED
+
+
+def test_memory_only_grows_with_recent_activity():
+    admission = admissionController.AdmissionController(user_rate=1, user_burst=5, channel_rate=1,
+                                                        channel_burst=5, dedup_window=10, max_keys=100)
+    for number in range(1000):
+        admission.admit("C{0}".format(number), "U{0}".format(number), str(number), now=NOW)
+    assert admission.stats()["users"] <= 100
+    assert admission.stats()["seen"] <= 100
+
+    # long after, every bucket has refilled and every message has expired
+    admission.admit("C0", "U0", "later", now=NOW + 100)
+    stats = admission.stats()
+    assert (stats["users"], stats["channels"], stats["seen"]) == (1, 1, 1)
+
+
+def test_client_drops_duplicate_and_throttled_commands(make_client):
+    bot = make_client(unlimited=False)
+    plugin = support.EchoPlugin(bot)
+    flood = [support.message("!echo {0}".format(number)) for number in range(8)]
+
+    bot._dispatch(flood + [flood[0]])
+
+    assert support.wait_for(lambda: len(plugin.commands) == 5)
+    counters = bot.metrics.snapshot()["counters"]
+    assert counters[("commands_rejected", (("reason", "user_throttled"),))] == 3
+    assert counters[("commands_rejected", (("reason", "duplicate"),))] == 1
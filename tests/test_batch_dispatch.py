@@ -0,0 +1,58 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import json
+import time
+
+from src.utilities import replay
+from tests import support
+
+REPLAYED_EVENTS = 5000
+# far below what the pipeline manages, it only has to catch a loop which stalls on each event
+MIN_EVENTS_PER_SECOND = 500
+
+
+def test_every_command_in_a_batch_is_parsed(make_client):
+    bot = make_client()
+    batch = [support.message("!echo one"),
+             support.message("just chatter"),
+             support.message("!echo two", channel="C0OTHER"),
+             {"type": "user_typing", "channel": "C0TEST"},
+             support.message("<@{0}> echo three".format(support.BOT_ID))]
+
+    commands = list(bot._parse_slack_output(batch))
+
+    assert [command.text for command in commands] == ["echo one", "echo two", "echo three"]
+    assert [command.channel for command in commands] == ["C0TEST", "C0OTHER", "C0TEST"]
+
+
+def test_every_command_in_a_batch_is_handled(make_client):
+    bot = make_client()
+    plugin = support.EchoPlugin(bot)
+
+    bot._dispatch([support.message("!echo {0}".format(number), channel="C{0}".format(number % 3))
+                   for number in range(30)])
+
+    assert support.wait_for(lambda: len(support.replies(bot.http)) == 30)
+    assert sorted(parts[1] for parts in plugin.commands) == sorted(str(number) for number in range(30))
+
+
+def test_replayed_traffic_is_answered_in_full(make_client):
+    frames = replay.synthetic_frames(REPLAYED_EVENTS, support.ACTION_CHARACTER, verbs=[support.ECHO_VERB],
+                                     event_ratio=0.5)
+    arguments = set(text.split()[1] for text in
+                    (json.loads(frame).get("text", "") for offset, frame in frames)
+                    if text.startswith(support.ACTION_CHARACTER))
+    bot = make_client(max_queue=len(frames))
+    support.EchoPlugin(bot)
+    fake, http = replay.attach(bot, frames)
+
+    started = time.time()
+    bot.start()
+    assert support.wait_for(lambda: len(support.replies(http)) >= len(arguments), timeout=60)
+    elapsed = time.time() - started
+
+    assert set(support.replies(http)) == set(argument + " another" for argument in arguments)
+    assert REPLAYED_EVENTS / elapsed > MIN_EVENTS_PER_SECOND
@@ -0,0 +1,58 @@
+"""
+:date: 10/17/2026
+
+"""
+
+from src.utilities import commandRouter
+from tests import support
+
+
+def test_commands_only_reach_the_plugins_owning_the_verb():
+    router = commandRouter.CommandRouter()
+    deploy, status, everything = object(), object(), object()
+    router.add(deploy, ["deploy", "rollback"])
+    router.add(status, ["Status"])
+    router.add(everything)
+
+    assert router.route("deploy") == (deploy, everything)
+    assert router.route("ROLLBACK") == (deploy, everything)
+    assert router.route("status") == (status, everything)
+    assert router.route("unknown") == (everything,)
+    assert sorted(router.verbs_for(deploy)) == ["deploy", "rollback"]
+
+
+def test_a_plugin_declaring_verbs_leaves_the_catch_all():
+    router = commandRouter.CommandRouter()
+    plugin = object()
+    router.add(plugin)
+    router.add(plugin, ["deploy"])
+
+    assert router.route("deploy") == (plugin,)
+    assert router.route("status") == ()
+
+
+def test_removing_a_plugin_drops_its_verbs():
+    router = commandRouter.CommandRouter()
+    first, second = object(), object()
+    router.add(first, ["deploy"])
+    router.add(second, ["deploy", "status"])
+    router.remove(second)
+
+    assert router.route("deploy") == (first,)
+    assert router.route("status") == ()
+    assert router.verbs_for(second) == []
+
+
+def test_client_routes_commands_by_verb(make_client):
+    bot = make_client()
+    echo = support.EchoPlugin(bot)
+    shout = support.EchoPlugin(bot, verbs=["shout"])
+    # registering a command routes its verb to the plugin too
+    bot.register_command("whisper <text>", "whispers the text", shout)
+
+    bot._dispatch([support.message("!echo a"), support.message("!SHOUT b"), support.message("!whisper c"),
+                   support.message("!nobody d")])
+
+    assert support.wait_for(lambda: len(support.replies(bot.http)) == 3)
+    assert echo.commands == [["echo", "a"]]
+    assert sorted(shout.commands) == [["SHOUT", "b"], ["whisper", "c"]]
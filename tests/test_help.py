@@ -0,0 +1,76 @@
+"""
+:date: 10/17/2026
+
+"""
+
+from src.constants import app
+from src.utilities import helpRenderer
+from tests import support
+
+
+class DeployPlugin(object):
+    pass
+
+
+def make_renderer(**kwargs):
+    renderer = helpRenderer.HelpRenderer(support.ACTION_CHARACTER, **kwargs)
+    plugin = DeployPlugin()
+    renderer.add("deploy <env>", "deploys to env", plugin)
+    renderer.add("rollback <env>", "rolls env back", plugin)
+    renderer.add("ping", "pong")
+    return renderer, plugin
+
+
+def test_the_reply_is_rendered_once_until_commands_change():
+    renderer, plugin = make_renderer()
+
+    rendered = renderer.render()
+    assert rendered == ("*Commands*\n!deploy <env> -- deploys to env\n!ping -- pong\n"
+                        "!rollback <env> -- rolls env back",)
+    assert renderer.render() is rendered
+
+    renderer.add("status", "shows the status")
+    assert renderer.render() is not rendered
+    assert "!status -- shows the status" in renderer.render()[0]
+
+    renderer.remove(plugin)
+    assert renderer.render() == ("*Commands*\n!ping -- pong\n!status -- shows the status",)
+
+
+def test_topics_narrow_the_reply_to_a_plugin_or_verb():
+    renderer, plugin = make_renderer()
+
+    by_plugin = renderer.render("DeployPlugin")
+    assert by_plugin == ("*Commands for deployplugin*\n!deploy <env> -- deploys to env\n"
+                         "!rollback <env> -- rolls env back",)
+    # or by the plugin's module
+    assert renderer.render("test_help")[0].split("\n")[1:] == by_plugin[0].split("\n")[1:]
+    assert renderer.render("ping") == ("*Commands for ping*\n!ping -- pong",)
+    assert renderer.render("nothing") is None
+
+
+def test_a_long_reply_is_split_into_messages():
+    renderer = helpRenderer.HelpRenderer(support.ACTION_CHARACTER, max_length=50)
+    for number in range(10):
+        renderer.add("command{0}".format(number), "does thing number {0}".format(number))
+
+    rendered = renderer.render()
+
+    assert len(rendered) > 1
+    assert all(len(message) <= 50 for message in rendered)
+    assert "\n".join(rendered).count("does thing number") == 10
+
+
+def test_client_answers_help_from_the_cache(make_client):
+    bot = make_client()
+    plugin = DeployPlugin()
+    bot.register_plugin(plugin, [])
+    bot.register_command("deploy <env>", "deploys to env", plugin)
+
+    bot._dispatch([support.message("!help"), support.message("!help deploy", channel="C0OTHER"),
+                   support.message("!help nothing", channel="C0THIRD")])
+
+    assert support.wait_for(lambda: len(bot.http.calls) == 3)
+    assert support.replies(bot.http, "C0TEST") == ["*Commands*", "!deploy <env> -- deploys to env"]
+    assert support.replies(bot.http, "C0OTHER") == ["*Commands for deploy*", "!deploy <env> -- deploys to env"]
+    assert support.replies(bot.http, "C0THIRD") == app.HELP_UNKNOWN_TOPIC.format("nothing").split("\n")
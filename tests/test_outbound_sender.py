@@ -0,0 +1,110 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import pytest
+
+from src.constants import slack_api_constants
+from src.utilities import httpSession
+from src.utilities import outboundSender
+
+RATE_LIMITED = (429, {"Retry-After": "0.5"}, {"ok": False, "error": slack_api_constants.ERROR_RATELIMITED})
+OK = (200, {}, {"ok": True})
+
+
+@pytest.fixture
+def session(slack_api):
+    session = httpSession.SlackHttpSession("xoxb-test", base_url=slack_api.base_url)
+    yield session
+    session.close()
+
+
+def make_sender(session, **kwargs):
+    return outboundSender.OutboundSender(session.api_call, **kwargs)
+
+
+def test_a_rate_limited_post_is_retried_after_retry_after(slack_api, session):
+    slack_api.script(slack_api_constants.CALL_CHAT_POST_MESSAGE, RATE_LIMITED, OK)
+    sender = make_sender(session, rate=100, burst=100)
+
+    response = sender.send("C0TEST", "hello").result(5)
+    sender.stop()
+
+    assert response["ok"]
+    calls = slack_api.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE)
+    assert [params["text"] for called, params in calls] == ["hello", "hello"]
+    assert calls[1][0] - calls[0][0] >= 0.5
+    assert sender.stats()["rate_limited"] == 1
+    assert sender.stats()["sent"] == 1
+    # both posts went over the same kept-alive connection
+    assert session.stats()["connections"] == 1
+
+
+def test_a_rate_limited_channel_does_not_hold_up_the_others(slack_api, session):
+    slack_api.script(slack_api_constants.CALL_CHAT_POST_MESSAGE, RATE_LIMITED, OK)
+    sender = make_sender(session, rate=100, burst=100)
+
+    limited = sender.send("C0LIMITED", "first")
+    other = sender.send("C0OTHER", "second")
+    other.result(5)
+    limited.result(5)
+    sender.stop()
+
+    calls = slack_api.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE)
+    assert [params["channel"] for called, params in calls] == ["C0LIMITED", "C0OTHER", "C0LIMITED"]
+    assert calls[1][0] - calls[0][0] < 0.5
+
+
+def test_gives_up_after_max_retries(slack_api, session):
+    slack_api.script(slack_api_constants.CALL_CHAT_POST_MESSAGE,
+                     (429, {"Retry-After": "0.1"}, {"ok": False, "error": slack_api_constants.ERROR_RATELIMITED}))
+    sender = make_sender(session, rate=100, burst=100, max_retries=2)
+
+    response = sender.send("C0TEST", "hello").result(5)
+    sender.stop()
+
+    assert response[slack_api_constants.RESPONSE_ERROR] == slack_api_constants.ERROR_RATELIMITED
+    assert len(slack_api.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE)) == 3
+    assert sender.stats()["failed"] == 1
+
+
+def test_posts_are_paced_per_channel(slack_api, session):
+    sender = make_sender(session, rate=10, burst=1, coalesce=False)
+
+    futures = [sender.send("C0TEST", str(number)) for number in range(3)]
+    for future in futures:
+        future.result(5)
+    sender.stop()
+
+    times = [called for called, params in slack_api.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE)]
+    assert len(times) == 3
+    assert times[2] - times[0] >= 0.15
+
+
+def test_queued_replies_are_coalesced(slack_api, session):
+    sender = make_sender(session, rate=5, burst=1)
+
+    sender.send("C0TEST", "a").result(5)
+    # the channel is out of tokens, so these queue up behind the first
+    futures = [sender.send("C0TEST", text) for text in ("b", "c", "d")]
+    for future in futures:
+        assert future.result(5)["ok"]
+    sender.stop()
+
+    calls = slack_api.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE)
+    assert [params["text"] for called, params in calls] == ["a", "b\nc\nd"]
+    assert sender.stats()["coalesced"] == 2
+
+
+def test_a_message_sent_after_stop_is_rejected(slack_api, session):
+    sender = make_sender(session)
+    sender.send("C0TEST", "hello").result(5)
+    sender.stop()
+
+    future = sender.send("C0TEST", "too late")
+
+    assert isinstance(future.exception(0), RuntimeError)
+    assert sender.pending() == 0
+    assert sender.stats()["failed"] == 1
+    assert len(slack_api.calls_to(slack_api_constants.CALL_CHAT_POST_MESSAGE)) == 1
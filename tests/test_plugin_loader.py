@@ -0,0 +1,151 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+
+from src.utilities import pluginLoader
+from tests import support
+
+GREETER = """    def __init__(self, bot):
+        self.bot = bot
+        bot.register_command("greet <who>", "says hello", self)
+
+    def on_command(self, channel, parts):
+        self.bot.reply_to_channel(channel, "hello " + parts[1])
+"""
+
+TICKER = """    def __init__(self, bot):
+        bot.register_command("ticks", "counts the ticks", self)
+        bot.run_every(60, lambda: None, self)
+
+    def on_command(self, channel, parts):
+        pass
+"""
+
+EAGER = """    lazy = False
+
+    def __init__(self, bot):
+        bot.register_plugin(self, ["eager"])
+
+    def on_command(self, channel, parts):
+        pass
+"""
+
+
+def write_plugins(directory):
+    support.write_plugin(directory, "lazygreeter", GREETER)
+    support.write_plugin(directory, "lazyticker", TICKER)
+    support.write_plugin(directory, "lazyeager", EAGER)
+
+
+def start(make_client, directory):
+    """
+    Loads the plugins into a new client, as a restart of the bot would.
+    """
+    for name in os.listdir(directory):
+        sys.modules.pop(name, None)
+    bot = make_client()
+    loader = pluginLoader.PluginLoader(directory, os.path.join(directory, "manifest.json"))
+    loaded = loader.load(bot)
+    return bot, loader, loaded
+
+
+def test_the_manifest_records_commands_help_and_whether_to_load_lazily(make_client, plugin_directory):
+    write_plugins(plugin_directory)
+
+    bot, loader, loaded = start(make_client, plugin_directory)
+
+    assert len(loaded) == 3
+    with open(os.path.join(plugin_directory, "manifest.json")) as manifest_file:
+        manifest = json.load(manifest_file)
+    assert manifest["lazygreeter"]["commands"] == ["greet"]
+    assert manifest["lazygreeter"]["help"] == [["greet <who>", "says hello"]]
+    assert manifest["lazygreeter"]["lazy"]
+    # a plugin with jobs, or one which asks not to be, is always imported up front
+    assert not manifest["lazyticker"]["lazy"]
+    assert not manifest["lazyeager"]["lazy"]
+
+
+def test_unchanged_plugins_are_registered_without_importing_them(make_client, plugin_directory):
+    write_plugins(plugin_directory)
+    start(make_client, plugin_directory)
+
+    bot, loader, loaded = start(make_client, plugin_directory)
+
+    assert "lazygreeter" not in sys.modules
+    assert "lazyticker" in sys.modules
+    assert "lazyeager" in sys.modules
+    assert [plugin.spec.name for plugin in loader.lazy_plugins] == ["lazygreeter"]
+    assert bot.scheduler.pending() == 1
+    # the stand-in lists the plugin's help
+    assert bot.helpRenderer.render("lazygreeter") == ("*Commands for lazygreeter*\n!greet <who> -- says hello",)
+
+
+def test_the_first_command_swaps_in_the_real_plugin(make_client, plugin_directory):
+    write_plugins(plugin_directory)
+    start(make_client, plugin_directory)
+    bot, loader, loaded = start(make_client, plugin_directory)
+    stand_in = loader.lazy_plugins[0]
+
+    bot._dispatch([support.message("!greet ada")])
+    assert support.wait_for(lambda: support.replies(bot.http) == ["hello ada"])
+    bot._dispatch([support.message("!greet grace")])
+    assert support.wait_for(lambda: len(support.replies(bot.http)) == 2)
+
+    assert support.replies(bot.http) == ["hello ada", "hello grace"]
+    routed = bot.router.route("greet")
+    assert [type(plugin).__name__ for plugin in routed] == ["lazygreeter"]
+    assert routed[0] is stand_in.plugin
+    assert stand_in not in bot.registered_plugins
+    # the help now comes from the real plugin
+    assert bot.helpRenderer.entries(stand_in.plugin) == [("greet <who>", "says hello")]
+    assert bot.helpRenderer.entries(stand_in) == []
+
+
+def test_commands_queued_for_a_replaced_stand_in_go_to_the_reloaded_plugin(make_client, plugin_directory):
+    write_plugins(plugin_directory)
+    start(make_client, plugin_directory)
+    bot, loader, loaded = start(make_client, plugin_directory)
+    stand_in = loader.lazy_plugins[0]
+
+    support.write_plugin(plugin_directory, "lazygreeter", GREETER.replace("hello", "hi"), mtime=time.time() + 10)
+    assert loader.check(bot) == ["lazygreeter"]
+    reloaded = bot.router.route("greet")
+    # a command which was queued for the stand-in before the reload
+    stand_in.on_command("C0TEST", ["greet", "ada"])
+
+    assert support.wait_for(lambda: support.replies(bot.http) == ["hi ada"])
+    assert bot.router.route("greet") == reloaded
+    assert stand_in.plugin is reloaded[0]
+
+
+def test_commands_queued_for_a_removed_stand_in_are_dropped(make_client, plugin_directory):
+    write_plugins(plugin_directory)
+    start(make_client, plugin_directory)
+    bot, loader, loaded = start(make_client, plugin_directory)
+    stand_in = loader.lazy_plugins[0]
+
+    shutil.rmtree(os.path.join(plugin_directory, "lazygreeter"))
+    loader.check(bot)
+    stand_in.on_command("C0TEST", ["greet", "ada"])
+
+    assert "lazygreeter" not in sys.modules
+    assert bot.router.route("greet") == ()
+
+
+def test_a_changed_plugin_is_imported_again(make_client, plugin_directory):
+    write_plugins(plugin_directory)
+    start(make_client, plugin_directory)
+    support.write_plugin(plugin_directory, "lazygreeter", GREETER.replace("hello", "hi"), mtime=time.time() + 10)
+
+    bot, loader, loaded = start(make_client, plugin_directory)
+
+    assert "lazygreeter" in sys.modules
+    assert loader.lazy_plugins == []
+    assert bot.helpRenderer.render("greet") == ("*Commands for greet*\n!greet <who> -- says hi",)
@@ -0,0 +1,132 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import os
+import shutil
+import threading
+import time
+
+from src.utilities import pluginLoader
+from tests import support
+
+NAME = "reloadgreeter"
+
+GREETER = """    def __init__(self, bot):
+        self.bot = bot
+        bot.register_command("greet <who>", "greets as {version}", self)
+        bot.run_every(60, self.tick, self)
+
+    def tick(self):
+        pass
+
+    def on_command(self, channel, parts):
+        import time
+        time.sleep({delay})
+        self.bot.reply_to_channel(channel, "{version} " + parts[1])
+"""
+
+BROKEN = """    def __init__(self, bot):
+        bot.register_command("greet <who>", "never finishes loading", self)
+        bot.run_every(5, lambda: None, self)
+        raise ValueError("broken plugin")
+"""
+
+
+class Rewriter(object):
+    """
+    Rewrites the plugin with an mtime which moves forward each time, however quickly the rewrites come.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.mtime = time.time()
+
+    def __call__(self, body):
+        self.mtime += 10
+        return support.write_plugin(self.directory, NAME, body, mtime=self.mtime)
+
+
+def greeter(version, delay=0):
+    return GREETER.format(version=version, delay=delay)
+
+
+def load(make_client, directory):
+    bot = make_client()
+    loader = pluginLoader.PluginLoader(directory, os.path.join(directory, "manifest.json"))
+    loader.load(bot)
+    return bot, loader
+
+
+def greet(bot, who):
+    bot._dispatch([support.message("!greet " + who, channel="C0" + who.upper())])
+
+
+def test_a_changed_plugin_is_swapped_in_place(make_client, plugin_directory):
+    rewrite = Rewriter(plugin_directory)
+    rewrite(greeter("v1"))
+    bot, loader = load(make_client, plugin_directory)
+    greet(bot, "ada")
+    assert support.wait_for(lambda: support.replies(bot.http) == ["v1 ada"])
+
+    rewrite(greeter("v2"))
+    assert loader.check(bot) == [NAME]
+    greet(bot, "grace")
+
+    assert support.wait_for(lambda: support.replies(bot.http) == ["v1 ada", "v2 grace"])
+    assert len(bot.router.route("greet")) == 1
+    assert bot.scheduler.pending() == 1
+    assert bot.helpRenderer.render("greet") == ("*Commands for greet*\n!greet <who> -- greets as v2",)
+
+
+def test_commands_keep_flowing_while_a_busy_plugin_drains(make_client, plugin_directory):
+    rewrite = Rewriter(plugin_directory)
+    rewrite(greeter("v1", delay=0.5))
+    bot, loader = load(make_client, plugin_directory)
+    support.EchoPlugin(bot)
+    greet(bot, "ada")
+
+    rewrite(greeter("v2"))
+    reload = threading.Thread(target=loader.check, args=(bot,))
+    reload.start()
+    time.sleep(0.1)
+    started = time.time()
+    bot._dispatch([support.message("!echo meanwhile", channel="C0OTHER")])
+    dispatched = time.time() - started
+    reload.join()
+
+    assert dispatched < 0.2
+    # the command the old plugin was running finished on the old code
+    assert support.wait_for(lambda: sorted(support.replies(bot.http)) == ["meanwhile", "v1 ada"])
+    assert type(bot.router.route("greet")[0]).__module__ == NAME
+
+
+def test_a_plugin_which_fails_to_reload_keeps_running(make_client, plugin_directory):
+    rewrite = Rewriter(plugin_directory)
+    rewrite(greeter("v1"))
+    bot, loader = load(make_client, plugin_directory)
+    running = bot.router.route("greet")
+
+    rewrite(BROKEN)
+    loader.check(bot)
+    greet(bot, "ada")
+
+    assert bot.router.route("greet") == running
+    assert bot.scheduler.pending() == 1
+    assert bot.helpRenderer.render("greet") == ("*Commands for greet*\n!greet <who> -- greets as v1",)
+    assert support.wait_for(lambda: support.replies(bot.http) == ["v1 ada"])
+
+
+def test_a_deleted_plugin_is_removed(make_client, plugin_directory):
+    rewrite = Rewriter(plugin_directory)
+    rewrite(greeter("v1"))
+    bot, loader = load(make_client, plugin_directory)
+
+    shutil.rmtree(os.path.join(plugin_directory, NAME))
+    assert loader.check(bot) == [NAME]
+
+    assert bot.router.route("greet") == ()
+    assert bot.scheduler.pending() == 0
+    assert bot.helpRenderer.render("greet") is None
+    assert bot.describe_plugin(NAME) == {"commands": [], "help": [], "jobs": 0}
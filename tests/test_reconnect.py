@@ -0,0 +1,214 @@
+"""
+:date: 10/17/2026
+
+Fault injection for the rtm connection: refused connections, dropped sockets and pings which go unanswered, played
+out by scripted stand-ins for slackclient.SlackClient.
+"""
+
+import socket
+import threading
+import time
+
+from src.constants import app
+from src.constants import slack_api_constants
+from src.utilities import connectionSupervisor
+from src.utilities import replay
+from tests import support
+
+BASE_DELAY = 0.05
+
+
+class RefusedSlackClient(object):
+    """
+    An rtm connection which can't be made.
+    """
+
+    server = None
+
+    def rtm_connect(self, *args, **kwargs):
+        return False
+
+
+class DroppedSlackClient(replay.FakeSlackClient):
+    """
+    An rtm connection which drops once its frames have been read.
+    """
+
+    def _read_frame(self):
+        frame = super(DroppedSlackClient, self)._read_frame()
+        if not frame and self._position >= len(self.frames):
+            raise socket.error("Connection reset by peer")
+        return frame
+
+
+class ScriptedSlack(object):
+    """
+    Stands in for the SlackClient class, handing out the scripted connections in turn. The client is stopped once
+    they run out.
+    """
+
+    def __init__(self, bot, connections):
+        self.bot = bot
+        self.connections = list(connections)
+        self.connected_at = []
+
+    def __call__(self, token):
+        self.connected_at.append(time.time())
+        if not self.connections:
+            self.bot.stop()
+            return RefusedSlackClient()
+        return self.connections.pop(0)
+
+
+def make_flaky_client(make_client, responses=None):
+    bot = make_client(websocket_delay=0.05)
+    bot.supervisor = connectionSupervisor.ConnectionSupervisor(base_delay=BASE_DELAY, max_delay=1,
+                                                               ping_interval=0.2, pong_timeout=0.2)
+    bot.http = replay.FakeHttpSession(responses)
+    support.EchoPlugin(bot)
+    return bot
+
+
+def last(bot, frames):
+    return replay.FakeSlackClient(frames, on_exhausted=bot.stop)
+
+
+def run(bot):
+    """
+    Starts the client in the background, for connections which stay up until the test stops it.
+    """
+    thread = threading.Thread(target=bot.start)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def now_ts(offset=0):
+    return "{0:.6f}".format(time.time() + offset)
+
+
+def test_backs_off_between_refused_connections(make_client):
+    bot = make_flaky_client(make_client)
+    slack = ScriptedSlack(bot, [RefusedSlackClient(), RefusedSlackClient(), RefusedSlackClient(),
+                                last(bot, support.frames([support.message("!echo connected")]))])
+    bot.slack_client_class = slack
+
+    bot.start()
+
+    assert len(slack.connected_at) == 4
+    waits = [after - before for before, after in zip(slack.connected_at, slack.connected_at[1:])]
+    for attempt, waited in enumerate(waits):
+        # jittered between half and all of the doubling ceiling
+        assert waited >= BASE_DELAY * (2 ** attempt) / 2
+    assert bot.metrics.snapshot()["counters"][("reconnects", ())] == 3
+    assert support.wait_for(lambda: support.replies(bot.http) == ["connected"])
+
+
+def test_backs_off_between_connections_which_drop_straight_away(make_client):
+    bot = make_flaky_client(make_client)
+    slack = ScriptedSlack(bot, [DroppedSlackClient([]) for attempt in range(4)] +
+                          [last(bot, support.frames([support.message("!echo stayed up")]))])
+    bot.slack_client_class = slack
+
+    bot.start()
+
+    assert len(slack.connected_at) == 5
+    waits = [after - before for before, after in zip(slack.connected_at, slack.connected_at[1:])]
+    for attempt, waited in enumerate(waits):
+        assert waited >= BASE_DELAY * (2 ** attempt) / 2
+    assert bot.supervisor.attempts == 4
+    assert support.wait_for(lambda: support.replies(bot.http) == ["stayed up"])
+
+
+def test_the_backoff_is_reset_once_a_connection_has_stayed_up():
+    supervisor = connectionSupervisor.ConnectionSupervisor(base_delay=1, max_delay=60, stable_after=60)
+    for attempt in range(3):
+        supervisor.connected(now=1000)
+        supervisor.disconnected(now=1001)
+    assert supervisor.attempts == 3
+
+    supervisor.connected(now=2000)
+    delay = supervisor.disconnected(now=2060)
+
+    assert supervisor.attempts == 1
+    assert 0.5 <= delay <= 1
+
+
+def test_reconnects_after_a_drop_and_replays_missed_commands(make_client):
+    seen, missed_first, missed_second = now_ts(-3), now_ts(-2), now_ts(-1)
+    history = {"ok": True, slack_api_constants.MESSAGES: [
+        # newest first, and overlapping with the last message seen before the drop
+        support.message("!echo missed two", ts=missed_second),
+        support.message("just chatter"),
+        support.message("!echo missed one", ts=missed_first),
+        support.message("!echo before the drop", ts=seen)]}
+    bot = make_flaky_client(make_client, {slack_api_constants.CALL_CONVERSATIONS_HISTORY: history})
+    slack = ScriptedSlack(bot, [DroppedSlackClient(support.frames([support.message("!echo before the drop",
+                                                                                   ts=seen)])),
+                                replay.FakeSlackClient([])])
+    bot.slack_client_class = slack
+
+    thread = run(bot)
+    assert support.wait_for(lambda: len(support.replies(bot.http)) == 3)
+    bot.stop()
+    thread.join(5)
+
+    assert len(slack.connected_at) == 2
+    # the command seen before the drop isn't handled again
+    assert support.replies(bot.http) == ["before the drop", "missed one", "missed two"]
+    fetched = [kwargs for called, kwargs in bot.http.calls_to(slack_api_constants.CALL_CONVERSATIONS_HISTORY)]
+    assert [(kwargs["channel"], kwargs["oldest"]) for kwargs in fetched] == [("C0TEST", seen)]
+    # the channel directory is only built for the first connection
+    assert len(bot.http.calls_to(slack_api_constants.CALL_CHANNELS_LIST)) == 1
+
+
+def test_the_replay_does_not_hold_up_new_commands(make_client):
+    def slow_history(channel, **kwargs):
+        time.sleep(0.2)
+        return {"ok": True, slack_api_constants.MESSAGES: [support.message("!echo missed", channel=channel)]}
+
+    bot = make_flaky_client(make_client, {slack_api_constants.CALL_CONVERSATIONS_HISTORY: slow_history})
+    channels = ["C0{0:02d}".format(number) for number in range(app.REPLAY_MAX_CHANNELS)]
+    seen = [support.message("!echo seen", channel=channel, ts=now_ts(number - 100))
+            for number, channel in enumerate(channels)]
+    slack = ScriptedSlack(bot, [DroppedSlackClient(support.frames(seen)),
+                                replay.FakeSlackClient(support.frames([support.message("!echo live",
+                                                                                       channel="C0LIVE")]))])
+    bot.slack_client_class = slack
+
+    thread = run(bot)
+    assert support.wait_for(lambda: support.replies(bot.http, "C0LIVE") == ["live"])
+    replayed = bot.http.calls_to(slack_api_constants.CALL_CONVERSATIONS_HISTORY)
+    bot.stop()
+    thread.join(5)
+
+    # the live command was handled while the history was still being fetched, the most recently active first
+    assert len(replayed) < 3
+    assert [kwargs["channel"] for called, kwargs in replayed] == channels[::-1][:len(replayed)]
+
+
+def test_only_the_most_recently_active_channels_are_replayed():
+    supervisor = connectionSupervisor.ConnectionSupervisor(replay_window=300)
+    for number in range(10):
+        supervisor.saw_message("C{0}".format(number), "{0}.000100".format(1000 + number * 100))
+
+    # C0..C4 fell out of the window
+    assert supervisor.replay_points(now=1800, limit=3) == [("C9", "1900.000100"), ("C8", "1800.000100"),
+                                                           ("C7", "1700.000100")]
+    assert len(supervisor.replay_points(now=1800)) == 5
+
+
+def test_an_unanswered_ping_drops_the_connection(make_client):
+    bot = make_flaky_client(make_client)
+    # never delivers anything, not even the pong
+    silent = replay.FakeSlackClient([])
+    slack = ScriptedSlack(bot, [silent, last(bot, support.frames([support.message("!echo reconnected")]))])
+    bot.slack_client_class = slack
+
+    started = time.time()
+    bot.start()
+
+    assert silent.server.pings == 1
+    assert len(slack.connected_at) == 2
+    assert slack.connected_at[1] - started >= 0.4
+    assert support.wait_for(lambda: support.replies(bot.http) == ["reconnected"])
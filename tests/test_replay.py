@@ -0,0 +1,53 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import json
+
+from src.constants import slack_api_constants
+from src.utilities import replay
+from tests import support
+
+
+def test_synthetic_frames_are_repeatable():
+    first = replay.synthetic_frames(500, support.ACTION_CHARACTER, event_ratio=0.5)
+    second = replay.synthetic_frames(500, support.ACTION_CHARACTER, event_ratio=0.5)
+
+    assert len(first) == 500
+    assert [json.loads(frame).get("text") for offset, frame in first] == \
+        [json.loads(frame).get("text") for offset, frame in second]
+    timestamps = [json.loads(frame).get(slack_api_constants.SLACK_TS) for offset, frame in first]
+    messages = [ts for ts in timestamps if ts is not None]
+    assert len(set(messages)) == len(messages)
+
+
+def test_start_returns_once_every_frame_is_read(make_client):
+    bot = make_client()
+    support.EchoPlugin(bot)
+    events = [support.message("!echo {0}".format(number)) for number in range(20)]
+    fake, http = replay.attach(bot, support.frames(events))
+
+    bot.start()
+
+    assert support.wait_for(lambda: len(support.replies(http)) == 20)
+    assert sorted(support.replies(http), key=int) == [str(number) for number in range(20)]
+    assert len(fake.read_at) == 20
+
+
+def test_recording_replays_the_frames_it_read(tmpdir):
+    path = str(tmpdir.join("recording.jsonl"))
+    recorded = support.frames([support.message("!echo {0}".format(number)) for number in range(5)])
+    recorder = replay.RecordingSlackClient("xoxb-test", path)
+    # record from the fake rather than slack
+    recorder._client = replay.FakeSlackClient(recorded)
+
+    assert recorder.rtm_connect()
+    read = []
+    frame = recorder.server.websocket_safe_read()
+    while frame:
+        read.append(frame)
+        frame = recorder.server.websocket_safe_read()
+
+    assert read == [frame for offset, frame in recorded]
+    assert [frame for offset, frame in replay.load(path)] == read
@@ -0,0 +1,52 @@
+"""
+:date: 10/17/2026
+
+"""
+
+import time
+
+from tests import support
+
+
+class StatusPlugin(object):
+    """
+    Answers "status" with a cacheable reply and "slow" after a while, uncached.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.calls = 0
+        bot.register_command("status", "shows the status", self, cache_ttl=60)
+        bot.register_command("slow", "takes its time", self)
+
+    def on_command(self, channel, parts):
+        if parts[0] == "slow":
+            time.sleep(0.3)
+            self.bot.reply_to_channel(channel, "slow done")
+            return
+        self.calls += 1
+        self.bot.reply_to_channel(channel, "all good")
+
+
+def test_a_repeated_command_is_answered_from_the_cache(make_client):
+    bot = make_client()
+    plugin = StatusPlugin(bot)
+
+    bot._dispatch([support.message("!status")])
+    assert support.wait_for(lambda: support.replies(bot.http) == ["all good"])
+    bot._dispatch([support.message("!status", channel="C0OTHER")])
+
+    assert support.wait_for(lambda: support.replies(bot.http, "C0OTHER") == ["all good"])
+    assert plugin.calls == 1
+
+
+def test_a_cached_reply_waits_for_the_commands_before_it(make_client):
+    bot = make_client()
+    StatusPlugin(bot)
+    bot._dispatch([support.message("!status")])
+    assert support.wait_for(lambda: support.replies(bot.http) == ["all good"])
+
+    bot._dispatch([support.message("!slow"), support.message("!status")])
+
+    assert support.wait_for(lambda: len(support.replies(bot.http)) == 3)
+    assert support.replies(bot.http) == ["all good", "slow done", "all good"]